@@ -0,0 +1,49 @@
+//! Link parsing on adversarial lines: time per byte has to stay flat while the
+//! line grows by three orders of magnitude.
+//!
+//! cargo bench --no-default-features --bench link_parsing
+
+use criterion::{black_box, criterion_group, criterion_main, BenchmarkId, Criterion, Throughput};
+use vimania_uri_rs::linkparse::link_at;
+
+const SIZES: [usize; 4] = [1_000, 10_000, 100_000, 1_000_000];
+
+fn adversarial_line(kind: &str, len: usize) -> String {
+    let repeat = |unit: &str| unit.repeat(len / unit.len());
+    match kind {
+        // one URL spanning the whole line
+        "long_url" => format!("http://{}", repeat("a")),
+        // every position starts a URL which fails at the separator
+        "scheme_prefixes" => repeat("https:/"),
+        // optional `#!` after every URL character
+        "hashbangs" => format!("http://{}", repeat("a#!")),
+        // unclosed markdown link text
+        "brackets" => repeat("["),
+        "minified_json" => repeat(r#"{"url":"https://example.com/a?b=c#d","ids":[1,2,3]},"#),
+        _ => unreachable!(),
+    }
+}
+
+fn bench_link_at(c: &mut Criterion) {
+    for kind in [
+        "long_url",
+        "scheme_prefixes",
+        "hashbangs",
+        "brackets",
+        "minified_json",
+    ] {
+        let mut group = c.benchmark_group(format!("link_at/{}", kind));
+        for len in SIZES {
+            let line = adversarial_line(kind, len);
+            let column = line.chars().count() / 2;
+            group.throughput(Throughput::Bytes(line.len() as u64));
+            group.bench_with_input(BenchmarkId::from_parameter(len), &line, |b, line| {
+                b.iter(|| link_at(black_box(line), black_box(column)))
+            });
+        }
+        group.finish();
+    }
+}
+
+criterion_group!(benches, bench_link_at);
+criterion_main!(benches);
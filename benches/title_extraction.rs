@@ -0,0 +1,138 @@
+//! Title extraction over the saved pages in `benches/corpus`: huge documents,
+//! legacy charsets, titles after kilobytes of inline code and pages without one.
+//! The full fetch path runs against a local mock server, no network involved.
+//!
+//! cargo bench --no-default-features --bench title_extraction
+
+use criterion::{black_box, criterion_group, criterion_main, BenchmarkId, Criterion, Throughput};
+use std::fs;
+use std::path::Path;
+use std::time::Duration;
+use vimania_uri_rs::bench::{fetch_title, parse_title, validate_url, TitleScanner};
+
+/// Size of the chunks fed into the scanner, as read from the response
+const CHUNK_SIZE: usize = 8 * 1024;
+
+/// Pages of the corpus and their expected title, `None` if there is none
+const CORPUS: [(&str, Option<&str>); 8] = [
+    (
+        "huge_page.html",
+        Some("Changelog — Release History (all versions)"),
+    ),
+    (
+        "title_late.html",
+        Some("Deep Dive: Streaming Parsers in Practice"),
+    ),
+    (
+        "windows_1252.html",
+        Some("Café Crème – Résumé & Menü “Spezial”"),
+    ),
+    ("shift_jis.html", Some("日本語のページ｜技術ブログ")),
+    ("utf16le_bom.html", Some("UTF-16 Encoded Page")),
+    ("missing_title.html", None),
+    (
+        "entities.html",
+        Some("Tom & Jerry's \"Guide\" <2024> — \u{a0}Edition"),
+    ),
+    ("minified_spa.html", Some("Dashboard | Example App")),
+];
+
+fn load(file: &str) -> Vec<u8> {
+    let path = Path::new(env!("CARGO_MANIFEST_DIR"))
+        .join("benches/corpus")
+        .join(file);
+    fs::read(&path).unwrap_or_else(|e| panic!("{}: {}", path.display(), e))
+}
+
+/// Title the way `read_title` gets it: chunk by chunk, the DOM as fallback
+fn scan(body: &[u8]) -> Option<String> {
+    let mut scanner = TitleScanner::new(None);
+    for chunk in body.chunks(CHUNK_SIZE) {
+        if let Some(title) = scanner.feed(chunk) {
+            return Some(title);
+        }
+    }
+    scanner.finish().ok()
+}
+
+fn bench_title_scanner(c: &mut Criterion) {
+    let mut group = c.benchmark_group("title_scanner");
+    for (file, expected) in CORPUS {
+        let body = load(file);
+        assert_eq!(scan(&body).as_deref(), expected, "{}", file);
+        group.throughput(Throughput::Bytes(body.len() as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(file), &body, |b, body| {
+            b.iter(|| scan(black_box(body)))
+        });
+    }
+    group.finish();
+}
+
+fn bench_parse_title(c: &mut Criterion) {
+    // the complete DOM, for comparison with the scanner
+    let mut group = c.benchmark_group("parse_title");
+    for (file, _) in CORPUS {
+        let html = String::from_utf8_lossy(&load(file)).into_owned();
+        group.throughput(Throughput::Bytes(html.len() as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(file), &html, |b, html| {
+            b.iter(|| parse_title(black_box(html)))
+        });
+    }
+    group.finish();
+}
+
+fn bench_validate_url(c: &mut Criterion) {
+    let urls = [
+        "https://example.com/",
+        "https://docs.rs/reqwest/latest/reqwest/blocking/struct.Client.html",
+        "https://example.com/a/very/long/path?with=query&and=more#fragment",
+        "http://[2001:db8::1]:8080/ipv6",
+        "http://192.168.1.10/router",
+        "http://localhost:3000/",
+        "ftp://example.com/file",
+    ];
+    c.bench_function("validate_url", |b| {
+        b.iter(|| {
+            for url in urls {
+                let _ = black_box(validate_url(black_box(url)));
+            }
+        })
+    });
+}
+
+fn bench_fetch_title(c: &mut Criterion) {
+    let mut server = mockito::Server::new();
+    let mut group = c.benchmark_group("fetch_title");
+    group.sample_size(20);
+    for (file, expected) in CORPUS {
+        let body = load(file);
+        let _mock = server
+            .mock("GET", format!("/{}", file).as_str())
+            .with_header("content-type", "text/html")
+            .with_body(&body)
+            .expect_at_least(1)
+            .create();
+        let url = format!("{}/{}", server.url(), file);
+        let timeout = Duration::from_secs(3);
+        assert_eq!(
+            fetch_title(&url, timeout).ok().as_deref(),
+            expected,
+            "{}",
+            file
+        );
+        group.throughput(Throughput::Bytes(body.len() as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(file), &url, |b, url| {
+            b.iter(|| fetch_title(black_box(url), timeout))
+        });
+    }
+    group.finish();
+}
+
+criterion_group!(
+    benches,
+    bench_title_scanner,
+    bench_parse_title,
+    bench_validate_url,
+    bench_fetch_title
+);
+criterion_main!(benches);
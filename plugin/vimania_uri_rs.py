@@ -4,6 +4,7 @@ import os
 import sys
 from pprint import pprint
 
+import vimania_uri_rs
 from vimania_uri_.vim_.vimania_manager import VimaniaUriManager
 
 try:
@@ -71,6 +72,29 @@ else:
 
 _log.debug(f"{extensions=}")
 
+# Vim variable -> (vimania_uri_rs.configure keyword, converter)
+ENGINE_SETTINGS = {
+    "g:vimania_uri_rs_title_cache": ("cache_enabled", lambda v: bool(int(v))),
+    "g:vimania_uri_rs_title_cache_dir": ("cache_dir", os.path.expanduser),
+    "g:vimania_uri_rs_title_cache_ttl": ("cache_ttl_secs", int),
+    "g:vimania_uri_rs_title_cache_size": ("cache_max_entries", int),
+    "g:vimania_uri_rs_title_max_bytes": ("max_body_bytes", int),
+    "g:vimania_uri_rs_title_range_hint": ("range_hint", lambda v: bool(int(v))),
+    "g:vimania_uri_rs_title_backoff": ("backoff_secs", int),
+    "g:vimania_uri_rs_title_backoff_max": ("backoff_max_secs", int),
+    "g:vimania_uri_rs_title_lookup_mode": ("lookup_mode", str),
+}
+engine_settings = {
+    name: convert(vim.eval(var))
+    for var, (name, convert) in ENGINE_SETTINGS.items()
+    if int(vim.eval(f"exists('{var}')"))
+}
+_log.debug(f"{engine_settings=}")
+vimania_uri_rs.configure(**engine_settings)
+
+# Rust log events are kept in a ring buffer, shown by :VimaniaTrace
+vimania_uri_rs.set_trace_level("debug" if LOG_LEVEL == logging.DEBUG else "info")
+
 xUriMgr = VimaniaUriManager(
     plugin_root_dir=plugin_root_dir,
     extensions=extensions,
@@ -35,34 +35,98 @@ TwDebug "Vimania-Uri Extensions: " . join(g:vimania_uri_extensions, ", ")
 
 
 let g:vimania_uri_rs_default_vim_split_policy = get(g:, "vimania_uri_rs_default_vim_split_policy", "none")
+" fetch titles in the background instead of blocking the editor
+let g:vimania_uri_rs_async_title = get(g:, "vimania_uri_rs_async_title", 0)
+let s:title_poll_interval = 50
+" openers run detached, their failures are picked up by a timer
+let s:opener_poll_interval = 200
+let s:opener_timer = -1
+" changes of a buffer kept for its link index, beyond that the index is rebuilt
+let s:max_recorded_changes = 1000
+" build the HTTP client and resolve hosts in the background on the first markdown buffer
+let g:vimania_uri_rs_warm_up = get(g:, "vimania_uri_rs_warm_up", 0)
+" record a profile of every command into g:vimania_uri_rs_profile_dir, see :VimaniaProfile
+let g:vimania_uri_rs_profile = get(g:, "vimania_uri_rs_profile", 0)
+" load the engine on first use instead of at startup
+let g:vimania_uri_rs_lazy_engine = get(g:, "vimania_uri_rs_lazy_engine", 1)
 let s:is_vimania_uri_rs_engine_loaded = 0
 TwDebug "elapsed time:" . reltimestr(reltime(start_time))
 " }}} Globals "
 
 " Vimania-Uri Engine {{{ "
 " ============================================================================
-execute 'py3file ' . g:vimania#PythonScript
-"py3file /Users/Q187392/dev/vim/vimania/plugin/python_wrapper.py
-let s:is_vimania_uri_rs_engine_loaded = 1
-TwDebug "elapsed time:" . reltimestr(reltime(start_time))
+" Importing the Python package and the Rust extension is deferred until a
+" link is followed or a title is fetched, it does not slow down Vim startup.
+" The time it takes is kept in g:vimania_uri_rs_engine_load_time (seconds).
+function! s:LoadEngine()
+  if s:is_vimania_uri_rs_engine_loaded
+    return
+  endif
+  let start = reltime()
+  execute 'py3file ' . g:vimania#PythonScript
+  "py3file /Users/Q187392/dev/vim/vimania/plugin/python_wrapper.py
+  let s:is_vimania_uri_rs_engine_loaded = 1
+  let g:vimania_uri_rs_engine_load_time = reltimefloat(reltime(start))
+  TwDebug "engine load time:" . reltimestr(reltime(start))
+endfunction
+command! VimaniaLoadEngine :call <sid>LoadEngine()
+
+if !g:vimania_uri_rs_lazy_engine
+  call s:LoadEngine()
+  TwDebug "elapsed time:" . reltimestr(reltime(start_time))
+endif
 " }}} Vimania-Uri Engine "
 
 " Functions {{{ "
 " ============================================================================
 function! s:HandleMd()
+  call s:LoadEngine()
+  call s:TrackChanges()
   python3 xUriMgr.call_handle_md2()
   redraw!
+  if s:opener_timer == -1 && !py3eval('xUriMgr.poll_openers()')
+    let s:opener_timer = timer_start(s:opener_poll_interval, function('s:PollOpeners'), {'repeat': -1})
+  endif
+endfunction
+
+function! s:PollOpeners(timer)
+  if py3eval('xUriMgr.poll_openers()')
+    call timer_stop(a:timer)
+    let s:opener_timer = -1
+  endif
 endfunction
 command! HandleMd :call <sid>HandleMd()
 
-function! GetURLTitle(url)
+" optional second argument: bypass title cache and failure back-off
+function! GetURLTitle(url, ...)
+  call s:LoadEngine()
   call TwDebug(printf("Vimania args: %s", a:url))
-  python3 xUriMgr.get_url_title(vim.eval('a:url'))
+  let force = get(a:, 1, 0)
+  python3 xUriMgr.get_url_title(vim.eval('a:url'), force=int(vim.eval('l:force')))
   "call TwDebug(printf("title: %s", g:vimania_url_title))
 endfunction
-command! -nargs=1 GetURLTitle call GetURLTitle(<f-args>)
+command! -bang -nargs=1 GetURLTitle call GetURLTitle(<f-args>, <bang>0)
+
+" Fetch the title in the background and call a:callback with it once done
+function! GetURLTitleAsync(url, callback)
+  call s:LoadEngine()
+  call TwDebug(printf("Vimania args: %s", a:url))
+  let handle = py3eval('xUriMgr.submit_url_title(vim.eval("a:url"))')
+  if type(handle) != v:t_number
+    return
+  endif
+  call timer_start(s:title_poll_interval, function('s:PollURLTitle', [handle, a:callback]), {'repeat': -1})
+endfunction
+
+function! s:PollURLTitle(handle, callback, timer)
+  if py3eval(printf('xUriMgr.poll_url_title(%d)', a:handle))
+    call timer_stop(a:timer)
+    call call(a:callback, [g:vimania_url_title])
+  endif
+endfunction
 
 function! VimaniaEdit(args)
+  call s:LoadEngine()
   call TwDebug(printf("Vimania args: %s", a:args))
   python3 xUriMgr.edit_vimania(vim.eval('a:args'))
 endfunction
@@ -70,6 +134,7 @@ command! -nargs=1 VimaniaEdit call VimaniaEdit(<f-args>)
 "nnoremap Q :VimaniaEdit /Users/Q187392/dev/vim/vimania/tests/data/test.md# Working Examples<CR>
 
 function! VimaniaDebug()
+  call s:LoadEngine()
   "call TwDebug(printf("Vimania args: %s, path: %s", a:args, a:path))
   python3 xUriMgr.debug()
 endfunction
@@ -77,6 +142,7 @@ command! -nargs=0 VimaniaDebug call VimaniaDebug()
 "noremap Q :VimaniaDebug<CR>
 
 function! VimaniaThrowError()
+  call s:LoadEngine()
   "call TwDebug(printf("Vimania args: %s, path: %s", a:args, a:path))
   python3 xUriMgr.throw_error()
 endfunction
@@ -88,12 +154,88 @@ command! -nargs=0 VimaniaThrowError call VimaniaThrowError()
 function s:PasteMDLink()
   let url = getreg("+")
   echo(url)
+  if g:vimania_uri_rs_async_title
+    " insert the link right away, the title is filled in once it arrives
+    let mdLink = printf("[](%s)", url)
+    execute "normal! a" . mdLink . "\<Esc>"
+    call GetURLTitleAsync(url, function('s:FillMDLinkTitle', [bufnr('%'), line('.'), mdLink, url]))
+    return
+  endif
   call GetURLTitle(url)
   let mdLink = printf("[%s](%s)", g:vimania_url_title, url)
   execute "normal! a" . mdLink . "\<Esc>"
 endfunction
 noremap <SID>PasteMDLink :call <SID>PasteMDLink()<CR>
 
+function! s:FillMDLinkTitle(bufnr, lnum, mdLink, url, title)
+  let line = get(getbufline(a:bufnr, a:lnum), 0, '')
+  let idx = stridx(line, a:mdLink)
+  if idx < 0
+    " link has been edited or moved meanwhile
+    return
+  endif
+  let filled = printf("[%s](%s)", a:title, a:url)
+  call setbufline(a:bufnr, a:lnum, strpart(line, 0, idx) . filled . strpart(line, idx + len(a:mdLink)))
+endfunction
+
+function! s:WarmUp(timer)
+  call s:LoadEngine()
+  python3 xUriMgr.warm_up()
+endfunction
+
+" show the latency histograms, or write them as JSON to the given file; ! resets them
+function! s:VimaniaStats(reset, ...)
+  call s:LoadEngine()
+  let path = get(a:, 1, '')
+  python3 xUriMgr.show_stats(vim.eval('l:path'), reset=int(vim.eval('a:reset')))
+endfunction
+command! -bang -nargs=? -complete=file VimaniaStats call s:VimaniaStats(<bang>0, <f-args>)
+
+" toggle profiling of the plugin commands
+function! s:VimaniaProfile()
+  let g:vimania_uri_rs_profile = !g:vimania_uri_rs_profile
+  echom printf("vimania profiling: %s", g:vimania_uri_rs_profile ? 'on' : 'off')
+endfunction
+command! -nargs=0 VimaniaProfile call s:VimaniaProfile()
+
+" show the log events of the Rust extension, ! keeps them in the buffer
+function! s:VimaniaTrace(keep)
+  call s:LoadEngine()
+  python3 xUriMgr.show_trace(clear=not int(vim.eval('a:keep')))
+endfunction
+command! -bang -nargs=0 VimaniaTrace call s:VimaniaTrace(<bang>0)
+
+" record the changed lines of the current buffer, the link index reads only
+" those again, see pythonx/vimania_uri_/md/index.py
+function! s:TrackChanges()
+  if exists('*listener_add') && !get(b:, 'vimania_uri_listener', 0)
+    let b:vimania_uri_changes = []
+    let b:vimania_uri_listener = listener_add(function('s:RecordChanges'))
+  endif
+endfunction
+
+function! s:RecordChanges(bufnr, start, end, added, changes)
+  let recorded = getbufvar(a:bufnr, 'vimania_uri_changes', 0)
+  if type(recorded) != v:t_list || len(recorded) >= s:max_recorded_changes
+    " too many, the index is rebuilt
+    call setbufvar(a:bufnr, 'vimania_uri_changes', 0)
+    return
+  endif
+  call extend(recorded, map(copy(a:changes), '[v:val.lnum, v:val.end, v:val.added]'))
+endfunction
+
+function! s:DropBufferIndex(bufnr)
+  let listener = getbufvar(a:bufnr, 'vimania_uri_listener', 0)
+  if listener
+    call listener_remove(listener)
+    call setbufvar(a:bufnr, 'vimania_uri_listener', 0)
+  endif
+  " nothing is indexed before the engine is loaded
+  if s:is_vimania_uri_rs_engine_loaded
+    execute printf('python3 xUriMgr.drop_buffer_index(%d)', a:bufnr)
+  endif
+endfunction
+
 let s:link_pattern = '\(\[.\{-}\](.\{-})\|\[.\{-}\]\[.\{-}\]\)'
 function! s:_vimania_uri_rs_find_next_link()
     call search(s:link_pattern, 'w')
@@ -125,6 +267,15 @@ nnoremap <Plug>(VimaniaUriFindLinkPrev) :VimaniaUriFindLinkPrev<CR>
 
 " augroup {{{ "
 " ============================================================================
+augroup vimania_uri_rs
+  autocmd!
+  " forget the link index of the buffer, reloading it is not reported as change
+  autocmd BufUnload * call s:DropBufferIndex(str2nr(expand('<abuf>')))
+  if g:vimania_uri_rs_warm_up
+    " deferred by a timer, so the buffer is shown first
+    autocmd FileType markdown ++once call timer_start(0, function('s:WarmUp'))
+  endif
+augroup END
 " }}} augroup "
 
 " helper commands {{{ "
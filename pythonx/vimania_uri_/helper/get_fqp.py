@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Tuple
 
 from vimania_uri_.exception import VimaniaException
+from vimania_uri_.md.resolver import PATH_RESOLVER
 
 _log = logging.getLogger("vimania-uri_.helper.get_fqp")
 
@@ -22,7 +23,7 @@ def get_fqp(args: str) -> Tuple[str, str]:
             p = Path(args)
         elif args.startswith("~"):
             _log.debug("Path with prefix tilde.")
-            p = Path(args).expanduser().absolute()
+            p = Path(PATH_RESOLVER.resolve(args))
         elif args.startswith("$"):
             _log.debug("Path with environment prefix.")
             p = Path(args)
@@ -33,7 +34,7 @@ def get_fqp(args: str) -> Tuple[str, str]:
             p = Path(env_path) / Path(*p.parts[1:])
         else:
             _log.debug(f"Relative path: {args}, working dir: {os.getcwd()}")
-            p = Path(args).absolute()
+            p = Path(PATH_RESOLVER.resolve(args))
 
         if not p.exists():
             _log.error(f"{p} does not exists.")
@@ -1 +1,8 @@
-from .mdnav import URI, open_uri, parse_line
+from .mdnav import (
+    URI,
+    current_buffer_index,
+    open_uri,
+    parse_line,
+    resolve_in_current_buffer,
+)
+from .index import buffer_index, drop_buffer_index
@@ -0,0 +1,195 @@
+"""Per-buffer index of the reference definitions and anchors of a buffer.
+
+The link under the cursor is found by 'mdnav.parse_line' on the cursor line
+alone (the Rust 'link_at' if the extension is available). Only resolving
+indirect links and jumping to anchors need the whole buffer, the index keeps
+the reference definition '[label]: target' and the heading anchors of every
+line for them.
+
+Vim reports the ranges of changed lines through 'listener_add()', see
+'mdnav.current_buffer_index', and only those rows are read again. Without
+change reports a new 'b:changedtick' rebuilds the index. The text of the
+buffer is never copied.
+"""
+import logging
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from vimania_uri_.md.mdnav import URI, JumpToAnchor, parse_line, reference_definition
+
+_log = logging.getLogger("vimania-uri_.md.index")
+
+# (first row, first row below the change, lines added), 0-based like 'listener_add'
+Change = Tuple[int, int, int]
+
+
+@dataclass
+class AnchorTable:
+    headings: List[Tuple[str, int]]  # (anchor, row) sorted
+    ids: Dict[str, int]  # attr-list id -> first row
+
+    def find(self, needle: str) -> Optional[int]:
+        """First row with a heading anchor starting with needle or the attr-list id"""
+        rows = [self.ids[needle]] if needle in self.ids else []
+        # anchors with the prefix are sorted right behind it
+        idx = bisect_left(self.headings, (needle, -1))
+        while idx < len(self.headings) and self.headings[idx][0].startswith(needle):
+            rows.append(self.headings[idx][1])
+            idx += 1
+        return min(rows, default=None)
+
+
+def line_anchors(line: str) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    anchors = JumpToAnchor.line_anchors(line)
+    return None if anchors == (None, None) else anchors
+
+
+@dataclass
+class BufferIndex:
+    changedtick: Optional[int] = None
+    # the changes since the last update are reported, see 'update'
+    tracked: bool = False
+    # (label, target) of the reference definition in each line
+    definitions: List[Optional[Tuple[str, URI]]] = field(default_factory=list)
+    # (heading anchor, attr-list id) defined in each line
+    anchors: List[Optional[Tuple[Optional[str], Optional[str]]]] = field(
+        default_factory=list
+    )
+    # rows changed since the last update, read from the buffer on the next one
+    _dirty: Set[int] = field(default_factory=set, repr=False)
+    _references: Optional[Dict[str, URI]] = field(default=None, repr=False)
+    _anchor_table: Optional[AnchorTable] = field(default=None, repr=False)
+
+    def update(
+        self,
+        changedtick: int,
+        lines: Sequence[str],
+        changes: Optional[Iterable[Change]] = None,
+    ) -> None:
+        """Bring the index up to date.
+
+        'changes' are the changes since the last update in the order they were
+        made, 'None' if they are unknown. Then a new 'changedtick' rebuilds
+        the index.
+        """
+        if changes is not None and self.tracked:
+            for change in changes:
+                self.changed(*change)
+            self._refresh(lines)
+            if len(self.definitions) != len(lines):
+                _log.warning(f"unreported change of the buffer, {changedtick=}")
+                self._rebuild(lines)
+        elif changedtick != self.changedtick or self.tracked:
+            self._rebuild(lines)
+        self.tracked = changes is not None
+        self.changedtick = changedtick
+
+    def changed(self, start: int, end: int, added: int) -> None:
+        """Rows start:end were replaced by 'end - start + added' rows.
+
+        Replaced rows keep their entries until they are read again, so the
+        label map and the anchor table are only dropped if a definition or an
+        anchor is added, removed or changed.
+        """
+        self._dirty = (
+            {row for row in self._dirty if row < start}
+            | {row + added for row in self._dirty if row >= end}
+            | set(range(start, end + added))
+        )
+        # rows beyond the kept ones are deleted or inserted
+        kept = start + min(end - start, end - start + added)
+        inserted = [None] * max(added, 0)
+        removed_definitions = self.definitions[kept:end]
+        self.definitions[kept:end] = inserted
+        removed_anchors = self.anchors[kept:end]
+        self.anchors[kept:end] = inserted
+        if any(removed_definitions):
+            self._references = None
+        # the table holds row numbers, which move with inserted or deleted lines
+        if any(removed_anchors) or added:
+            self._anchor_table = None
+
+    def _refresh(self, lines: Sequence[str]) -> None:
+        """Read the changed rows from the buffer"""
+        _log.debug(f"refreshing {len(self._dirty)} rows")
+        for row in sorted(self._dirty):
+            if row >= len(self.definitions):
+                break
+            line = lines[row]
+            definition = reference_definition(line)
+            if definition != self.definitions[row]:
+                self.definitions[row] = definition
+                self._references = None
+            anchors = line_anchors(line)
+            if anchors != self.anchors[row]:
+                self.anchors[row] = anchors
+                self._anchor_table = None
+        self._dirty.clear()
+
+    def _rebuild(self, lines: Sequence[str]) -> None:
+        _log.debug("rebuilding the index")
+        self.definitions, self.anchors = [], []
+        for line in lines:
+            self.definitions.append(reference_definition(line))
+            self.anchors.append(line_anchors(line))
+        self._dirty.clear()
+        self._references = None
+        self._anchor_table = None
+
+    def parse_line(self, cursor, lines) -> URI | None:
+        """Same as 'mdnav.parse_line', indirect links are resolved by the index"""
+        return parse_line(cursor, lines, resolve=self.resolve_reference)
+
+    def resolve_reference(self, label: str) -> URI | None:
+        target = self.references().get(label)
+        if target is None:
+            _log.info(f"no reference definition for {label=}")
+        return target
+
+    def references(self) -> Dict[str, URI]:
+        """Targets of all reference definitions by label, the first one wins"""
+        if self._references is None:
+            self._references = {}
+            for definition in self.definitions:
+                if definition is not None:
+                    self._references.setdefault(*definition)
+        return self._references
+
+    def find_anchor(self, target: str) -> Optional[int]:
+        """Same as 'JumpToAnchor.find_anchor' on the indexed lines"""
+        needle = JumpToAnchor.norm_target(target)
+        return self.anchor_table().find(needle)
+
+    def anchor_table(self) -> AnchorTable:
+        if self._anchor_table is None:
+            headings, ids = [], {}
+            for row, anchors in enumerate(self.anchors):
+                if anchors is None:
+                    continue
+                anchor, attr_id = anchors
+                if anchor is not None:
+                    headings.append((anchor, row))
+                if attr_id is not None:
+                    ids.setdefault(attr_id, row)
+            self._anchor_table = AnchorTable(headings=sorted(headings), ids=ids)
+        return self._anchor_table
+
+
+_BUFFER_INDEXES: Dict[int, BufferIndex] = {}
+
+
+def buffer_index(
+    number: int,
+    changedtick: int,
+    lines: Sequence[str],
+    changes: Optional[Iterable[Change]] = None,
+) -> BufferIndex:
+    """Up to date index of buffer 'number', see 'BufferIndex.update'"""
+    index = _BUFFER_INDEXES.setdefault(number, BufferIndex())
+    index.update(changedtick, lines, changes)
+    return index
+
+
+def drop_buffer_index(number: int) -> None:
+    _BUFFER_INDEXES.pop(number, None)
@@ -4,14 +4,15 @@ import logging
 import os.path
 import re
 import subprocess
-import sys
-import webbrowser
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Callable, NewType, Optional, Tuple
 
+from vimania_uri_.md import opener
+from vimania_uri_.md.resolver import PATH_RESOLVER
 from vimania_uri_.pattern import (
     URL_PATTERN,
+    URL_BOUNDARY_PATTERN,
     MD_LINK_PATTERN,
     LINK_PATTERN,
     REFERENCE_DEFINITION_PATTERN,
@@ -23,10 +24,25 @@ except ImportError:
     # noinspection PyUnresolvedReferences
     from urlparse import urlparse
 
+try:
+    import vimania_uri_rs
+except ImportError:  # extension not built, fall back to the regex cascade
+    vimania_uri_rs = None
+
 _log = logging.getLogger("vimania-uri_.md.mdnav")
 
 URI = NewType("URI", str)
 
+# initial size of the window searched backwards from the cursor, see 'rfind_pattern'
+WINDOW_SIZE = 256
+# characters searched on either side of the cursor at most, longer URLs are not
+# found, same as 'linkparse::MAX_WINDOW' of the extension
+MAX_LINK_WINDOW = 64 * 2048
+# characters which make a word under the cursor an invalid path
+INVALID_PATH_CHARS = ("*", "?", "[", "]", "|", '"', "'", "<", ">", "!")
+# string.punctuation, keep -
+ANCHOR_PUNCTUATION_TABLE = str.maketrans("", "", "!\"#$%&'()*+,./:;<=>?@[\\]^_`{|}~")
+
 
 @dataclass
 class ParsedPath(object):
@@ -34,6 +50,7 @@ class ParsedPath(object):
     line: int = None
     anchor: str = None
     scheme: str = None
+    base_dir: str = None  # relative paths are relative to it, default: working dir
 
     @property
     def fullpath(self) -> str:
@@ -41,10 +58,10 @@ class ParsedPath(object):
             return ""
         if self.scheme is not None:
             return self.path
-        return str(Path(os.path.expandvars(self.path)).expanduser().absolute())
+        return PATH_RESOLVER.resolve(self.path, self.base_dir)
 
 
-def parse_uri(uri: URI) -> ParsedPath:
+def parse_uri(uri: URI, base_dir: str | None = None) -> ParsedPath:
     """Parse a uri with optional line number of anchor into its parts.
 
     For example::
@@ -74,6 +91,7 @@ def parse_uri(uri: URI) -> ParsedPath:
         path=path,
         line=line,
         anchor=anchor,
+        base_dir=base_dir,
     )
 
 
@@ -83,10 +101,12 @@ def open_uri(
     current_file: str | None = None,
 ) -> Callable:
     """
+    :param current_file: relative paths are resolved relative to its directory
     :returns: a callable that encapsulates the action to perform
     """
     if open_in_vim_extensions is None:
         open_in_vim_extensions = set()
+    base_dir = str(Path(current_file).parent) if current_file else None
 
     if target is not None:
         target = URI(target.strip())
@@ -104,7 +124,7 @@ def open_uri(
 
     if not has_extension(target, open_in_vim_extensions):
         _log.info("has no extension for opening in vim, opening with OS.")
-        return OSOpen(target)
+        return OSOpen(target, base_dir)
 
     if target.startswith("|filename|"):
         target = target[len("|filename|") :]
@@ -112,7 +132,7 @@ def open_uri(
     if target.startswith("{filename}"):
         target = target[len("{filename}") :]
 
-    return VimOpen(target)
+    return VimOpen(target, base_dir)
 
 
 def has_extension(path, extensions):
@@ -136,6 +156,7 @@ def has_scheme(target) -> bool:
 @dataclass
 class Action:
     target: Optional[URI]
+    base_dir: Optional[str] = None  # directory of the file containing the link
 
 
 class NoOp(Action):
@@ -146,39 +167,60 @@ class NoOp(Action):
 class BrowserOpen(Action):
     def __call__(self):
         print("<mdnav: open browser tab>")
-        webbrowser.open_new_tab(self.target)
+        opener.open_url(self.target)
 
 
 class OSOpen(Action):
     def __call__(self):
-        p = parse_uri(self.target)
-        if not Path(p.fullpath).exists():
-            _log.error(f"{p} [{p.fullpath}] does not exists")
-            raise FileNotFoundError(f"{p} [{p.fullpath}] does not exists")
-        _log.debug(f"Opening {p.fullpath=}")
-
-        if sys.platform.startswith("linux"):
-            call(["xdg-open", p.fullpath])
-        elif sys.platform.startswith("darwin"):
-            call(["open", p.fullpath])
-        else:
-            os.startfile(p.fullpath)  # doubleclick equivalent
+        p = parse_uri(self.target, self.base_dir)
+        fullpath = p.fullpath
+        if not os.path.exists(fullpath):
+            _log.error(f"{p} [{fullpath}] does not exists")
+            raise FileNotFoundError(f"{p} [{fullpath}] does not exists")
+        _log.debug(f"Opening {fullpath=}")
+
+        opener.open_file(fullpath)
 
 
 class VimOpen(Action):
+    # g:vimania_uri_rs_default_vim_split_policy -> (open a file, show a buffer)
+    SPLIT_COMMANDS = {
+        "none": ("tabnew", "tab sbuffer"),
+        "horizontal": ("split", "sbuffer"),
+        "vertical": ("vsplit", "vertical sbuffer"),
+    }
+
     def __call__(self):
         # noinspection PyUnresolvedReferences
         import vim
 
-        path = parse_uri(self.target)
-        if not Path(path.fullpath).exists():
-            _log.info(f"{path.fullpath=} does not exists. Creating...")
-            # raise FileNotFoundError(f"{path.fullpath=} does not exists")
-        _log.debug(f"Opening {path.fullpath=}")
+        path = parse_uri(self.target, self.base_dir)
+        fullpath = path.fullpath
+        exists = os.path.exists(fullpath)
+        if not exists:
+            _log.info(f"{fullpath=} does not exists. Creating...")
+            # raise FileNotFoundError(f"{fullpath=} does not exists")
+        _log.debug(f"Opening {fullpath=}")
+
+        open_file, show_buffer = self.split_commands()
+        buffer = find_buffer(fullpath)
+        if buffer is not None:
+            # already loaded: no re-reading and re-highlighting of the file
+            if not focus_window(buffer):
+                vim.command(f"{show_buffer} {buffer.number}")
+
+        else:
+            # TODO: make space handling more robust?
+            p_sanitized = fullpath.replace(" ", "\\ ")
+            if path.anchor is not None and exists:
+                # find the anchor in the file, Vim opens it at the line right away
+                anchor_line = find_anchor_line(fullpath, path.anchor)
+                if anchor_line is not None:
+                    vim.command(f"{open_file} +{anchor_line} {p_sanitized}")
+                    return
+
+            vim.command(f"{open_file} {p_sanitized}")
 
-        # TODO: make space handling more robust?
-        p_sanitized = path.fullpath.replace(" ", "\\ ")
-        vim.command(f"tabnew {p_sanitized}")
         if path.line is not None:
             try:
                 line = int(path.line)
@@ -192,6 +234,61 @@ class VimOpen(Action):
         if path.anchor is not None:
             JumpToAnchor(URI(path.anchor))()
 
+    @classmethod
+    def split_commands(cls) -> Tuple[str, str]:
+        # noinspection PyUnresolvedReferences
+        import vim
+
+        policy = vim.eval("get(g:, 'vimania_uri_rs_default_vim_split_policy', 'none')")
+        if policy not in cls.SPLIT_COMMANDS:
+            _log.warning(f"Unknown split policy {policy=}, using 'none'")
+            policy = "none"
+        return cls.SPLIT_COMMANDS[policy]
+
+
+def find_buffer(fullpath: str):
+    """Vim buffer of the file, its content may differ from the file on disk.
+
+    The paths are compared resolved, links may go through '..' or symlinks.
+    """
+    # noinspection PyUnresolvedReferences
+    import vim
+
+    realpath = os.path.realpath(fullpath)
+    for buffer in vim.buffers:
+        # unnamed buffers would resolve to the working directory
+        if buffer.name and os.path.realpath(buffer.name) == realpath:
+            return buffer
+    return None
+
+
+def focus_window(buffer) -> bool:
+    """Go to a window showing the buffer, windows of the current tab page first"""
+    # noinspection PyUnresolvedReferences
+    import vim
+
+    current = vim.current.tabpage
+    tabpages = [current]
+    tabpages += [tp for tp in vim.tabpages if tp.number != current.number]
+    for tabpage in tabpages:
+        for window in tabpage.windows:
+            if window.buffer.number == buffer.number:
+                vim.current.tabpage = tabpage
+                vim.current.window = window
+                return True
+    return False
+
+
+def find_anchor_line(fullpath: str, anchor: str) -> int | None:
+    """1-based line of the anchor in the file, None if not found or not scannable"""
+    if vimania_uri_rs is None:
+        return None
+    try:
+        return vimania_uri_rs.find_anchor_line(fullpath, anchor)
+    except OSError as e:
+        _log.warning(f"Scanning {fullpath} for anchors failed: {e}")
+        return None
+
 
 class JumpToAnchor(Action):
     HEADING_PATTERN = re.compile(r"^#+(?P<title>.*)$")
@@ -202,7 +299,7 @@ class JumpToAnchor(Action):
         import vim
 
         _log.debug(f"{self.target=}")
-        line = self.find_anchor(self.target, vim.current.buffer)
+        line = current_buffer_index().find_anchor(self.target)
         _log.debug(f"{line=}")
 
         if line is None:
@@ -216,24 +313,33 @@ class JumpToAnchor(Action):
         _log.debug(f"{target=}, {needle=}, {buffer=}")
 
         for idx, line in enumerate(buffer):
+            anchor, attr_id = cls.line_anchors(line)
+            if anchor is not None and anchor.startswith(needle):
+                return idx
+
+            if attr_id is not None and needle == attr_id:
+                return idx
+
+    @classmethod
+    def line_anchors(cls, line) -> Tuple[str | None, str | None]:
+        """Anchor of the heading and the attr-list id defined in line"""
+        anchor, attr_id = None, None
+        if line.startswith("#"):
             m = cls.HEADING_PATTERN.match(line)
             if m is not None:
                 title = m.group("title")
                 anchor = cls.title_to_anchor(title)
                 _log.debug(f"{title=}, {anchor=}")
-                if anchor.startswith(needle):
-                    return idx
 
+        if "{:" in line:
             m = cls.ATTR_LIST_PATTERN.search(line)
-            if m is not None and needle == m.group("id"):
-                return idx
+            if m is not None:
+                attr_id = m.group("id")
+        return anchor, attr_id
 
     @staticmethod
     def title_to_anchor(title) -> str:
-        PUNCTUATION_TO_REMOVE = (
-            "!\"#$%&'()*+,./:;<=>?@[\\]^_`{|}~"  # string.punctuation, keep -
-        )
-        title = title.translate(str.maketrans("", "", PUNCTUATION_TO_REMOVE))
+        title = title.translate(ANCHOR_PUNCTUATION_TABLE)
         return "-".join(fragment.lower() for fragment in title.split())
 
     # @staticmethod
@@ -266,26 +372,20 @@ def check_path(line: str, pos: int) -> Tuple[str | None, int]:
         return None, 0
     if line[pos] in " \t":
         return None, pos
-    start = line[:pos].rfind(" ") + 1  # handles also the case with pos == 0
+    start = line.rfind(" ", 0, pos) + 1  # handles also the case with pos == 0
 
     # TODO: handle escapes
     if start < 0:
         return None, pos
 
-    end = line[start:].find(" ")
+    end = line.find(" ", start)
     if end < 0:
         end = len(line)
 
-    path = line[start : start + end]
+    path = line[start:end]
     try:
         p = Path(path)
-        if any(
-            [
-                c
-                for c in ["*", "?", "[", "]", "|", '"', "'", "<", ">", "!"]
-                if c in str(p)
-            ]
-        ):
+        if any([c for c in INVALID_PATH_CHARS if c in str(p)]):
             raise ValueError(f"Skipping {p} because it contains an invalid character.")
         return path, pos - start
     except ValueError:
@@ -301,8 +401,34 @@ class MdnavMatch:
 
 
 def check_url(line: str, column: int) -> Tuple[str | None, int]:
+    if vimania_uri_rs is not None:
+        # linear time, URL_PATTERN backtracks on pathological lines
+        match = vimania_uri_rs.url_at(line, column)
+        if match is None:
+            return None, column
+        start, end, matched = match
+        if matched.endswith(")"):  # is markdown link
+            return None, column
+        return matched, column - start
+
+    # a URL under the cursor lies within the run of URL characters around it,
+    # which is searched up to MAX_LINK_WINDOW characters on either side
+    if column >= len(line) or URL_BOUNDARY_PATTERN.match(line, column):
+        return None, column
+    low, high = max(0, column - MAX_LINK_WINDOW), column + MAX_LINK_WINDOW
+    start = rfind_pattern(URL_BOUNDARY_PATTERN, line, column, low)
+    boundary = URL_BOUNDARY_PATTERN.search(line, column, high)
+    end = boundary.start() if boundary else len(line)
+    if (start == low > 0 and not URL_BOUNDARY_PATTERN.match(line, low - 1)) or (
+        end > high
+    ):
+        _log.info("no end of the URL within %s characters", MAX_LINK_WINDOW)
+        return None, column
+    if line.find("http", start, column + len("http")) < 0:
+        return None, column
+
     urls = []
-    matches = re.finditer(URL_PATTERN, line)
+    matches = URL_PATTERN.finditer(line, start, end)
     for match in matches:
         urls.append(
             MdnavMatch(
@@ -344,13 +470,24 @@ def check_reference_link(line: str, column: int) -> Tuple[str | None, int]:
     return None, column
 
 
-def parse_line(cursor, lines) -> URI | None:
-    """Extract URI under cursor from text line"""
+def parse_line(
+    cursor, lines, resolve: Callable[[str], URI | None] | None = None
+) -> URI | None:
+    """Extract URI under cursor from text line.
+
+    Only the cursor line is parsed, the label of an indirect link is resolved
+    with 'resolve', by default by scanning 'lines' for its definition.
+    """
     row, column = cursor
     line = lines[row]
+    if resolve is None:
+        resolve = lambda label: resolve_reference(label, lines)  # noqa: E731
 
     _log.debug("handle line %s (%s, %s)", line, row, column)
 
+    if vimania_uri_rs is not None:
+        return parse_line_rs(line, column, resolve)
+
     ### 1. Return with URL
     link_text, rel_column = check_url(line, column)
     if link_text is not None:
@@ -367,19 +504,20 @@ def parse_line(cursor, lines) -> URI | None:
         return URI(link_text)
 
     ### 4. Parse Markdown Link
-    link_text, rel_column = select_from_start_of_link(line, column)
+    start = find_start_of_link(line, column)
 
-    if not link_text:
+    if start < 0:
         _log.info("could not find link text")
         return None
 
-    m = LINK_PATTERN.match(link_text)
+    rel_column = column - start
+    m = LINK_PATTERN.match(line, start)
 
     if not m:
         _log.info("does not match link pattern")
         return None
 
-    if m.end("link") <= rel_column:
+    if m.end("link") - start <= rel_column:
         _log.info("cursor outside link")
         return None
 
@@ -395,35 +533,126 @@ def parse_line(cursor, lines) -> URI | None:
     if not indirect_ref:
         indirect_ref = m.group("text")
 
-    indirect_link_pattern = re.compile(r"^\[" + re.escape(indirect_ref) + r"\]:(.*)$")
+    return resolve(indirect_ref)
+
+
+def parse_line_rs(
+    line: str, column: int, resolve: Callable[[str], URI | None]
+) -> URI | None:
+    """Same as the cascade in 'parse_line', but a single pass in the Rust extension"""
+    link = vimania_uri_rs.link_at(line, column)
+    if link is None:
+        _log.info("could not find link")
+        return None
+
+    kind, start, end, target = link
+    _log.debug("found %s link [%s:%s]: %s", kind, start, end, target)
+    if kind == "indirect":
+        return resolve(target)
+    return URI(target)
 
+
+def resolve_reference(indirect_ref: str, lines) -> URI | None:
+    """Target of the reference definition '[indirect_ref]: target' in lines"""
     for line in lines:
-        m = indirect_link_pattern.match(line)
+        definition = reference_definition(line)
 
-        if m:
-            return URI(m.group(1).strip())
+        if definition is not None and definition[0] == indirect_ref:
+            return definition[1]
 
     _log.info("could not match for indirect link")
     return None
 
 
+def current_buffer_index():
+    """Up to date 'BufferIndex' of the current buffer.
+
+    While 'b:vimania_uri_listener' is set, the plugin records the changes of
+    the buffer in 'b:vimania_uri_changes': '[lnum, end, added]' as passed to
+    'listener_add()' callbacks, or 0 if there were too many to keep.
+    """
+    # noinspection PyUnresolvedReferences
+    import vim
+
+    from vimania_uri_.md.index import buffer_index
+
+    buffer = vim.current.buffer
+    changes = None
+    if vim.eval("get(b:, 'vimania_uri_listener', 0)") != "0":
+        vim.eval("listener_flush()")
+        reported = vim.eval("get(b:, 'vimania_uri_changes', 0)")
+        vim.command("let b:vimania_uri_changes = []")
+        if isinstance(reported, list):
+            changes = [
+                (int(lnum) - 1, int(end) - 1, int(added))
+                for lnum, end, added in reported
+            ]
+    changedtick = int(vim.eval("b:changedtick"))
+    return buffer_index(buffer.number, changedtick, buffer, changes)
+
+
+def resolve_in_current_buffer(label: str) -> URI | None:
+    """Target of the reference 'label' in the current buffer.
+
+    Only here the buffer index is brought up to date, links which need no
+    reference definition are parsed without it.
+    """
+    return current_buffer_index().resolve_reference(label)
+
+
+def reference_definition(line: str) -> Tuple[str, URI] | None:
+    """Label and target of the reference definition '[label]: target' in line"""
+    if not line.startswith("["):  # cheap check, most lines are no definitions
+        return None
+    m = REFERENCE_DEFINITION_PATTERN.match(line)
+    if m is None:
+        return None
+    return m.group("label"), URI(m.group("link").strip())
+
+
 def select_from_start_of_link(line, pos) -> Tuple[str | None, int]:
     """Return the start of the link string and the new cursor"""
+    start = find_start_of_link(line, pos)
+    if start < 0:
+        return None, pos
+    return line[start:], pos - start
+
+
+def find_start_of_link(line: str, pos: int) -> int:
+    """Index of the '[' starting the link under the cursor, -1 if there is none"""
     if pos < len(line) and line[pos] == "[":
         start = pos
 
     else:
-        start = line[:pos].rfind("[")
+        start = line.rfind("[", 0, pos)
 
     # TODO: handle escapes
 
     if start < 0:
-        return None, pos
+        return start
 
     # check for indirect links
     if start != 0 and line[start - 1] == "]":
-        alt_start = line[:start].rfind("[")
+        alt_start = line.rfind("[", 0, start)
         if alt_start >= 0:
             start = alt_start
 
-    return line[start:], pos - start
+    return start
+
+
+def rfind_pattern(pattern: re.Pattern, line: str, pos: int, low: int = 0) -> int:
+    """Index after the last single character 'pattern' match in line[low:pos], or low.
+
+    The window before pos is searched reversed and doubles until the pattern
+    matches, so the cost depends on the distance to the match and not on the
+    length of the line.
+    """
+    size = WINDOW_SIZE
+    while True:
+        window_start = max(low, pos - size)
+        m = pattern.search(line[window_start:pos][::-1])
+        if m is not None:
+            return pos - m.start()
+        if window_start == low:
+            return low
+        size *= 2
@@ -0,0 +1,116 @@
+"""Non-blocking opening of files and URLs outside of Vim.
+
+Desktop handlers can take seconds to return, so they are started detached from
+Vim and waited for by a daemon thread. The threads must not touch the 'vim'
+module: failures are queued and picked up by Vim from a timer, see
+'pop_errors'. The platform opener and the browser are resolved once per session.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import webbrowser
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Deque, List, Optional, Sequence, Tuple
+
+_log = logging.getLogger("vimania-uri_.md.opener")
+
+# failures not yet reported to Vim, the oldest ones are dropped
+MAX_ERRORS = 32
+
+_errors: Deque[str] = deque(maxlen=MAX_ERRORS)
+_lock = threading.Lock()
+_running = 0
+
+
+@lru_cache(maxsize=None)
+def platform_opener() -> Optional[Tuple[str, ...]]:
+    """Command opening a file with its default application, None on Windows"""
+    if sys.platform.startswith("linux"):
+        name = "xdg-open"
+    elif sys.platform.startswith("darwin"):
+        name = "open"
+    else:
+        return None  # os.startfile
+    return (shutil.which(name) or name,)
+
+
+@lru_cache(maxsize=None)
+def browser() -> webbrowser.BaseBrowser:
+    return webbrowser.get()
+
+
+def open_file(fullpath: str) -> None:
+    opener = platform_opener()
+    if opener is None:
+        os.startfile(fullpath)  # doubleclick equivalent, does not wait
+        return
+    launch([*opener, fullpath])
+
+
+def open_url(url: str) -> None:
+    _start(_open_url, url)
+
+
+def launch(args: Sequence[str]) -> None:
+    """Starts 'args' detached from Vim, its exit status is checked in the background"""
+    _log.debug(f"Launching {args=}")
+    proc = subprocess.Popen(
+        args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        start_new_session=True,  # not killed together with Vim
+    )
+    _start(_reap, proc, args)
+
+
+def running() -> int:
+    """Number of launches still in progress"""
+    with _lock:
+        return _running
+
+
+def pop_errors() -> List[str]:
+    """Failures since the last call, oldest first"""
+    errors = []
+    while _errors:
+        errors.append(_errors.popleft())
+    return errors
+
+
+def _start(func: Callable, *args) -> None:
+    global _running
+    with _lock:
+        _running += 1
+    thread = threading.Thread(
+        target=_run, args=(func, *args), name="vimania-opener", daemon=True
+    )
+    thread.start()
+
+
+def _run(func: Callable, *args) -> None:
+    global _running
+    try:
+        func(*args)
+    except Exception as e:
+        _log.warning(f"{func.__name__}{args} failed: {e!r}")
+        _errors.append(str(e))
+    finally:
+        with _lock:
+            _running -= 1
+
+
+def _reap(proc: subprocess.Popen, args: Sequence[str]) -> None:
+    _, stderr = proc.communicate()
+    if proc.returncode != 0:
+        detail = stderr.decode(errors="replace").strip()
+        raise OSError(f"{' '.join(args)} exited with {proc.returncode}: {detail}")
+
+
+def _open_url(url: str) -> None:
+    if not browser().open_new_tab(url):
+        raise OSError(f"No browser could open {url}")
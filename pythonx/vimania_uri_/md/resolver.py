@@ -0,0 +1,65 @@
+"""Resolution of link targets to absolute, normalized paths.
+
+Expanding environment variables and '~' and making the path absolute is
+memoized per (base directory, raw target), the base directory of paths
+without one is the working directory at the time of the call. Targets without
+variables are normalized for the key as well, so 'a/../b.md' and 'b.md' share
+an entry. A memoized path is used as long as the environment variables it was
+expanded with keep their values.
+"""
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+ENV_VAR_PATTERN = re.compile(r"\$(\w+|\{[^}]*\})")
+
+
+@dataclass(frozen=True)
+class _Resolution:
+    fullpath: str
+    env: Tuple[Optional[str], ...]  # values of the variables used by the target
+
+
+class PathResolver:
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._resolutions: Dict[Tuple[str, str], _Resolution] = {}
+
+    def resolve(self, path: str, base_dir: str | None = None) -> str:
+        """Absolute path, relative paths are relative to base_dir or the working dir"""
+        # the working directory changes with ':cd'
+        key = (os.getcwd() if base_dir is None else base_dir, self._key_path(path))
+        env = self._env_values(path)
+        resolution = self._resolutions.get(key)
+        if resolution is not None and resolution.env == env:
+            return resolution.fullpath
+
+        p = Path(os.path.expandvars(path)).expanduser()
+        if base_dir is not None and not p.is_absolute():
+            p = Path(base_dir) / p
+        # '..' is collapsed, Vim names buffers by the normalized path
+        fullpath = os.path.normpath(p.absolute())
+        resolution = _Resolution(fullpath=fullpath, env=env)
+        if len(self._resolutions) >= self.max_entries:
+            self._resolutions.clear()
+        self._resolutions[key] = resolution
+        return resolution.fullpath
+
+    @staticmethod
+    def _key_path(path: str) -> str:
+        # '$VAR/..' or '~/..' can only be collapsed after the expansion
+        if path.startswith("~") or ENV_VAR_PATTERN.search(path):
+            return path
+        return os.path.normpath(path)
+
+    @staticmethod
+    def _env_values(path: str) -> Tuple[Optional[str], ...]:
+        names = [name.strip("{}") for name in ENV_VAR_PATTERN.findall(path)]
+        if path.startswith("~"):
+            names.append("HOME")
+        return tuple(os.environ.get(name) for name in names)
+
+
+PATH_RESOLVER = PathResolver()
@@ -85,12 +85,14 @@ class MatchEnum(IntEnum):
 URL_PATTERN = re.compile(
     r"((https?):((//)|(\\\\))+([\w\d:#@%/;$()~_?\+-=\\\.&](#!)?)*)", re.DOTALL
 )
+# characters which can not be part of a URL_PATTERN match ('!' only in '#!')
+URL_BOUNDARY_PATTERN = re.compile(r"[^\w\d:#@%/;$()~_?\+-=\\\.&!]")
 MD_LINK_PATTERN = re.compile(
     r"\[([^\]]+)\]\(([^\)]+)\)", re.DOTALL
 )  # not used currently but tested
+# not anchored, applied at the start of the link: LINK_PATTERN.match(line, start)
 LINK_PATTERN = re.compile(
     r"""
-    ^
     (?P<link>
         \[                      # start of link text
             (?P<text>[^\]]*)    # link text
@@ -109,15 +111,13 @@ LINK_PATTERN = re.compile(
             \]
         )
     )
-    .*                  # any non matching characters
-    $
 """,
     re.VERBOSE,
 )
 REFERENCE_DEFINITION_PATTERN = re.compile(
     r"""
     ^
-        \[[^\]]*\]:             # reference def at start of line
+        \[(?P<label>[^\]]*)\]:  # reference def at start of line
         (?P<link>.*)            # interpret everything else as link text
     $
 """,
@@ -0,0 +1,113 @@
+"""On-demand profiling of plugin commands.
+
+While enabled by 'g:vimania_uri_rs_profile' or '$VIMANIA_URI_PROFILE', every
+invocation of a profiled entry point writes a capture into the profile
+directory: '<stamp>-<command>.prof' with the cProfile stats (open it with
+'python -m pstats' or snakeviz) and '<stamp>-<command>.json' with the wall
+time and the Rust title fetching phases which ran during the invocation.
+Only the newest MAX_CAPTURES captures are kept.
+"""
+import cProfile
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+_log = logging.getLogger("vimania-uri_.profiling")
+
+ENV_VAR = "VIMANIA_URI_PROFILE"
+DIR_ENV_VAR = "VIMANIA_URI_PROFILE_DIR"
+MAX_CAPTURES = 50
+
+
+def default_dir() -> Path:
+    """'profiles' in '$XDG_CACHE_HOME/vimania-uri-rs' or '~/.cache/vimania-uri-rs'"""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "vimania-uri-rs" / "profiles"
+
+
+def capture_dir(flag: str = "", directory: str = "") -> Optional[Path]:
+    """Directory of the captures, None while profiling is disabled
+
+    Profiling is enabled by a non-zero number in 'flag' (the Vim setting) or in
+    the environment variable, a Vim directory takes precedence over the variable.
+    """
+    if not any(_is_on(f) for f in (flag, os.environ.get(ENV_VAR, ""))):
+        return None
+    directory = directory or os.environ.get(DIR_ENV_VAR, "")
+    return Path(directory).expanduser() if directory else default_dir()
+
+
+def _is_on(flag: str) -> bool:
+    flag = str(flag).strip()
+    return flag.isdigit() and int(flag) != 0
+
+
+def run(
+    name: str,
+    func: Callable,
+    *args,
+    directory: Path,
+    rust_phases: Optional[Callable[[], Dict[str, dict]]] = None,
+    **kwargs,
+):
+    """Calls 'func' under cProfile and writes a capture, also if it raises"""
+    before = _read_phases(rust_phases)
+    profiler = cProfile.Profile()
+    start = time.perf_counter_ns()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        elapsed_ns = time.perf_counter_ns() - start
+        capture = {
+            "command": name,
+            "elapsed_ms": elapsed_ns / 1e6,
+            "rust_phases": _phase_delta(before, _read_phases(rust_phases)),
+        }
+        try:
+            _write(directory, name, profiler, capture)
+        except OSError as e:
+            _log.warning(f"Cannot write profile of {name} to {directory}: {e}")
+
+
+def _read_phases(rust_phases) -> Dict[str, dict]:
+    if rust_phases is None:
+        return {}
+    try:
+        return rust_phases()
+    except Exception as e:
+        _log.debug(f"No Rust phases: {e!r}")
+        return {}
+
+
+def _phase_delta(before: Dict[str, dict], after: Dict[str, dict]) -> Dict[str, dict]:
+    """Count and total time of the samples recorded in between"""
+    delta = {}
+    for phase, histogram in after.items():
+        previous = before.get(phase, {})
+        count = histogram["count"] - previous.get("count", 0)
+        if count > 0:
+            sum_us = histogram["sum_us"] - previous.get("sum_us", 0)
+            delta[phase] = {"count": count, "sum_ms": sum_us / 1000}
+    return delta
+
+
+def _write(directory: Path, name: str, profiler: cProfile.Profile, capture: dict):
+    directory.mkdir(parents=True, exist_ok=True)
+    now = time.time()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    stem = directory / f"{stamp}-{int(now * 1000) % 1000:03d}-{name}"
+    profiler.dump_stats(stem.with_suffix(".prof"))
+    stem.with_suffix(".json").write_text(json.dumps(capture, indent=2))
+    _log.debug(f"Profile of {name} written to {stem}.prof")
+    rotate(directory)
+
+
+def rotate(directory: Path, keep: int = MAX_CAPTURES) -> None:
+    """Removes all but the newest 'keep' captures, names sort by time"""
+    captures = sorted(directory.glob("*.prof"))
+    for prof in captures[: max(len(captures) - keep, 0)]:
+        prof.unlink(missing_ok=True)
+        prof.with_suffix(".json").unlink(missing_ok=True)
@@ -0,0 +1,127 @@
+"""Latency histograms of the hot paths.
+
+Always on: a sample costs two clock reads and a few additions. Durations are
+counted in buckets of powers of two microseconds like the title fetching
+phases of 'vimania_uri_rs.title_stats', bucket i holds samples below 2**i µs,
+so both are reported together by ':VimaniaStats'.
+"""
+import json
+import logging
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+_log = logging.getLogger("vimania-uri_.stats")
+
+BUCKETS = 32
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class Histogram:
+    count: int = 0
+    sum_us: int = 0
+    min_us: int = 0
+    max_us: int = 0
+    buckets: List[int] = field(default_factory=lambda: [0] * BUCKETS)
+
+    def record(self, us: int) -> None:
+        self.min_us = us if self.count == 0 else min(self.min_us, us)
+        self.max_us = max(self.max_us, us)
+        self.count += 1
+        self.sum_us += us
+        self.buckets[min(us.bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, q: float) -> int:
+        """Upper bound of the bucket holding the q-th percentile, at most max_us"""
+        rank = self.count * q / 100
+        seen = 0
+        for idx, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(2**idx, self.max_us)
+        return self.max_us
+
+    def summary(self) -> Dict[str, int]:
+        summary = {
+            "count": self.count,
+            "mean_us": self.sum_us // self.count if self.count else 0,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+        }
+        summary.update({f"p{q}_us": self.percentile(q) for q in PERCENTILES})
+        return summary
+
+
+_HISTOGRAMS: Dict[str, Histogram] = {}
+
+
+def record(phase: str, elapsed_ns: int) -> None:
+    histogram = _HISTOGRAMS.get(phase)
+    if histogram is None:
+        histogram = _HISTOGRAMS[phase] = Histogram()
+    histogram.record(elapsed_ns // 1000)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter_ns() - start)
+
+
+def snapshot() -> Dict[str, Histogram]:
+    return dict(_HISTOGRAMS)
+
+
+def reset() -> None:
+    _HISTOGRAMS.clear()
+
+
+def report(rust: Optional[Dict[str, dict]] = None) -> dict:
+    """Histograms and summaries of the Python and Rust phases with machine info"""
+    phases = {"python": snapshot()}
+    if rust is not None:
+        phases["rust"] = {phase: Histogram(**h) for phase, h in rust.items()}
+    return {
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.machine(),
+            "python": sys.version.split()[0],
+        },
+        **{
+            side: {
+                phase: {**histogram.summary(), "histogram": asdict(histogram)}
+                for phase, histogram in sorted(histograms.items())
+            }
+            for side, histograms in phases.items()
+        },
+    }
+
+
+def to_json(stats: dict) -> str:
+    return json.dumps(stats, indent=2)
+
+
+def format_report(stats: dict) -> List[str]:
+    """Table of the summaries, times in milliseconds"""
+    columns = ["count", "mean_us", "p50_us", "p90_us", "p99_us", "max_us"]
+    header = f"{'phase':<28}" + "".join(
+        f"{column.replace('_us', ''):>10}" for column in columns
+    )
+    lines = [f"{key}: {value}" for key, value in stats["machine"].items()]
+    for side in ("python", "rust"):
+        if side not in stats:
+            continue
+        lines += ["", f"{side} (ms)", header]
+        for phase, summary in stats[side].items():
+            cells = [f"{summary['count']:>10}"] + [
+                f"{summary[column] / 1000:>10.3f}" for column in columns[1:]
+            ]
+            lines.append(f"{phase:<28}" + "".join(cells))
+    return lines
@@ -1,4 +1,6 @@
+import json
 import logging
+import time
 import traceback
 import vimania_uri_rs  # must be after logging setup
 from functools import wraps
@@ -6,7 +8,8 @@ from pathlib import Path
 from pprint import pprint
 from typing import Dict, Tuple
 
-from vimania_uri_ import md
+from vimania_uri_ import md, profiling, stats
+from vimania_uri_.md import opener
 from vimania_uri_.exception import VimaniaException
 from vimania_uri_.pattern import URL_PATTERN
 from vimania_uri_.vim_ import vim_helper
@@ -16,6 +19,7 @@ from vimania_uri_.vim_ import vim_helper
 _log = logging.getLogger("vimania-uri_.vimania_manager")
 _log.propagate = True  # Ensure logs propagate to root logger
 ROOT_DIR = Path(__file__).parent.absolute()
+UNKNOWN_URL_TITLE = "UNKNOWN_URL_TITLE"
 
 try:
     # import vim  # relevant for debugging, but gives error when run with main
@@ -73,6 +77,30 @@ def warn_to_scratch_buffer(func):
     return wrapper
 
 
+def profiled(func):
+    """Decorator that records a profile of every call of 'func' into the profile
+    directory while 'g:vimania_uri_rs_profile' or '$VIMANIA_URI_PROFILE' is set."""
+
+    @wraps(func)
+    def wrapper(*args, **kwds):
+        directory = profiling.capture_dir(
+            vim.eval("get(g:, 'vimania_uri_rs_profile', '')"),
+            vim.eval("get(g:, 'vimania_uri_rs_profile_dir', '')"),
+        )
+        if directory is None:
+            return func(*args, **kwds)
+        return profiling.run(
+            func.__name__,
+            func,
+            *args,
+            directory=directory,
+            rust_phases=lambda: json.loads(vimania_uri_rs.title_stats()),
+            **kwds,
+        )
+
+    return wrapper
+
+
 class VimaniaUriManager:
     def __init__(
         self,
@@ -105,29 +133,51 @@ class VimaniaUriManager:
 
     @err_to_scratch_buffer
     @warn_to_scratch_buffer
+    @profiled
     def call_handle_md2(self):
         return_message = ""
 
         row, col = vim.current.window.cursor
         cursor = (row - 1, col)
-        lines = vim.current.buffer
+        buffer = vim.current.buffer
 
-        current_file = Path(vim.eval("expand('%:p')"))
-        home_dir = Path.home()
-        current_file = current_file.relative_to(home_dir)
+        # relative links are relative to the file, not to the working dir
+        current_file = vim.eval("expand('%:p')") or None
 
-        target = md.parse_line(cursor, lines)
+        with stats.timed("parse_line"):
+            target = md.parse_line(
+                cursor, buffer, resolve=md.resolve_in_current_buffer
+            )
         _log.warning(f"open {target=} from {current_file=}")
 
-        action = md.open_uri(
-            target,
-            open_in_vim_extensions=self.extensions,
-            current_file=current_file,
-        )
-        action()
+        with stats.timed("open_uri"):
+            action = md.open_uri(
+                target,
+                open_in_vim_extensions=self.extensions,
+                current_file=current_file,
+            )
+        with stats.timed(f"action.{type(action).__name__}"):
+            action()
         if return_message != "":
             vim.command(f"echom '{return_message}'")
 
+    @staticmethod
+    def poll_openers() -> int:
+        """Reports failures of background openers, returns 1 once none is running.
+
+        Not wrapped with 'err_to_scratch_buffer': it is called from a repeating
+        timer, which would open a scratch buffer on every tick.
+        """
+        for error in opener.pop_errors():
+            _log.warning(f"Opening failed: {error}")
+            error = error.replace("'", "''")
+            vim.command(f"echohl ErrorMsg | echom 'vimania: {error}' | echohl None")
+        return int(opener.running() == 0)
+
+    @staticmethod
+    def drop_buffer_index(number: int):
+        md.drop_buffer_index(int(number))
+
     @staticmethod
     @err_to_scratch_buffer
     def debug():
@@ -145,6 +195,7 @@ class VimaniaUriManager:
 
     @staticmethod
     @err_to_scratch_buffer
+    @profiled
     def edit_vimania(args: str):
         """Edits text files and jumps to first position of pattern
         pattern is extracted via separator: '#'
@@ -161,9 +212,12 @@ class VimaniaUriManager:
 
     @staticmethod
     @err_to_scratch_buffer
-    def get_url_title(url: str):
+    @profiled
+    def get_url_title(url: str, force: bool = False):
         """Edits text files and jumps to first position of pattern
         pattern is extracted via separator: '#'
+
+        'force' bypasses the title cache and the back-off of failed URLs/hosts.
         """
         m = URL_PATTERN.match(url)
         if m is None:
@@ -172,12 +226,93 @@ class VimaniaUriManager:
         assert isinstance(url, str), f"Error: input must be string, got {type(url)}."
         # _log.debug(f"{url=}")
         try:
-            title = vimania_uri_rs.get_url_title(url)
-            # https://stackoverflow.com/a/27324622
-            title = title.replace("'", "''")
-            _log.debug(f"{title=}")
-            vim.command(f"let g:vimania_url_title = '{str(title)}'")
+            with stats.timed("get_url_title"):
+                title = vimania_uri_rs.get_url_title(url, force=bool(force))
+            _set_url_title(title)
         except Exception as e:
             _log.warning(f"Invalid URL: {url=}, {e=}")
-            vim.command("let g:vimania_url_title = 'UNKNOWN_URL_TITLE'")
+            _set_url_title(UNKNOWN_URL_TITLE)
             # vim.command(f"echom 'Invalid URL: {url=}'")
+
+    @staticmethod
+    @err_to_scratch_buffer
+    def submit_url_title(url: str) -> int:
+        """Starts fetching the title in the background, returns a handle for
+        'poll_url_title'. Vim polls the handle from a timer instead of blocking.
+        """
+        assert isinstance(url, str), f"Error: input must be string, got {type(url)}."
+        return vimania_uri_rs.submit_url_title(url)
+
+    @staticmethod
+    def poll_url_title(handle: int) -> int:
+        """Returns 1 and sets g:vimania_url_title once the title job is finished,
+        0 while it is still running.
+
+        Not wrapped with 'err_to_scratch_buffer': it is called from a repeating
+        timer, which would open a scratch buffer on every tick.
+        """
+        try:
+            status, value = vimania_uri_rs.poll_url_title(int(handle))
+        except Exception as e:
+            _log.warning(f"Polling title job {handle} failed: {e=}")
+            _set_url_title(UNKNOWN_URL_TITLE)
+            return 1
+        if status == "pending":
+            return 0
+        if status == "done":
+            _set_url_title(value)
+        else:
+            _log.warning(f"Title job {handle} failed: {value}")
+            _set_url_title(UNKNOWN_URL_TITLE)
+        return 1
+
+    @staticmethod
+    def cancel_url_title(handle: int) -> int:
+        return int(vimania_uri_rs.cancel_url_title(int(handle)))
+
+    @staticmethod
+    @err_to_scratch_buffer
+    def show_stats(path: str = "", reset: bool = False):
+        """Shows the latency histograms of the hot paths in a scratch buffer or
+        writes them as JSON to 'path', for comparison across machines.
+        """
+        rust = json.loads(vimania_uri_rs.title_stats(reset=bool(reset)))
+        report = stats.report(rust)
+        if reset:
+            stats.reset()
+        if path:
+            Path(path).expanduser().write_text(stats.to_json(report))
+            path = path.replace("'", "''")
+            vim.command(f"echom 'Stats written to {path}'")
+        else:
+            vim_helper.new_scratch_buffer("\n".join(stats.format_report(report)))
+
+    @staticmethod
+    @err_to_scratch_buffer
+    def show_trace(clear: bool = True):
+        """Shows the log events recorded by the Rust extension in a scratch buffer"""
+        lines = []
+        for timestamp, level, target, thread, message in vimania_uri_rs.dump_trace(
+            clear=bool(clear)
+        ):
+            stamp = time.strftime("%H:%M:%S", time.localtime(timestamp))
+            millis = int(timestamp * 1000) % 1000
+            lines.append(
+                f"{stamp}.{millis:03d} {level:<5} {target} [{thread or '-'}] {message}"
+            )
+        vim_helper.new_scratch_buffer("\n".join(lines) or "No trace events recorded")
+
+    @staticmethod
+    @err_to_scratch_buffer
+    def warm_up() -> int:
+        """Builds the HTTP client in the background, so the first title fetch of
+        the session does not pay for it.
+        """
+        return int(vimania_uri_rs.warm_up())
+
+
+def _set_url_title(title: str) -> None:
+    # https://stackoverflow.com/a/27324622
+    title = title.replace("'", "''")
+    _log.debug(f"{title=}")
+    vim.command(f"let g:vimania_url_title = '{str(title)}'")
@@ -0,0 +1,225 @@
+//! Heading anchors of files which are not loaded into Vim.
+//!
+//! Links like `other.md#section` used to open the file in Vim and scan the
+//! buffer afterwards. The file is scanned here instead, so Vim can open it at
+//! the line of the anchor right away. Anchors follow `JumpToAnchor` in
+//! `mdnav.py`: heading titles without punctuation, lowercased and joined by
+//! `-`, matched as prefix, or the exact id of an attr-list `{: #id }`.
+//! Scans are cached by path and modification time.
+
+use log::debug;
+use once_cell::sync::Lazy;
+use std::collections::HashMap;
+use std::fs::{self, File};
+use std::io::{self, BufRead, BufReader};
+use std::path::{Path, PathBuf};
+use std::sync::{Arc, Mutex, MutexGuard};
+use std::time::SystemTime;
+
+/// The cache is cleared when it holds more files
+const MAX_CACHED_FILES: usize = 256;
+
+/// `string.punctuation` without `-`
+const PUNCTUATION: &str = "!\"#$%&'()*+,./:;<=>?@[\\]^_`{|}~";
+
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub struct LineAnchors {
+    /// 0-based line index
+    pub line: usize,
+    pub heading: Option<String>,
+    pub id: Option<String>,
+}
+
+struct Scan {
+    modified: SystemTime,
+    len: u64,
+    anchors: Arc<Vec<LineAnchors>>,
+}
+
+static SCANS: Lazy<Mutex<HashMap<PathBuf, Scan>>> = Lazy::new(|| Mutex::new(HashMap::new()));
+
+fn scans() -> MutexGuard<'static, HashMap<PathBuf, Scan>> {
+    SCANS.lock().unwrap_or_else(|e| e.into_inner())
+}
+
+/// 1-based line number of `anchor` in the file at `path`, `None` if it has no such anchor
+pub fn find_anchor_line(path: &Path, anchor: &str) -> io::Result<Option<usize>> {
+    let anchors = file_anchors(path)?;
+    Ok(find(&anchors, &norm_target(anchor)).map(|line| line + 1))
+}
+
+/// First line with a heading anchor starting with `needle` or the attr-list id `needle`
+pub fn find(anchors: &[LineAnchors], needle: &str) -> Option<usize> {
+    anchors
+        .iter()
+        .find(|anchors| {
+            anchors
+                .heading
+                .as_deref()
+                .is_some_and(|heading| heading.starts_with(needle))
+                || anchors.id.as_deref() == Some(needle)
+        })
+        .map(|anchors| anchors.line)
+}
+
+fn file_anchors(path: &Path) -> io::Result<Arc<Vec<LineAnchors>>> {
+    let metadata = fs::metadata(path)?;
+    let modified = metadata.modified()?;
+    if let Some(scan) = scans().get(path) {
+        if scan.modified == modified && scan.len == metadata.len() {
+            return Ok(Arc::clone(&scan.anchors));
+        }
+    }
+
+    debug!("Scanning {} for anchors", path.display());
+    let anchors = Arc::new(scan_anchors(BufReader::new(File::open(path)?))?);
+    let mut scans = scans();
+    if scans.len() >= MAX_CACHED_FILES && !scans.contains_key(path) {
+        scans.clear();
+    }
+    scans.insert(
+        path.to_path_buf(),
+        Scan {
+            modified,
+            len: metadata.len(),
+            anchors: Arc::clone(&anchors),
+        },
+    );
+    Ok(anchors)
+}
+
+/// Anchors of all lines which define one
+pub fn scan_anchors<R: BufRead>(mut reader: R) -> io::Result<Vec<LineAnchors>> {
+    let mut anchors = Vec::new();
+    let mut buf = Vec::new();
+    let mut line = 0;
+    loop {
+        buf.clear();
+        if reader.read_until(b'\n', &mut buf)? == 0 {
+            break;
+        }
+        // line endings as stripped by Vim
+        let bytes = buf.strip_suffix(b"\n").unwrap_or(&buf);
+        let bytes = bytes.strip_suffix(b"\r").unwrap_or(bytes);
+
+        // cheap checks first, most lines define no anchor
+        let is_heading = bytes.first() == Some(&b'#');
+        if is_heading || bytes.windows(2).any(|w| w == b"{:") {
+            let text = String::from_utf8_lossy(bytes);
+            let heading = is_heading.then(|| title_to_anchor(text.trim_start_matches('#')));
+            let id = attr_list_id(&text);
+            if heading.is_some() || id.is_some() {
+                anchors.push(LineAnchors { line, heading, id });
+            }
+        }
+        line += 1;
+    }
+    Ok(anchors)
+}
+
+/// `JumpToAnchor.title_to_anchor`
+pub fn title_to_anchor(title: &str) -> String {
+    title
+        .chars()
+        .filter(|c| !PUNCTUATION.contains(*c))
+        .collect::<String>()
+        .split(is_py_space)
+        .filter(|fragment| !fragment.is_empty())
+        .map(|fragment| fragment.to_lowercase())
+        .collect::<Vec<_>>()
+        .join("-")
+}
+
+/// `JumpToAnchor.norm_target`: anchors and headings are both accepted
+pub fn norm_target(target: &str) -> String {
+    title_to_anchor(target.strip_prefix('#').unwrap_or(target))
+}
+
+/// Id of the first attr-list `{:\s+#(?P<id>\S+)\s` in `line`
+fn attr_list_id(line: &str) -> Option<String> {
+    line.match_indices("{:").find_map(|(idx, _)| {
+        let rest = &line[idx + 2..];
+        let after_space = rest.trim_start_matches(is_py_space);
+        if after_space.len() == rest.len() {
+            return None;
+        }
+        let id_and_rest = after_space.strip_prefix('#')?;
+        let end = id_and_rest.find(is_py_space)?;
+        (end > 0).then(|| id_and_rest[..end].to_string())
+    })
+}
+
+/// Whitespace as matched by Python's `str.split()` and `\s`
+fn is_py_space(c: char) -> bool {
+    c.is_whitespace() || ('\x1c'..='\x1f').contains(&c)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::process;
+
+    #[test]
+    fn test_title_to_anchor() {
+        let cases = [
+            (" foo", "foo"),
+            ("  Foo  BAR  Baz", "foo-bar-baz"),
+            (
+                " Battle of the datacontainers, Serialization",
+                "battle-of-the-datacontainers-serialization",
+            ),
+            (" a_b (c) - d", "ab-c---d"),
+            (" Ünïcode Heading", "ünïcode-heading"),
+        ];
+        for (title, expected) in cases {
+            assert_eq!(title_to_anchor(title), expected, "{:?}", title);
+        }
+        assert_eq!(norm_target("#Foo-Bar"), "foo-bar");
+    }
+
+    #[test]
+    fn test_attr_list_id() {
+        let cases = [
+            ("### Foo Bar Baz {: #hello-world } ", Some("hello-world")),
+            ("{:#no-space }", None),
+            ("{: #at-end", None),
+            ("{: x} {:\t#second }", Some("second")),
+            ("no attr list", None),
+        ];
+        for (line, expected) in cases {
+            assert_eq!(attr_list_id(line).as_deref(), expected, "{:?}", line);
+        }
+    }
+
+    #[test]
+    fn test_find() {
+        let text = "a\r\n# hello world\r\n### Foo Bar Baz {: #hello-world } \n## Foo\n#";
+        let anchors = scan_anchors(text.as_bytes()).unwrap();
+        assert_eq!(anchors.len(), 4);
+        let cases = [
+            ("#hello-world", Some(1)),
+            ("#foo", Some(2)),
+            ("Foo Bar", Some(2)),
+            ("#foo-bar-baz", Some(2)),
+            ("#missing", None),
+        ];
+        for (target, expected) in cases {
+            assert_eq!(find(&anchors, &norm_target(target)), expected, "{}", target);
+        }
+    }
+
+    #[test]
+    fn test_find_anchor_line() {
+        let path = std::env::temp_dir().join(format!("vimania-anchors-{}.md", process::id()));
+        fs::write(&path, "text\n## Section One\n").unwrap();
+        assert_eq!(find_anchor_line(&path, "#section-one").unwrap(), Some(2));
+
+        // a changed file is scanned again
+        fs::write(&path, "text\nmore text\n## Section One\n").unwrap();
+        assert_eq!(find_anchor_line(&path, "#section-one").unwrap(), Some(3));
+        assert_eq!(find_anchor_line(&path, "#section-two").unwrap(), None);
+
+        fs::remove_file(&path).unwrap();
+        assert!(find_anchor_line(&path, "#section-one").is_err());
+    }
+}
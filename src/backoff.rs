@@ -0,0 +1,184 @@
+//! Negative caching of failed title fetches.
+//!
+//! Every failure of a URL doubles the time until it is tried again, starting
+//! at the configured base delay and capped at the maximum delay. Hosts which
+//! cannot be reached at all (connect errors, timeouts) are backed off as a
+//! whole, so links to other pages of a dead host fail right away as well.
+//! The state lives in memory only and is reset by any successful fetch.
+
+use log::debug;
+use once_cell::sync::Lazy;
+use std::collections::HashMap;
+use std::sync::{Mutex, MutexGuard};
+use std::time::{Duration, Instant};
+
+use crate::settings::Settings;
+use crate::UriError;
+
+#[derive(Debug, Clone)]
+struct Failure {
+    count: u32,
+    retry_at: Instant,
+    error: String,
+}
+
+#[derive(Debug, Default)]
+struct Failures {
+    urls: HashMap<String, Failure>,
+    hosts: HashMap<String, Failure>,
+}
+
+static FAILURES: Lazy<Mutex<Failures>> = Lazy::new(|| Mutex::new(Failures::default()));
+
+fn failures() -> MutexGuard<'static, Failures> {
+    FAILURES.lock().unwrap_or_else(|e| e.into_inner())
+}
+
+/// Fails with `UriError::BackedOff` while the URL or its host is backed off
+pub fn check(key: &str, host: &str) -> Result<(), UriError> {
+    let now = Instant::now();
+    let failures = failures();
+    let failure = failures
+        .urls
+        .get(key)
+        .into_iter()
+        .chain(failures.hosts.get(host))
+        .filter(|failure| failure.retry_at > now)
+        .max_by_key(|failure| failure.retry_at);
+    match failure {
+        Some(failure) => Err(UriError::BackedOff {
+            error: failure.error.clone(),
+            retry_in: failure.retry_at - now,
+        }),
+        None => Ok(()),
+    }
+}
+
+/// Remember a failed fetch, errors which are no property of the URL are ignored
+pub fn record_failure(key: &str, host: &str, error: &UriError, settings: &Settings) {
+    let host_down = match error {
+        UriError::HttpError(e) => e.is_connect() || e.is_timeout(),
+        UriError::HttpStatus(status) => status.is_server_error(),
+        UriError::IoError(_) | UriError::HtmlError(_) => false,
+        // invalid URLs fail fast anyway, deadlines depend on the caller
+        _ => return,
+    };
+    if settings.backoff_base.is_zero() {
+        return;
+    }
+    let mut failures = failures();
+    register(&mut failures.urls, key, error, settings);
+    if host_down {
+        register(&mut failures.hosts, host, error, settings);
+    }
+}
+
+/// Forget all failures of the URL and its host
+pub fn record_success(key: &str, host: &str) {
+    let mut failures = failures();
+    failures.urls.remove(key);
+    failures.hosts.remove(host);
+}
+
+fn register(map: &mut HashMap<String, Failure>, name: &str, error: &UriError, settings: &Settings) {
+    let now = Instant::now();
+    // expired entries only matter for the failure count of the same name
+    map.retain(|other, failure| other == name || failure.retry_at + settings.backoff_max > now);
+    let count = map.get(name).map_or(0, |failure| failure.count) + 1;
+    let delay = backoff_delay(count, settings.backoff_base, settings.backoff_max);
+    debug!(
+        "Backing off {} for {:?} after {} failures",
+        name, delay, count
+    );
+    map.insert(
+        name.to_string(),
+        Failure {
+            count,
+            retry_at: now + delay,
+            error: error.to_string(),
+        },
+    );
+}
+
+/// `base * 2^(count - 1)`, at most `max`
+fn backoff_delay(count: u32, base: Duration, max: Duration) -> Duration {
+    base.checked_mul(1 << count.saturating_sub(1).min(20))
+        .unwrap_or(max)
+        .min(max)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn settings() -> Settings {
+        Settings {
+            backoff_base: Duration::from_secs(60),
+            backoff_max: Duration::from_secs(3600),
+            ..Settings::default()
+        }
+    }
+
+    #[test]
+    fn test_backoff_delay() {
+        let (base, max) = (Duration::from_secs(30), Duration::from_secs(3600));
+        assert_eq!(backoff_delay(1, base, max), base);
+        assert_eq!(backoff_delay(2, base, max), base * 2);
+        assert_eq!(backoff_delay(4, base, max), base * 8);
+        assert_eq!(backoff_delay(100, base, max), max);
+    }
+
+    #[test]
+    fn test_url_backoff() {
+        let (key, host) = ("https://backoff-url.test/", "backoff-url.test");
+        assert!(check(key, host).is_ok());
+
+        let error = UriError::HtmlError("No title element found".to_string());
+        record_failure(key, host, &error, &settings());
+        match check(key, host) {
+            Err(UriError::BackedOff { error, retry_in }) => {
+                assert!(error.contains("No title element found"));
+                assert!(retry_in <= Duration::from_secs(60));
+            }
+            result => panic!("unexpected result: {:?}", result),
+        }
+        // parse errors do not take the whole host down
+        assert!(check("https://backoff-url.test/other", host).is_ok());
+
+        record_success(key, host);
+        assert!(check(key, host).is_ok());
+    }
+
+    #[test]
+    fn test_http_status_backoff() {
+        let (key, host) = ("https://backoff-status.test/", "backoff-status.test");
+        let error = UriError::HttpStatus(reqwest::StatusCode::NOT_FOUND);
+        record_failure(key, host, &error, &settings());
+        assert!(check(key, host).is_err());
+        assert!(check("https://backoff-status.test/other", host).is_ok());
+
+        let error = UriError::HttpStatus(reqwest::StatusCode::SERVICE_UNAVAILABLE);
+        record_failure(key, host, &error, &settings());
+        assert!(check("https://backoff-status.test/other", host).is_err());
+    }
+
+    #[test]
+    fn test_ignores_invalid_urls() {
+        let (key, host) = ("ftp://backoff-invalid.test/", "backoff-invalid.test");
+        let error = UriError::UnsupportedScheme("ftp".to_string());
+        record_failure(key, host, &error, &settings());
+        assert!(check(key, host).is_ok());
+    }
+
+    #[test]
+    fn test_disabled() {
+        let (key, host) = ("https://backoff-disabled.test/", "backoff-disabled.test");
+        let settings = Settings {
+            backoff_base: Duration::ZERO,
+            ..settings()
+        };
+        let error = UriError::HtmlError("No title element found".to_string());
+        record_failure(key, host, &error, &settings);
+        assert!(check(key, host).is_ok());
+    }
+}
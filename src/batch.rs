@@ -0,0 +1,93 @@
+//! Concurrent title fetching for many URLs at once.
+
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::Mutex;
+use std::thread;
+use std::time::{Duration, Instant};
+
+use crate::{cached_url_title, UriError, REQUEST_TIMEOUT};
+
+/// Fetch the titles of `urls` on at most `max_concurrency` worker threads
+///
+/// Workers pick the next pending URL until all are done, so one slow host
+/// does not hold back the others. Results are returned in input order.
+/// URLs which cannot be finished before `deadline` fail with
+/// `UriError::DeadlineExceeded`, running requests are cut off at the deadline.
+pub fn fetch_titles(
+    urls: &[String],
+    max_concurrency: usize,
+    deadline: Option<Instant>,
+) -> Vec<Result<String, UriError>> {
+    let next = AtomicUsize::new(0);
+    let results: Vec<Mutex<Option<Result<String, UriError>>>> =
+        urls.iter().map(|_| Mutex::new(None)).collect();
+    let workers = max_concurrency.clamp(1, urls.len().max(1));
+
+    thread::scope(|scope| {
+        for _ in 0..workers {
+            scope.spawn(|| loop {
+                let idx = next.fetch_add(1, Ordering::Relaxed);
+                if idx >= urls.len() {
+                    break;
+                }
+                let result = match remaining(deadline) {
+                    Some(timeout) => cached_url_title(&urls[idx], timeout, false),
+                    None => Err(UriError::DeadlineExceeded),
+                };
+                *results[idx].lock().unwrap_or_else(|e| e.into_inner()) = Some(result);
+            });
+        }
+    });
+
+    results
+        .into_iter()
+        .map(|slot| {
+            slot.into_inner()
+                .unwrap_or_else(|e| e.into_inner())
+                .unwrap_or(Err(UriError::DeadlineExceeded))
+        })
+        .collect()
+}
+
+/// Timeout of the next request, `None` if the deadline has passed
+fn remaining(deadline: Option<Instant>) -> Option<Duration> {
+    let Some(deadline) = deadline else {
+        return Some(REQUEST_TIMEOUT);
+    };
+    let left = deadline.saturating_duration_since(Instant::now());
+    if left.is_zero() {
+        None
+    } else {
+        Some(left.min(REQUEST_TIMEOUT))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_results_keep_input_order() {
+        let urls: Vec<String> = ["ftp://example.com", "http://localhost", "not a url"]
+            .iter()
+            .map(|u| u.to_string())
+            .collect();
+        let results = fetch_titles(&urls, 2, None);
+        assert_eq!(results.len(), 3);
+        assert!(matches!(results[0], Err(UriError::UnsupportedScheme(_))));
+        assert!(matches!(results[1], Err(UriError::ForbiddenHost(_))));
+        assert!(matches!(results[2], Err(UriError::InvalidUrl(_))));
+    }
+
+    #[test]
+    fn test_deadline_exceeded() {
+        let urls = vec!["https://www.rust-lang.org/".to_string()];
+        let results = fetch_titles(&urls, 4, Some(Instant::now()));
+        assert!(matches!(results[0], Err(UriError::DeadlineExceeded)));
+    }
+
+    #[test]
+    fn test_empty_input() {
+        assert!(fetch_titles(&[], 8, None).is_empty());
+    }
+}
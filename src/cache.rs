@@ -0,0 +1,297 @@
+//! Persistent URL title cache shared by all running Vim instances.
+//!
+//! Every entry is a small JSON file named after a hash of the normalized URL.
+//! Writes go to a temporary file which is atomically renamed into place, so
+//! readers never see partial entries and concurrent writers of the same URL
+//! simply race for the last rename. The file modification time doubles as
+//! LRU timestamp: cache hits touch it and eviction removes the least recently
+//! touched files once the cache grows beyond its size bound.
+
+use log::debug;
+use serde::{Deserialize, Serialize};
+use std::fs;
+use std::io;
+use std::path::{Path, PathBuf};
+use std::process;
+use std::time::{Duration, SystemTime, UNIX_EPOCH};
+use url::Url;
+
+use crate::settings::Settings;
+
+const ENTRY_EXTENSION: &str = "json";
+const TMP_EXTENSION: &str = "tmp";
+/// Temporary files of crashed writers older than this are removed on eviction
+const STALE_TMP_AGE: Duration = Duration::from_secs(60 * 60);
+
+#[derive(Debug, Clone, PartialEq, Serialize, Deserialize)]
+pub struct CacheEntry {
+    pub url: String,
+    pub title: String,
+    /// Seconds since the epoch
+    pub fetched_at: u64,
+    /// Validators of the response for conditional revalidation
+    #[serde(default, skip_serializing_if = "Option::is_none")]
+    pub etag: Option<String>,
+    #[serde(default, skip_serializing_if = "Option::is_none")]
+    pub last_modified: Option<String>,
+}
+
+impl CacheEntry {
+    pub fn new(url: &str, title: &str) -> Self {
+        CacheEntry {
+            url: url.to_string(),
+            title: title.to_string(),
+            fetched_at: now_secs(),
+            etag: None,
+            last_modified: None,
+        }
+    }
+
+    /// The title has just been confirmed by the server
+    pub fn mark_fetched(&mut self) {
+        self.fetched_at = now_secs();
+    }
+
+    pub fn is_fresh(&self, ttl: Duration) -> bool {
+        now_secs().saturating_sub(self.fetched_at) < ttl.as_secs()
+    }
+}
+
+#[derive(Debug, Clone)]
+pub struct TitleCache {
+    dir: PathBuf,
+    max_entries: usize,
+}
+
+impl TitleCache {
+    pub fn new<P: Into<PathBuf>>(dir: P, max_entries: usize) -> Self {
+        TitleCache {
+            dir: dir.into(),
+            max_entries,
+        }
+    }
+
+    pub fn from_settings(settings: &Settings) -> Self {
+        TitleCache::new(
+            settings.cache_dir.join("titles"),
+            settings.cache_max_entries,
+        )
+    }
+
+    /// Look up the entry for `key`, regardless of its age
+    pub fn get(&self, key: &str) -> Option<CacheEntry> {
+        let path = self.entry_path(key);
+        let data = fs::read(&path).ok()?;
+        let entry: CacheEntry = match serde_json::from_slice(&data) {
+            Ok(entry) => entry,
+            Err(e) => {
+                debug!("Ignoring corrupt cache entry {:?}: {}", path, e);
+                return None;
+            }
+        };
+        // guard against hash collisions
+        if entry.url != key {
+            return None;
+        }
+        let _ = touch(&path);
+        Some(entry)
+    }
+
+    pub fn store(&self, entry: &CacheEntry) -> io::Result<()> {
+        fs::create_dir_all(&self.dir)?;
+        let path = self.entry_path(&entry.url);
+        let tmp = path.with_extension(format!(
+            "{}.{}.{}",
+            process::id(),
+            SystemTime::now()
+                .duration_since(UNIX_EPOCH)
+                .unwrap_or_default()
+                .subsec_nanos(),
+            TMP_EXTENSION
+        ));
+        fs::write(&tmp, serde_json::to_vec(entry)?)?;
+        if let Err(e) = fs::rename(&tmp, &path) {
+            let _ = fs::remove_file(&tmp);
+            return Err(e);
+        }
+        self.evict()
+    }
+
+    /// Remove all entries, returns the number of removed entries
+    pub fn clear(&self) -> io::Result<usize> {
+        let mut removed = 0;
+        for (path, _) in self.entries()? {
+            if fs::remove_file(path).is_ok() {
+                removed += 1;
+            }
+        }
+        Ok(removed)
+    }
+
+    /// Drop the least recently used entries beyond `max_entries`
+    fn evict(&self) -> io::Result<()> {
+        let mut entries = self.entries()?;
+        if entries.len() <= self.max_entries {
+            return Ok(());
+        }
+        entries.sort_by_key(|(_, mtime)| *mtime);
+        let excess = entries.len() - self.max_entries;
+        debug!("Evicting {} title cache entries", excess);
+        for (path, _) in entries.into_iter().take(excess) {
+            // another process may have evicted it already
+            let _ = fs::remove_file(path);
+        }
+        Ok(())
+    }
+
+    /// Entry files with their modification time, cleans up stale temporary files
+    fn entries(&self) -> io::Result<Vec<(PathBuf, SystemTime)>> {
+        let read_dir = match fs::read_dir(&self.dir) {
+            Ok(read_dir) => read_dir,
+            Err(e) if e.kind() == io::ErrorKind::NotFound => return Ok(Vec::new()),
+            Err(e) => return Err(e),
+        };
+        let now = SystemTime::now();
+        let mut entries = Vec::new();
+        for dir_entry in read_dir.flatten() {
+            let path = dir_entry.path();
+            let Ok(mtime) = dir_entry.metadata().and_then(|m| m.modified()) else {
+                continue;
+            };
+            match path.extension().and_then(|e| e.to_str()) {
+                Some(ENTRY_EXTENSION) => entries.push((path, mtime)),
+                Some(TMP_EXTENSION) => {
+                    if now.duration_since(mtime).unwrap_or_default() > STALE_TMP_AGE {
+                        let _ = fs::remove_file(path);
+                    }
+                }
+                _ => {}
+            }
+        }
+        Ok(entries)
+    }
+
+    fn entry_path(&self, key: &str) -> PathBuf {
+        self.dir.join(format!(
+            "{:016x}.{}",
+            fnv1a64(key.as_bytes()),
+            ENTRY_EXTENSION
+        ))
+    }
+}
+
+/// Cache key of a URL: the fragment never changes the fetched page
+pub fn normalize_url(url: &Url) -> String {
+    let mut url = url.clone();
+    url.set_fragment(None);
+    url.into()
+}
+
+fn touch(path: &Path) -> io::Result<()> {
+    fs::File::options()
+        .write(true)
+        .open(path)?
+        .set_modified(SystemTime::now())
+}
+
+fn now_secs() -> u64 {
+    SystemTime::now()
+        .duration_since(UNIX_EPOCH)
+        .unwrap_or_default()
+        .as_secs()
+}
+
+/// Stable across processes and Rust versions, unlike `DefaultHasher`
+fn fnv1a64(bytes: &[u8]) -> u64 {
+    bytes.iter().fold(0xcbf2_9ce4_8422_2325, |hash, b| {
+        (hash ^ u64::from(*b)).wrapping_mul(0x0100_0000_01b3)
+    })
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::thread::sleep;
+
+    fn temp_cache(name: &str, max_entries: usize) -> TitleCache {
+        let dir = std::env::temp_dir().join(format!("vimania-cache-{}-{}", name, process::id()));
+        let _ = fs::remove_dir_all(&dir);
+        TitleCache::new(dir, max_entries)
+    }
+
+    #[test]
+    fn test_normalize_url() {
+        let url = Url::parse("HTTPS://Example.COM:443/a/b?q=1#section").unwrap();
+        assert_eq!(normalize_url(&url), "https://example.com/a/b?q=1");
+    }
+
+    #[test]
+    fn test_store_get() {
+        let cache = temp_cache("store-get", 10);
+        assert_eq!(cache.get("https://example.com/"), None);
+
+        cache
+            .store(&CacheEntry::new("https://example.com/", "Example Domain"))
+            .unwrap();
+        let entry = cache.get("https://example.com/").unwrap();
+        assert_eq!(entry.title, "Example Domain");
+        assert!(entry.is_fresh(Duration::from_secs(60)));
+        assert!(!entry.is_fresh(Duration::ZERO));
+
+        cache
+            .store(&CacheEntry::new("https://example.com/", "Example Domain 2"))
+            .unwrap();
+        assert_eq!(
+            cache.get("https://example.com/").unwrap().title,
+            "Example Domain 2"
+        );
+        assert_eq!(cache.clear().unwrap(), 1);
+    }
+
+    #[test]
+    fn test_reads_entries_without_validators() {
+        let cache = temp_cache("validators", 10);
+        fs::create_dir_all(&cache.dir).unwrap();
+        let key = "https://example.com/";
+        fs::write(
+            cache.entry_path(key),
+            r#"{"url":"https://example.com/","title":"Example","fetched_at":0}"#,
+        )
+        .unwrap();
+        let mut entry = cache.get(key).unwrap();
+        assert_eq!(entry.etag, None);
+        assert!(!entry.is_fresh(Duration::from_secs(60)));
+
+        entry.mark_fetched();
+        entry.etag = Some("\"abc\"".to_string());
+        cache.store(&entry).unwrap();
+        let entry = cache.get(key).unwrap();
+        assert_eq!(entry.etag.as_deref(), Some("\"abc\""));
+        assert!(entry.is_fresh(Duration::from_secs(60)));
+        cache.clear().unwrap();
+    }
+
+    #[test]
+    fn test_evicts_least_recently_used() {
+        let cache = temp_cache("evict", 2);
+        cache
+            .store(&CacheEntry::new("https://a.com/", "a"))
+            .unwrap();
+        sleep(Duration::from_millis(20));
+        cache
+            .store(&CacheEntry::new("https://b.com/", "b"))
+            .unwrap();
+        sleep(Duration::from_millis(20));
+        // touch a, so b becomes the least recently used entry
+        assert!(cache.get("https://a.com/").is_some());
+        sleep(Duration::from_millis(20));
+        cache
+            .store(&CacheEntry::new("https://c.com/", "c"))
+            .unwrap();
+
+        assert!(cache.get("https://a.com/").is_some());
+        assert!(cache.get("https://b.com/").is_none());
+        assert!(cache.get("https://c.com/").is_some());
+        cache.clear().unwrap();
+    }
+}
@@ -0,0 +1,363 @@
+//! Titles of links which do not point to HTML pages.
+//!
+//! The response headers decide whether the body is worth reading at all:
+//! downloads, images, archives etc. get their file name as title without
+//! transferring the payload. PDFs are asked for their first bytes only, which
+//! usually contain the document information or XMP metadata with the title.
+
+use log::debug;
+use reqwest::header::{HeaderMap, CONTENT_DISPOSITION, CONTENT_TYPE, RANGE};
+use std::io::Read;
+use std::time::Duration;
+use url::Url;
+
+use crate::{title, HTTP_CLIENT};
+
+/// Bytes of a PDF searched for its title
+const PDF_PROBE_BYTES: usize = 64 * 1024;
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum ContentKind {
+    Html,
+    Pdf,
+    Other,
+}
+
+/// Kind of the response body according to its headers
+///
+/// Responses without `Content-Type` are assumed to be HTML, attachments never are.
+pub fn classify(headers: &HeaderMap) -> ContentKind {
+    let mime = headers
+        .get(CONTENT_TYPE)
+        .and_then(|value| value.to_str().ok())
+        .map(|value| {
+            value
+                .split(';')
+                .next()
+                .unwrap_or_default()
+                .trim()
+                .to_ascii_lowercase()
+        });
+    let attachment = disposition(headers).is_some_and(|value| {
+        value
+            .split(';')
+            .next()
+            .is_some_and(|kind| kind.trim().eq_ignore_ascii_case("attachment"))
+    });
+    match mime.as_deref() {
+        Some("application/pdf") => ContentKind::Pdf,
+        _ if attachment => ContentKind::Other,
+        None | Some("text/html") | Some("application/xhtml+xml") => ContentKind::Html,
+        Some(_) => ContentKind::Other,
+    }
+}
+
+/// File name from `Content-Disposition`, else the last segment of the URL path
+pub fn file_name(url: &Url, headers: &HeaderMap) -> String {
+    disposition(headers)
+        .and_then(disposition_file_name)
+        .or_else(|| {
+            url.path_segments()?
+                .rev()
+                .find(|segment| !segment.is_empty())
+                .map(percent_decode)
+        })
+        .unwrap_or_else(|| url.host_str().unwrap_or_default().to_string())
+}
+
+/// Title of a PDF from its first bytes, falls back to the file name
+///
+/// `timeout` is what is left of the time of the title request, without any left
+/// the file name is returned right away.
+pub fn pdf_title(url: &Url, headers: &HeaderMap, timeout: Duration) -> String {
+    if timeout.is_zero() {
+        debug!("No time left to read PDF metadata of {}", url);
+        return file_name(url, headers);
+    }
+    match fetch_pdf_head(url, timeout) {
+        Ok(head) => {
+            if let Some(title) = parse_pdf_title(&head) {
+                return title;
+            }
+            debug!("No title in the first {} bytes of {}", head.len(), url);
+        }
+        Err(e) => debug!("Failed to read PDF metadata of {}: {}", url, e),
+    }
+    file_name(url, headers)
+}
+
+fn fetch_pdf_head(url: &Url, timeout: Duration) -> Result<Vec<u8>, crate::UriError> {
+    let res = HTTP_CLIENT
+        .get(url.clone())
+        .timeout(timeout)
+        .header(RANGE, format!("bytes=0-{}", PDF_PROBE_BYTES - 1))
+        .send()?;
+    // servers ignoring the range are cut off after the probe size
+    let mut head = Vec::with_capacity(PDF_PROBE_BYTES);
+    res.take(PDF_PROBE_BYTES as u64).read_to_end(&mut head)?;
+    Ok(head)
+}
+
+fn disposition(headers: &HeaderMap) -> Option<&str> {
+    headers.get(CONTENT_DISPOSITION)?.to_str().ok()
+}
+
+/// `filename*=UTF-8''...` wins over `filename="..."`
+fn disposition_file_name(value: &str) -> Option<String> {
+    let params = || {
+        value.split(';').skip(1).filter_map(|param| {
+            let (key, value) = param.split_once('=')?;
+            Some((key.trim().to_ascii_lowercase(), value.trim()))
+        })
+    };
+    params()
+        .find(|(key, _)| key == "filename*")
+        .and_then(|(_, value)| value.split_once("''").map(|(_, name)| percent_decode(name)))
+        .or_else(|| {
+            params()
+                .find(|(key, _)| key == "filename")
+                .map(|(_, value)| value.trim_matches('"').to_string())
+        })
+        .filter(|name| !name.is_empty())
+}
+
+fn percent_decode(text: &str) -> String {
+    let bytes = text.as_bytes();
+    let mut out = Vec::with_capacity(bytes.len());
+    let mut idx = 0;
+    while idx < bytes.len() {
+        let hex = bytes
+            .get(idx + 1..idx + 3)
+            .and_then(|hex| std::str::from_utf8(hex).ok())
+            .and_then(|hex| u8::from_str_radix(hex, 16).ok());
+        match (bytes[idx], hex) {
+            (b'%', Some(byte)) => {
+                out.push(byte);
+                idx += 3;
+            }
+            (byte, _) => {
+                out.push(byte);
+                idx += 1;
+            }
+        }
+    }
+    String::from_utf8_lossy(&out).into_owned()
+}
+
+/// Title from the document information dictionary or the XMP metadata
+pub fn parse_pdf_title(data: &[u8]) -> Option<String> {
+    info_title(data)
+        .or_else(|| xmp_title(data))
+        .map(|title| title.trim().to_string())
+        .filter(|title| !title.is_empty())
+}
+
+fn info_title(data: &[u8]) -> Option<String> {
+    let start = find(data, b"/Title")? + b"/Title".len();
+    let rest = data[start..].trim_ascii_start();
+    match rest.first()? {
+        b'(' => Some(decode_pdf_text(&literal_string(&rest[1..]))),
+        b'<' => {
+            let end = rest.iter().position(|b| *b == b'>')?;
+            let digits: Vec<u8> = rest[1..end]
+                .iter()
+                .copied()
+                .filter(|b| b.is_ascii_hexdigit())
+                .collect();
+            let bytes: Vec<u8> = digits
+                .chunks(2)
+                .filter_map(|pair| {
+                    // an odd final digit is padded with 0
+                    let hex = if pair.len() == 2 {
+                        [pair[0], pair[1]]
+                    } else {
+                        [pair[0], b'0']
+                    };
+                    u8::from_str_radix(std::str::from_utf8(&hex).ok()?, 16).ok()
+                })
+                .collect();
+            Some(decode_pdf_text(&bytes))
+        }
+        _ => None,
+    }
+}
+
+/// Bytes of a literal string, `data` starts after the opening parenthesis
+fn literal_string(data: &[u8]) -> Vec<u8> {
+    let mut out = Vec::new();
+    let mut depth = 0;
+    let mut iter = data.iter().copied().peekable();
+    while let Some(byte) = iter.next() {
+        match byte {
+            b'\\' => match iter.next() {
+                Some(b'n') => out.push(b'\n'),
+                Some(b'r') => out.push(b'\r'),
+                Some(b't') => out.push(b'\t'),
+                Some(b'b') => out.push(0x08),
+                Some(b'f') => out.push(0x0c),
+                Some(digit @ b'0'..=b'7') => {
+                    let mut code = u32::from(digit - b'0');
+                    for _ in 0..2 {
+                        match iter.peek() {
+                            Some(next @ b'0'..=b'7') => {
+                                code = code * 8 + u32::from(next - b'0');
+                                iter.next();
+                            }
+                            _ => break,
+                        }
+                    }
+                    out.push(code as u8);
+                }
+                // escaped line break continues the string
+                Some(b'\r') | Some(b'\n') => {}
+                Some(other) => out.push(other),
+                None => break,
+            },
+            b'(' => {
+                depth += 1;
+                out.push(byte);
+            }
+            b')' if depth == 0 => break,
+            b')' => {
+                depth -= 1;
+                out.push(byte);
+            }
+            _ => out.push(byte),
+        }
+    }
+    out
+}
+
+/// PDF text strings are UTF-16BE with byte order mark or PDFDocEncoding,
+/// which is close enough to Latin-1 for titles
+fn decode_pdf_text(bytes: &[u8]) -> String {
+    match bytes.strip_prefix(&[0xfe, 0xff]) {
+        Some(utf16) => {
+            let units: Vec<u16> = utf16
+                .chunks_exact(2)
+                .map(|pair| u16::from_be_bytes([pair[0], pair[1]]))
+                .collect();
+            String::from_utf16_lossy(&units)
+        }
+        None => bytes.iter().map(|b| char::from(*b)).collect(),
+    }
+}
+
+fn xmp_title(data: &[u8]) -> Option<String> {
+    let start = find(data, b"<dc:title")?;
+    let end = start + find(&data[start..], b"</dc:title>")?;
+    let title = &data[start..end];
+    let li = find(title, b"<rdf:li")?;
+    let text_start = li + title[li..].iter().position(|b| *b == b'>')? + 1;
+    let text_end = text_start + find(&title[text_start..], b"</rdf:li>")?;
+    let text = String::from_utf8_lossy(&title[text_start..text_end]);
+    Some(title::decode_entities(&text).into_owned())
+}
+
+fn find(haystack: &[u8], needle: &[u8]) -> Option<usize> {
+    haystack.windows(needle.len()).position(|w| w == needle)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use reqwest::header::HeaderValue;
+
+    fn headers(content_type: Option<&str>, disposition: Option<&str>) -> HeaderMap {
+        let mut headers = HeaderMap::new();
+        if let Some(value) = content_type {
+            headers.insert(CONTENT_TYPE, HeaderValue::from_str(value).unwrap());
+        }
+        if let Some(value) = disposition {
+            headers.insert(CONTENT_DISPOSITION, HeaderValue::from_str(value).unwrap());
+        }
+        headers
+    }
+
+    #[test]
+    fn test_classify() {
+        let cases = [
+            (None, None, ContentKind::Html),
+            (Some("text/html; charset=utf-8"), None, ContentKind::Html),
+            (Some("Application/XHTML+XML"), None, ContentKind::Html),
+            (Some("application/pdf"), None, ContentKind::Pdf),
+            (
+                Some("application/pdf"),
+                Some("attachment"),
+                ContentKind::Pdf,
+            ),
+            (Some("application/zip"), None, ContentKind::Other),
+            (Some("image/png"), None, ContentKind::Other),
+            (
+                Some("text/html"),
+                Some("attachment; filename=x.html"),
+                ContentKind::Other,
+            ),
+            (Some("text/html"), Some("inline"), ContentKind::Html),
+        ];
+        for (content_type, disposition, expected) in cases {
+            assert_eq!(
+                classify(&headers(content_type, disposition)),
+                expected,
+                "{:?} {:?}",
+                content_type,
+                disposition
+            );
+        }
+    }
+
+    #[test]
+    fn test_file_name() {
+        let url = Url::parse("https://example.com/releases/download/v1.0/my%20tool-1.0.tar.gz?x=1")
+            .unwrap();
+        assert_eq!(file_name(&url, &headers(None, None)), "my tool-1.0.tar.gz");
+
+        let url = Url::parse("https://example.com/dir/").unwrap();
+        assert_eq!(file_name(&url, &headers(None, None)), "dir");
+
+        let url = Url::parse("https://example.com/").unwrap();
+        assert_eq!(file_name(&url, &headers(None, None)), "example.com");
+
+        let disposition =
+            "attachment; filename=\"report.pdf\"; filename*=UTF-8''r%C3%A9sum%C3%A9.pdf";
+        assert_eq!(
+            file_name(&url, &headers(None, Some(disposition))),
+            "r\u{e9}sum\u{e9}.pdf"
+        );
+        assert_eq!(
+            file_name(
+                &url,
+                &headers(None, Some("attachment; filename=\"report.pdf\""))
+            ),
+            "report.pdf"
+        );
+    }
+
+    #[test]
+    fn test_parse_pdf_title() {
+        let cases: [(&[u8], Option<&str>); 6] = [
+            (b"%PDF-1.4\n1 0 obj\n<< /Title (Annual \\(draft\\) Report) /Author (Me) >>", Some("Annual (draft) Report")),
+            (b"<< /Title(Caf\\351 (nested) ok)>>", Some("Caf\u{e9} (nested) ok")),
+            (b"<< /Title <FEFF00480069> >>", Some("Hi")),
+            (b"<< /Title <48 69 2> >>", Some("Hi")),
+            (
+                b"<x:xmpmeta><dc:title><rdf:Alt><rdf:li xml:lang=\"x-default\">Tom &amp; Jerry</rdf:li></rdf:Alt></dc:title>",
+                Some("Tom & Jerry"),
+            ),
+            (b"%PDF-1.7\n<< /Producer (x) >>", None),
+        ];
+        for (data, expected) in cases {
+            assert_eq!(parse_pdf_title(data).as_deref(), expected);
+        }
+    }
+
+    #[test]
+    fn test_pdf_title_past_deadline() {
+        // no request is made without time left
+        let url = Url::parse("https://example.com/files/report.pdf").unwrap();
+        assert_eq!(
+            pdf_title(&url, &HeaderMap::new(), Duration::ZERO),
+            "report.pdf"
+        );
+    }
+}
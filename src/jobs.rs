@@ -0,0 +1,236 @@
+//! Background title fetch jobs.
+//!
+//! Jobs run on a small pool of worker threads which is started on first use.
+//! Vim submits a URL, gets a handle back immediately and polls the handle
+//! from a timer, so the editor never blocks on slow hosts. Cancelled jobs are
+//! skipped by the workers, results nobody polls are dropped after a while.
+
+use log::debug;
+use once_cell::sync::Lazy;
+use std::collections::{HashMap, HashSet};
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::mpsc::{channel, Receiver, Sender};
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+use crate::cache::CacheEntry;
+use crate::{cached_url_title, refresh_title, REQUEST_TIMEOUT};
+
+const WORKERS: usize = 4;
+/// Finished jobs which are not polled within this time are dropped
+const FINISHED_TTL: Duration = Duration::from_secs(60);
+
+type Task = Box<dyn FnOnce() + Send + 'static>;
+
+#[derive(Debug, Clone, PartialEq)]
+pub enum JobState {
+    Pending,
+    Done(Result<String, String>),
+}
+
+struct Job {
+    state: JobState,
+    /// Set by `cancel`, checked by the worker before the fetch starts
+    cancelled: Arc<AtomicBool>,
+    finished_at: Option<Instant>,
+}
+
+struct Jobs {
+    next_handle: u64,
+    states: HashMap<u64, Job>,
+}
+
+impl Jobs {
+    /// Drop finished jobs whose result has not been polled in time
+    fn prune(&mut self, now: Instant) {
+        self.states.retain(|handle, job| match job.finished_at {
+            Some(finished_at) if now.duration_since(finished_at) > FINISHED_TTL => {
+                debug!("Dropping unpolled result of job {}", handle);
+                false
+            }
+            _ => true,
+        });
+    }
+}
+
+static JOBS: Lazy<Mutex<Jobs>> = Lazy::new(|| {
+    Mutex::new(Jobs {
+        next_handle: 1,
+        states: HashMap::new(),
+    })
+});
+
+/// Cache keys with a queued or running revalidation
+static REVALIDATING: Lazy<Mutex<HashSet<String>>> = Lazy::new(|| Mutex::new(HashSet::new()));
+
+static POOL: Lazy<Mutex<Sender<Task>>> = Lazy::new(|| {
+    let (sender, receiver) = channel::<Task>();
+    let receiver = Arc::new(Mutex::new(receiver));
+    for idx in 0..WORKERS {
+        let receiver = Arc::clone(&receiver);
+        thread::Builder::new()
+            .name(format!("vimania-worker-{}", idx))
+            .spawn(move || worker(receiver))
+            .expect("Failed to spawn worker thread");
+    }
+    Mutex::new(sender)
+});
+
+fn worker(receiver: Arc<Mutex<Receiver<Task>>>) {
+    loop {
+        let task = match receiver.lock() {
+            Ok(receiver) => receiver.recv(),
+            Err(_) => return,
+        };
+        match task {
+            Ok(task) => task(),
+            Err(_) => return, // pool shut down
+        }
+    }
+}
+
+/// Run `task` on the background pool
+pub fn spawn<F: FnOnce() + Send + 'static>(task: F) {
+    let sender = POOL.lock().unwrap_or_else(|e| e.into_inner());
+    if sender.send(Box::new(task)).is_err() {
+        debug!("Background pool is gone, dropping task");
+    }
+}
+
+fn jobs() -> std::sync::MutexGuard<'static, Jobs> {
+    JOBS.lock().unwrap_or_else(|e| e.into_inner())
+}
+
+/// Start fetching the title of `url` in the background, returns the job handle
+pub fn submit(url: &str) -> u64 {
+    let cancelled = Arc::new(AtomicBool::new(false));
+    let handle = {
+        let mut jobs = jobs();
+        jobs.prune(Instant::now());
+        let handle = jobs.next_handle;
+        jobs.next_handle += 1;
+        let job = Job {
+            state: JobState::Pending,
+            cancelled: Arc::clone(&cancelled),
+            finished_at: None,
+        };
+        jobs.states.insert(handle, job);
+        handle
+    };
+    debug!("Submitting job {} for {}", handle, url);
+    let url = url.to_string();
+    spawn(move || {
+        // cancelled before a worker picked it up, the slot goes to the next job
+        if cancelled.load(Ordering::Acquire) {
+            debug!("Skipping cancelled job {}", handle);
+            return;
+        }
+        let result = cached_url_title(&url, REQUEST_TIMEOUT, false).map_err(|e| e.to_string());
+        if let Some(job) = jobs().states.get_mut(&handle) {
+            job.state = JobState::Done(result);
+            job.finished_at = Some(Instant::now());
+        }
+    });
+    handle
+}
+
+/// State of the job, finished jobs are forgotten once their result has been polled
+pub fn poll(handle: u64) -> Option<JobState> {
+    let mut jobs = jobs();
+    match jobs.states.get(&handle)?.state {
+        JobState::Pending => Some(JobState::Pending),
+        JobState::Done(_) => jobs.states.remove(&handle).map(|job| job.state),
+    }
+}
+
+/// Forget the job: a queued job is skipped, a running request is bounded by its
+/// timeout and its result is discarded
+pub fn cancel(handle: u64) -> bool {
+    match jobs().states.remove(&handle) {
+        Some(job) => {
+            job.cancelled.store(true, Ordering::Release);
+            true
+        }
+        None => false,
+    }
+}
+
+/// Refresh the expired cache entry of `url` in the background, at most once at a time
+pub fn revalidate(url: &str, key: &str, entry: CacheEntry) {
+    let queued = REVALIDATING
+        .lock()
+        .unwrap_or_else(|e| e.into_inner())
+        .insert(key.to_string());
+    if !queued {
+        return;
+    }
+    debug!("Revalidating {}", key);
+    let (url, key) = (url.to_string(), key.to_string());
+    spawn(move || {
+        if let Err(e) = refresh_title(&url, REQUEST_TIMEOUT, Some(&entry)) {
+            debug!("Revalidation of {} failed: {}", key, e);
+        }
+        REVALIDATING
+            .lock()
+            .unwrap_or_else(|e| e.into_inner())
+            .remove(&key);
+    });
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn wait_for(handle: u64) -> Option<JobState> {
+        let started = Instant::now();
+        while started.elapsed() < Duration::from_secs(5) {
+            match poll(handle) {
+                Some(JobState::Pending) => thread::sleep(Duration::from_millis(5)),
+                state => return state,
+            }
+        }
+        None
+    }
+
+    #[test]
+    fn test_submit_poll() {
+        let handle = submit("ftp://example.com");
+        match wait_for(handle) {
+            Some(JobState::Done(Err(e))) => assert!(e.contains("Unsupported URL scheme")),
+            state => panic!("unexpected state: {:?}", state),
+        }
+        // result is consumed by the first poll
+        assert_eq!(poll(handle), None);
+    }
+
+    #[test]
+    fn test_cancel() {
+        let handle = submit("http://localhost");
+        assert!(cancel(handle));
+        assert!(!cancel(handle));
+        assert_eq!(poll(handle), None);
+    }
+
+    #[test]
+    fn test_prune_unpolled() {
+        let now = Instant::now();
+        let job = |finished_at| Job {
+            state: JobState::Done(Ok("title".to_string())),
+            cancelled: Arc::new(AtomicBool::new(false)),
+            finished_at,
+        };
+        let mut jobs = Jobs {
+            next_handle: 4,
+            states: HashMap::from([
+                (1, job(Some(now - FINISHED_TTL - Duration::from_secs(1)))),
+                (2, job(Some(now))),
+                (3, job(None)),
+            ]),
+        };
+        jobs.prune(now);
+        let mut handles: Vec<_> = jobs.states.keys().copied().collect();
+        handles.sort();
+        assert_eq!(handles, [2, 3]);
+    }
+}
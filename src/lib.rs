@@ -6,18 +6,35 @@
 //! with security features to prevent SSRF attacks.
 
 use anyhow::Result;
-use log::{debug, info, LevelFilter};
+use log::{debug, info, warn};
 use once_cell::sync::Lazy;
 use pyo3::prelude::*;
 use pyo3::wrap_pyfunction;
-use pyo3_log::{Caching, Logger};
 use reqwest::blocking::Client;
-use scraper::{Html, Selector};
 use stdext::function_name;
 use thiserror::Error;
 use url::Url;
 
 use core::time::Duration;
+use std::io::Read;
+use std::path::PathBuf;
+use std::time::Instant;
+
+mod anchors;
+mod backoff;
+mod batch;
+mod cache;
+mod content;
+mod jobs;
+pub mod linkparse;
+mod settings;
+mod stats;
+mod title;
+mod trace;
+mod warmup;
+
+use cache::{CacheEntry, TitleCache};
+use settings::LookupMode;
 
 /// Custom error types for URI handling
 #[derive(Debug, Error)]
@@ -26,19 +43,36 @@ pub enum UriError {
     InvalidUrl(#[from] url::ParseError),
     #[error("HTTP request failed: {0}")]
     HttpError(#[from] reqwest::Error),
+    #[error("HTTP status {0}")]
+    HttpStatus(reqwest::StatusCode),
     #[error("HTML parsing failed: {0}")]
     HtmlError(String),
     #[error("Unsupported URL scheme: {0}")]
     UnsupportedScheme(String),
     #[error("Access to internal/local networks is not allowed: {0}")]
     ForbiddenHost(String),
+    #[error("Reading the response failed: {0}")]
+    IoError(#[from] std::io::Error),
+    #[error("Deadline exceeded before the request could complete")]
+    DeadlineExceeded,
+    #[error("Backing off for {}s after failure: {error}", .retry_in.as_secs())]
+    BackedOff { error: String, retry_in: Duration },
 }
 
+/// Default timeout of a single title request
+const REQUEST_TIMEOUT: Duration = Duration::from_secs(3);
+/// Size of the chunks fed into the title scanner
+const READ_CHUNK_SIZE: usize = 8 * 1024;
+
 /// Static HTTP client with optimal configuration
 static HTTP_CLIENT: Lazy<Client> = Lazy::new(|| {
     reqwest::blocking::Client::builder()
-        .connect_timeout(Duration::from_secs(3))
-        .timeout(Duration::from_secs(3))
+        .connect_timeout(REQUEST_TIMEOUT)
+        .timeout(REQUEST_TIMEOUT)
+        .gzip(true)
+        .brotli(true)
+        .zstd(true)
+        .deflate(true)
         .user_agent("vimania-uri-rs/1.1.7")
         .build()
         .expect("Failed to create HTTP client")
@@ -94,12 +128,22 @@ fn reverse_line(line: String) -> PyResult<String> {
 /// Get the title of a web page (Python binding)
 ///
 /// This function provides a Python interface to the URL title fetching functionality.
+/// Titles are served from the persistent title cache when possible.
+/// Recently failed URLs and unreachable hosts fail immediately until their
+/// back-off expires, `force=True` bypasses both the cache and the back-off.
 /// It includes proper error handling and logging.
 #[pyfunction]
-fn get_url_title(py: Python, url: &str) -> PyResult<String> {
-    debug!("({}:{}) {:?}", function_name!(), line!(), url);
+#[pyo3(signature = (url, force=false))]
+fn get_url_title(py: Python, url: &str, force: bool) -> PyResult<String> {
+    debug!(
+        "({}:{}) {:?} force={}",
+        function_name!(),
+        line!(),
+        url,
+        force
+    );
     let title = py.allow_threads(|| {
-        _get_url_title(url).map_err(|e| {
+        cached_url_title(url, REQUEST_TIMEOUT, force).map_err(|e| {
             pyo3::exceptions::PyRuntimeError::new_err(format!("Failed to get URL title: {}", e))
         })
     });
@@ -107,17 +151,375 @@ fn get_url_title(py: Python, url: &str) -> PyResult<String> {
     title
 }
 
+/// Get the titles of many web pages concurrently (Python binding)
+///
+/// The URLs are fetched by at most `max_concurrency` worker threads while the
+/// GIL is released. Returns one `(title, error)` tuple per URL in input order,
+/// exactly one of both is `None`. URLs not finished within `deadline_secs`
+/// fail with a deadline error.
+#[pyfunction]
+#[pyo3(signature = (urls, *, max_concurrency=8, deadline_secs=None))]
+fn get_url_titles(
+    py: Python,
+    urls: Vec<String>,
+    max_concurrency: usize,
+    deadline_secs: Option<f64>,
+) -> PyResult<Vec<(Option<String>, Option<String>)>> {
+    debug!(
+        "({}:{}) {} urls, {:?}",
+        function_name!(),
+        line!(),
+        urls.len(),
+        deadline_secs
+    );
+    let deadline = deadline_secs
+        .map(Duration::try_from_secs_f64)
+        .transpose()
+        .map_err(|e| pyo3::exceptions::PyValueError::new_err(format!("Invalid deadline: {}", e)))?
+        .map(|timeout| Instant::now() + timeout);
+    let results = py.allow_threads(|| batch::fetch_titles(&urls, max_concurrency, deadline));
+    Ok(results
+        .into_iter()
+        .map(|result| match result {
+            Ok(title) => (Some(title), None),
+            Err(e) => (None, Some(e.to_string())),
+        })
+        .collect())
+}
+
+/// Start fetching the title of a web page in the background (Python binding)
+///
+/// Returns immediately with a handle for `poll_url_title` and `cancel_url_title`.
+#[pyfunction]
+fn submit_url_title(url: &str) -> u64 {
+    debug!("({}:{}) {:?}", function_name!(), line!(), url);
+    jobs::submit(url)
+}
+
+/// Poll a background title fetch (Python binding)
+///
+/// Returns `("pending", None)`, `("done", title)` or `("error", message)`.
+/// Finished jobs are forgotten once their result has been returned.
+#[pyfunction]
+fn poll_url_title(handle: u64) -> PyResult<(&'static str, Option<String>)> {
+    match jobs::poll(handle) {
+        Some(jobs::JobState::Pending) => Ok(("pending", None)),
+        Some(jobs::JobState::Done(Ok(title))) => Ok(("done", Some(title))),
+        Some(jobs::JobState::Done(Err(e))) => Ok(("error", Some(e))),
+        None => Err(pyo3::exceptions::PyKeyError::new_err(format!(
+            "Unknown title job: {}",
+            handle
+        ))),
+    }
+}
+
+/// Cancel a background title fetch (Python binding)
+///
+/// Returns `False` if the handle is unknown or has already been polled.
+#[pyfunction]
+fn cancel_url_title(handle: u64) -> bool {
+    jobs::cancel(handle)
+}
+
+/// Configure the title fetching pipeline (Python binding)
+///
+/// Only the given keyword arguments are changed, all others keep their values.
+#[pyfunction]
+#[pyo3(signature = (
+    *,
+    cache_enabled=None,
+    cache_dir=None,
+    cache_ttl_secs=None,
+    cache_max_entries=None,
+    max_body_bytes=None,
+    range_hint=None,
+    backoff_secs=None,
+    backoff_max_secs=None,
+    lookup_mode=None,
+))]
+fn configure(
+    cache_enabled: Option<bool>,
+    cache_dir: Option<PathBuf>,
+    cache_ttl_secs: Option<u64>,
+    cache_max_entries: Option<usize>,
+    max_body_bytes: Option<usize>,
+    range_hint: Option<bool>,
+    backoff_secs: Option<u64>,
+    backoff_max_secs: Option<u64>,
+    lookup_mode: Option<&str>,
+) -> PyResult<()> {
+    if max_body_bytes == Some(0) {
+        return Err(pyo3::exceptions::PyValueError::new_err(
+            "max_body_bytes must be positive",
+        ));
+    }
+    let lookup_mode = lookup_mode
+        .map(|mode| {
+            mode.parse::<LookupMode>()
+                .map_err(pyo3::exceptions::PyValueError::new_err)
+        })
+        .transpose()?;
+    settings::update(|s| {
+        if let Some(enabled) = cache_enabled {
+            s.cache_enabled = enabled;
+        }
+        if let Some(dir) = cache_dir {
+            s.cache_dir = dir;
+        }
+        if let Some(ttl) = cache_ttl_secs {
+            s.cache_ttl = Duration::from_secs(ttl);
+        }
+        if let Some(max_entries) = cache_max_entries {
+            s.cache_max_entries = max_entries;
+        }
+        if let Some(max_body_bytes) = max_body_bytes {
+            s.max_body_bytes = max_body_bytes;
+        }
+        if let Some(range_hint) = range_hint {
+            s.range_hint = range_hint;
+        }
+        if let Some(backoff) = backoff_secs {
+            s.backoff_base = Duration::from_secs(backoff);
+        }
+        if let Some(backoff_max) = backoff_max_secs {
+            s.backoff_max = Duration::from_secs(backoff_max);
+        }
+        if let Some(mode) = lookup_mode {
+            s.lookup_mode = mode;
+        }
+    });
+    debug!(
+        "({}:{}) {:?}",
+        function_name!(),
+        line!(),
+        settings::current()
+    );
+    Ok(())
+}
+
+/// Remove all cached titles (Python binding), returns the number of removed entries
+#[pyfunction]
+fn clear_title_cache() -> PyResult<usize> {
+    let cache = TitleCache::from_settings(&settings::current());
+    cache
+        .clear()
+        .map_err(|e| pyo3::exceptions::PyOSError::new_err(format!("Failed to clear cache: {}", e)))
+}
+
+/// Link under the cursor (Python binding)
+///
+/// `column` is a character offset into `line`. Returns `(kind, start, end, target)`
+/// with kind `"url"`, `"reference_definition"`, `"path"`, `"direct"` or `"indirect"`,
+/// or `None` if there is no link. The target of indirect links is their reference label.
+#[pyfunction]
+fn link_at(line: &str, column: usize) -> Option<(&'static str, usize, usize, String)> {
+    linkparse::link_at(line, column)
+        .map(|link| (link.kind.as_str(), link.start, link.end, link.target))
+}
+
+/// URL at the cursor (Python binding)
+///
+/// Scans the run of URL characters around the cursor for URLs in linear time and
+/// returns `(start, end, url)` of the one containing character `column`, or `None`.
+#[pyfunction]
+fn url_at(line: &str, column: usize) -> Option<(usize, usize, String)> {
+    linkparse::url_span_at(line, column)
+}
+
+/// Line of an anchor in a file which is not loaded into Vim (Python binding)
+///
+/// Same matching as `JumpToAnchor.find_anchor`. Returns the 1-based line number
+/// or `None` if the file has no such anchor, scans are cached by path and mtime.
+#[pyfunction]
+fn find_anchor_line(py: Python, path: PathBuf, anchor: &str) -> PyResult<Option<usize>> {
+    py.allow_threads(|| anchors::find_anchor_line(&path, anchor))
+        .map_err(|e| {
+            pyo3::exceptions::PyOSError::new_err(format!(
+                "Failed to read {}: {}",
+                path.display(),
+                e
+            ))
+        })
+}
+
+/// Warm up the HTTP client in the background (Python binding)
+///
+/// Builds the client with its TLS configuration on a background thread. Returns
+/// immediately, `False` if the warm-up has been started before.
+#[pyfunction]
+fn warm_up() -> bool {
+    debug!("({}:{})", function_name!(), line!());
+    warmup::start()
+}
+
+/// Latency histograms of the title fetching phases as JSON (Python binding)
+///
+/// Maps each phase to `count`, `sum_us`, `min_us`, `max_us` and `buckets`, where
+/// bucket `i` counts the samples below `2^i` microseconds. `reset` clears them.
+#[pyfunction]
+#[pyo3(signature = (reset=false))]
+fn title_stats(reset: bool) -> PyResult<String> {
+    let snapshot = stats::snapshot();
+    if reset {
+        stats::reset();
+    }
+    serde_json::to_string(&snapshot)
+        .map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+}
+
+/// Recorded log events of the extension (Python binding)
+///
+/// Returns `(timestamp, level, target, thread, message)` tuples, oldest first.
+/// Only the newest 4096 events are kept, `clear` empties the buffer.
+#[pyfunction]
+#[pyo3(signature = (clear=true))]
+fn dump_trace(clear: bool) -> Vec<(f64, &'static str, String, Option<String>, String)> {
+    trace::LOGGER
+        .dump(clear)
+        .into_iter()
+        .map(|event| {
+            (
+                event.timestamp,
+                event.level.as_str(),
+                event.target,
+                event.thread,
+                event.message,
+            )
+        })
+        .collect()
+}
+
+/// Set the level of the recorded log events (Python binding)
+///
+/// One of `off`, `error`, `warn`, `info` (default), `debug` or `trace`.
+#[pyfunction]
+fn set_trace_level(level: &str) -> PyResult<()> {
+    trace::set_level(level).map_err(pyo3::exceptions::PyValueError::new_err)
+}
+
+/// Get the title of a web page, served from the persistent cache when possible
+///
+/// Fresh cache entries are returned without network access, everything else
+/// is fetched and written back to the cache. In stale-while-revalidate mode
+/// expired entries are returned as well and refreshed in the background.
+/// Failed fetches are backed off, `force` skips the cache and back-off lookups.
+fn cached_url_title(url: &str, timeout: Duration, force: bool) -> Result<String, UriError> {
+    let _span = stats::Span::start("title_lookup");
+    let settings = settings::current();
+    let parsed = validate_url(url)?;
+    let key = cache::normalize_url(&parsed);
+    let host = parsed.host_str().unwrap_or_default();
+
+    let cached = if settings.cache_enabled && !force {
+        TitleCache::from_settings(&settings).get(&key)
+    } else {
+        None
+    };
+    if let Some(entry) = &cached {
+        if entry.is_fresh(settings.cache_ttl) {
+            debug!("Title cache hit for: {}", key);
+            return Ok(entry.title.clone());
+        }
+        if settings.lookup_mode == LookupMode::StaleWhileRevalidate {
+            debug!("Stale title cache hit for: {}", key);
+            if backoff::check(&key, host).is_ok() {
+                jobs::revalidate(url, &key, entry.clone());
+            }
+            return Ok(entry.title.clone());
+        }
+    }
+    if !force {
+        backoff::check(&key, host)?;
+    }
+    refresh_title(url, timeout, cached.as_ref())
+}
+
+/// Fetch the title, conditionally if `cached` is given, and update cache and back-off
+fn refresh_title(
+    url: &str,
+    timeout: Duration,
+    cached: Option<&CacheEntry>,
+) -> Result<String, UriError> {
+    let settings = settings::current();
+    let parsed = validate_url(url)?;
+    let key = cache::normalize_url(&parsed);
+    let host = parsed.host_str().unwrap_or_default();
+
+    let fetched = match _get_url_title(url, timeout, cached) {
+        Ok(fetched) => fetched,
+        Err(e) => {
+            backoff::record_failure(&key, host, &e, &settings);
+            return Err(e);
+        }
+    };
+    let entry = match (fetched, cached) {
+        (
+            Fetched::Title {
+                title,
+                etag,
+                last_modified,
+            },
+            _,
+        ) => CacheEntry {
+            etag,
+            last_modified,
+            ..CacheEntry::new(&key, &title)
+        },
+        (
+            Fetched::NotModified {
+                etag,
+                last_modified,
+            },
+            Some(cached),
+        ) => {
+            let mut entry = cached.clone();
+            entry.mark_fetched();
+            entry.etag = etag.or(entry.etag);
+            entry.last_modified = last_modified.or(entry.last_modified);
+            entry
+        }
+        (Fetched::NotModified { .. }, None) => {
+            unreachable!("unconditional requests are never answered as not modified")
+        }
+    };
+    backoff::record_success(&key, host);
+    if settings.cache_enabled {
+        if let Err(e) = TitleCache::from_settings(&settings).store(&entry) {
+            warn!("Failed to cache title of {}: {}", key, e);
+        }
+    }
+    Ok(entry.title)
+}
+
+/// Outcome of a title request
+#[derive(Debug)]
+enum Fetched {
+    Title {
+        title: String,
+        etag: Option<String>,
+        last_modified: Option<String>,
+    },
+    /// The cached title is still valid (HTTP 304)
+    NotModified {
+        etag: Option<String>,
+        last_modified: Option<String>,
+    },
+}
+
 /// Fetch the title of a web page from the given URL
 ///
 /// # Arguments
 /// * `url` - A string slice containing the URL to fetch
+/// * `timeout` - Upper bound of the whole request
+/// * `cached` - Cache entry whose validators make the request conditional
 ///
 /// # Returns
-/// * `Result<String, UriError>` - The title of the page or an error
+/// * `Result<Fetched, UriError>` - The title of the page, whether the cached
+///   title is still valid, or an error
 ///
 /// # Examples
 /// ```
-/// let title = _get_url_title("https://example.com")?;
+/// let fetched = _get_url_title("https://example.com", REQUEST_TIMEOUT, None)?;
 /// ```
 ///
 /// # Errors
@@ -126,30 +528,79 @@ fn get_url_title(py: Python, url: &str) -> PyResult<String> {
 /// - The URL scheme is not HTTP/HTTPS
 /// - The URL points to a local/internal network
 /// - The HTTP request fails
+/// - The response status is no success (2xx), or 304 without `cached`
+/// - Reading the response body fails
 /// - The HTML cannot be parsed
 /// - No title element is found
-fn _get_url_title(url: &str) -> Result<String, UriError> {
+///
+/// Non-HTML responses are not read, their title is the file name or, for
+/// PDFs, the document title.
+fn _get_url_title(
+    url: &str,
+    timeout: Duration,
+    cached: Option<&CacheEntry>,
+) -> Result<Fetched, UriError> {
     // Validate and sanitize the URL
     let url = validate_url(url)?;
+    fetch_title(url, timeout, cached)
+}
+
+/// Request `url` and extract the title, `url` has to be validated by the caller
+fn fetch_title(
+    url: Url,
+    timeout: Duration,
+    cached: Option<&CacheEntry>,
+) -> Result<Fetched, UriError> {
+    let settings = settings::current();
 
     // Use the static HTTP client for better performance
     info!("Fetching URL title for: {}", url);
-    let res = HTTP_CLIENT.get(url).send()?;
+    let mut request = HTTP_CLIENT.get(url).timeout(timeout);
+    if settings.range_hint {
+        // servers may ignore it, the limit is enforced while reading anyway
+        request = request.header(
+            reqwest::header::RANGE,
+            format!("bytes=0-{}", settings.max_body_bytes - 1),
+        );
+    }
+    if let Some(entry) = cached {
+        if let Some(etag) = &entry.etag {
+            request = request.header(reqwest::header::IF_NONE_MATCH, etag);
+        }
+        if let Some(last_modified) = &entry.last_modified {
+            request = request.header(reqwest::header::IF_MODIFIED_SINCE, last_modified);
+        }
+    }
+    // the PDF metadata probe has to finish within the same time
+    let deadline = Instant::now() + timeout;
+    // DNS, connect, TLS and time to first byte
+    let res = {
+        let _span = stats::Span::start("http_request");
+        request.send()?
+    };
 
-    let body = res.text()?;
+    let header = |name| {
+        res.headers()
+            .get(name)
+            .and_then(|value: &reqwest::header::HeaderValue| value.to_str().ok())
+            .map(str::to_string)
+    };
+    let etag = header(reqwest::header::ETAG);
+    let last_modified = header(reqwest::header::LAST_MODIFIED);
 
-    // Parse the HTML
-    let document = Html::parse_document(&body);
-    let selector = Selector::parse("title")
-        .map_err(|e| UriError::HtmlError(format!("Failed to parse title selector: {:?}", e)))?;
+    if res.status() == reqwest::StatusCode::NOT_MODIFIED && cached.is_some() {
+        debug!("Not modified: {}", res.url());
+        return Ok(Fetched::NotModified {
+            etag,
+            last_modified,
+        });
+    }
+    // error and captive portal pages have titles too, they must not be cached
+    if !res.status().is_success() {
+        return Err(UriError::HttpStatus(res.status()));
+    }
 
-    let title = document
-        .select(&selector)
-        .next()
-        .ok_or_else(|| UriError::HtmlError("No title element found".to_string()))?
-        .inner_html()
-        .trim()
-        .to_string();
+    let title = read_title(res, deadline, &settings)?;
 
     // todo: check whether this can be activeted
     // Ensure title is not empty
@@ -157,26 +608,114 @@ fn _get_url_title(url: &str) -> Result<String, UriError> {
     //    return Err(UriError::HtmlError("Title element is empty".to_string()));
     //}
 
-    Ok(title)
+    Ok(Fetched::Title {
+        title,
+        etag,
+        last_modified,
+    })
+}
+
+/// Extract the title from the response, reading as little of the body as possible
+fn read_title(
+    mut res: reqwest::blocking::Response,
+    deadline: Instant,
+    settings: &settings::Settings,
+) -> Result<String, UriError> {
+    let partial = res.status() == reqwest::StatusCode::PARTIAL_CONTENT;
+
+    // Downloads, images, PDFs etc. get a derived title without reading the payload
+    match content::classify(res.headers()) {
+        content::ContentKind::Html => {}
+        content::ContentKind::Pdf => {
+            let (final_url, headers) = (res.url().clone(), res.headers().clone());
+            drop(res);
+            let remaining = deadline.saturating_duration_since(Instant::now());
+            return Ok(content::pdf_title(&final_url, &headers, remaining));
+        }
+        content::ContentKind::Other => {
+            debug!("Not reading non-HTML body of {}", res.url());
+            return Ok(content::file_name(res.url(), res.headers()));
+        }
+    }
+
+    let header_encoding = res
+        .headers()
+        .get(reqwest::header::CONTENT_TYPE)
+        .and_then(|value| title::charset_param(value.as_bytes()));
+
+    // Stream the body and stop as soon as the title is complete or the size
+    // limit is reached, dropping the response aborts the rest of the transfer
+    let mut scanner = title::TitleScanner::new(header_encoding);
+    let mut chunk = vec![0; READ_CHUNK_SIZE];
+    let mut body = stats::Accumulated::new("http_body");
+    let mut parse = stats::Accumulated::new("html_parse");
+    while scanner.len() < settings.max_body_bytes {
+        let limit = READ_CHUNK_SIZE.min(settings.max_body_bytes - scanner.len());
+        let n = match body.time(|| res.read(&mut chunk[..limit])) {
+            Ok(n) => n,
+            // a compressed range ends in the middle of the stream
+            Err(e) if partial && scanner.len() > 0 => {
+                debug!("Partial body ended with: {}", e);
+                break;
+            }
+            Err(e) => return Err(e.into()),
+        };
+        if n == 0 {
+            break;
+        }
+        if let Some(title) = parse.time(|| scanner.feed(&chunk[..n])) {
+            debug!("Found title after {} bytes", scanner.len());
+            return Ok(title);
+        }
+    }
+
+    // No complete title element, parse the whole document
+    parse.time(|| scanner.finish())
+}
+
+/// Internals for the criterion benchmarks in `benches/`, not a stable API
+#[doc(hidden)]
+pub mod bench {
+    use super::*;
+
+    pub use crate::title::{parse_title, TitleScanner};
+
+    pub fn validate_url(url: &str) -> Result<Url, UriError> {
+        super::validate_url(url)
+    }
+
+    /// Fetch the title of `url` without the SSRF check, so local mock servers work
+    pub fn fetch_title(url: &str, timeout: Duration) -> Result<String, UriError> {
+        match super::fetch_title(Url::parse(url)?, timeout, None)? {
+            Fetched::Title { title, .. } => Ok(title),
+            Fetched::NotModified { .. } => {
+                unreachable!("unconditional requests are never answered as not modified")
+            }
+        }
+    }
 }
 
 #[pymodule]
-fn vimania_uri_rs(py: Python, m: &Bound<'_, PyModule>) -> PyResult<()> {
-    // let handle = pyo3_log::init();
-    // configure logger so that certain creates have diffrent log levels
-    let _ = Logger::new(py, Caching::LoggersAndLevels)?
-        .filter(LevelFilter::Trace)
-        // .filter_target("my_module::verbose_submodule".to_owned(), LevelFilter::Warn)
-        .filter_target("html5ever".to_owned(), LevelFilter::Warn)
-        .filter_target("selectors".to_owned(), LevelFilter::Warn)
-        .filter_target("build_wheels".to_owned(), LevelFilter::Warn)
-        .filter_target("filelock".to_owned(), LevelFilter::Warn)
-        .install()
-        .expect("Someone installed a logger before us :-(");
+fn vimania_uri_rs(_py: Python, m: &Bound<'_, PyModule>) -> PyResult<()> {
+    // log records go into the trace ring buffer, Python reads it with dump_trace
+    trace::install();
 
     info!("Log level: {}", log::max_level());
     m.add_function(wrap_pyfunction!(reverse_line, m)?)?;
     m.add_function(wrap_pyfunction!(get_url_title, m)?)?;
+    m.add_function(wrap_pyfunction!(get_url_titles, m)?)?;
+    m.add_function(wrap_pyfunction!(submit_url_title, m)?)?;
+    m.add_function(wrap_pyfunction!(poll_url_title, m)?)?;
+    m.add_function(wrap_pyfunction!(cancel_url_title, m)?)?;
+    m.add_function(wrap_pyfunction!(configure, m)?)?;
+    m.add_function(wrap_pyfunction!(clear_title_cache, m)?)?;
+    m.add_function(wrap_pyfunction!(link_at, m)?)?;
+    m.add_function(wrap_pyfunction!(url_at, m)?)?;
+    m.add_function(wrap_pyfunction!(find_anchor_line, m)?)?;
+    m.add_function(wrap_pyfunction!(warm_up, m)?)?;
+    m.add_function(wrap_pyfunction!(title_stats, m)?)?;
+    m.add_function(wrap_pyfunction!(dump_trace, m)?)?;
+    m.add_function(wrap_pyfunction!(set_trace_level, m)?)?;
     Ok(())
 }
 
@@ -188,8 +727,46 @@ mod tests {
     #[test]
     fn test_get_url_title() {
         let url = "https://www.rust-lang.org/";
-        let title = _get_url_title(url).unwrap();
-        assert_eq!(title, "Rust Programming Language");
+        match _get_url_title(url, REQUEST_TIMEOUT, None).unwrap() {
+            Fetched::Title { title, .. } => assert_eq!(title, "Rust Programming Language"),
+            fetched => panic!("unexpected response: {:?}", fetched),
+        }
+    }
+
+    #[test]
+    fn test_fetch_title_from_mock_server() {
+        let mut server = mockito::Server::new();
+        let _mock = server
+            .mock("GET", "/late")
+            .with_header("content-type", "text/html")
+            .with_body(include_bytes!("../benches/corpus/title_late.html"))
+            .create();
+        let url = format!("{}/late", server.url());
+        // local hosts are rejected before any request is made
+        assert!(matches!(
+            _get_url_title(&url, REQUEST_TIMEOUT, None),
+            Err(UriError::ForbiddenHost(_))
+        ));
+        assert_eq!(
+            bench::fetch_title(&url, REQUEST_TIMEOUT).unwrap(),
+            "Deep Dive: Streaming Parsers in Practice"
+        );
+    }
+
+    #[test]
+    fn test_error_status_is_no_title() {
+        let mut server = mockito::Server::new();
+        let _mock = server
+            .mock("GET", "/missing")
+            .with_status(404)
+            .with_header("content-type", "text/html")
+            .with_body("<html><head><title>Page not found</title></head></html>")
+            .create();
+        let url = Url::parse(&format!("{}/missing", server.url())).unwrap();
+        assert!(matches!(
+            fetch_title(url, REQUEST_TIMEOUT, None),
+            Err(UriError::HttpStatus(reqwest::StatusCode::NOT_FOUND))
+        ));
     }
 
     #[test]
@@ -0,0 +1,578 @@
+//! Link under the cursor.
+//!
+//! Single pass replacement of the regex cascade in `mdnav.parse_line`: bare
+//! URLs, reference definitions, local paths and markdown links are recognized
+//! with the same precedence and the same results. Positions are character
+//! offsets like Python string indices. Indirect links are returned with their
+//! reference label, resolving the label needs the whole buffer.
+//!
+//! Only a window of `WINDOW` characters on either side of the cursor is
+//! scanned at first. It doubles as long as the link under the cursor may reach
+//! beyond it, so the cost depends on the length of the link and not on the one
+//! of the line. Links longer than `MAX_WINDOW` are not found at all instead of
+//! being cut off.
+
+use std::ops::Range;
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum LinkKind {
+    /// `https://...` outside of a markdown link
+    Url,
+    /// `[label]: target` at the start of the line
+    ReferenceDefinition,
+    /// Whitespace delimited word under the cursor
+    Path,
+    /// `[text](target)`
+    Direct,
+    /// `[text][label]` or `[label][]`, the target is the label
+    Indirect,
+}
+
+impl LinkKind {
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            LinkKind::Url => "url",
+            LinkKind::ReferenceDefinition => "reference_definition",
+            LinkKind::Path => "path",
+            LinkKind::Direct => "direct",
+            LinkKind::Indirect => "indirect",
+        }
+    }
+}
+
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub struct Link {
+    pub kind: LinkKind,
+    /// Span of the link in the line, end exclusive
+    pub start: usize,
+    pub end: usize,
+    pub target: String,
+}
+
+impl Link {
+    fn shifted(self, offset: usize) -> Link {
+        Link {
+            start: self.start + offset,
+            end: self.end + offset,
+            ..self
+        }
+    }
+}
+
+/// Characters which make a word under the cursor an invalid path
+const INVALID_PATH_CHARS: &[char] = &['*', '?', '[', ']', '|', '"', '\'', '<', '>', '!'];
+
+/// Characters first scanned on either side of the cursor
+pub const WINDOW: usize = 2048;
+
+/// Characters on either side of the cursor the window grows to at most
+pub const MAX_WINDOW: usize = 64 * WINDOW;
+
+/// The link may reach beyond the window, the window has to grow
+struct Truncated;
+
+type Scan<T> = Result<Option<T>, Truncated>;
+
+/// Characters of a line around the cursor
+struct Window<'a> {
+    line: &'a str,
+    /// Byte range of the window in the line
+    bytes: Range<usize>,
+    /// Characters added on either side of the cursor
+    size: usize,
+    /// Character offset of the first character of the window
+    offset: usize,
+    chars: Vec<char>,
+}
+
+impl<'a> Window<'a> {
+    /// `WINDOW` characters on either side of character `column`
+    fn new(line: &'a str, column: usize) -> Self {
+        // only the characters up to the cursor are walked, not the whole line
+        let (offset, cursor) = line
+            .char_indices()
+            .map(|(idx, _)| idx)
+            .chain(std::iter::once(line.len()))
+            .enumerate()
+            .take(column.saturating_add(1))
+            .last()
+            .unwrap_or((0, 0));
+        let mut window = Window {
+            line,
+            bytes: cursor..cursor,
+            size: 0,
+            offset,
+            chars: Vec::new(),
+        };
+        window.extend(WINDOW);
+        window
+    }
+
+    /// Double the characters on either side, `false` if there are no more to add
+    fn grow(&mut self) -> bool {
+        if self.size >= MAX_WINDOW || (self.at_start() && self.at_end()) {
+            return false;
+        }
+        self.extend(self.size);
+        true
+    }
+
+    fn extend(&mut self, count: usize) {
+        for (idx, _) in self.line[..self.bytes.start]
+            .char_indices()
+            .rev()
+            .take(count)
+        {
+            self.bytes.start = idx;
+            self.offset -= 1;
+        }
+        self.bytes.end = self.line[self.bytes.end..]
+            .char_indices()
+            .nth(count)
+            .map_or(self.line.len(), |(idx, _)| self.bytes.end + idx);
+        self.size += count;
+        self.chars = self.line[self.bytes.clone()].chars().collect();
+    }
+
+    fn at_start(&self) -> bool {
+        self.bytes.start == 0
+    }
+
+    fn at_end(&self) -> bool {
+        self.bytes.end == self.line.len()
+    }
+
+    /// First `needle` at or after `from`, `Truncated` if it may lie behind the window
+    fn find(&self, from: usize, needle: char) -> Scan<usize> {
+        match find(&self.chars, from, needle) {
+            None if !self.at_end() => Err(Truncated),
+            found => Ok(found),
+        }
+    }
+
+    /// Last `needle` before `to`, `Truncated` if it may lie before the window
+    fn rfind(&self, to: usize, needle: char) -> Scan<usize> {
+        match rfind(&self.chars[..to.min(self.chars.len())], needle) {
+            None if !self.at_start() => Err(Truncated),
+            found => Ok(found),
+        }
+    }
+
+    /// Character at `idx`, `Truncated` if it lies behind the window
+    fn get(&self, idx: usize) -> Scan<char> {
+        match self.chars.get(idx) {
+            None if !self.at_end() => Err(Truncated),
+            found => Ok(found.copied()),
+        }
+    }
+}
+
+/// Result of `scan` on a window around character `column`, which doubles as
+/// long as the scan reaches beyond it. `None` if it does beyond `MAX_WINDOW`.
+///
+/// `scan` gets the window and the column in it.
+fn scan_around<T>(
+    line: &str,
+    column: usize,
+    scan: impl Fn(&Window, usize) -> Scan<T>,
+) -> Option<T> {
+    let mut window = Window::new(line, column);
+    loop {
+        match scan(&window, column - window.offset) {
+            Ok(found) => return found,
+            Err(Truncated) => {
+                if !window.grow() {
+                    return None;
+                }
+            }
+        }
+    }
+}
+
+/// Link at character `column` of `line`
+pub fn link_at(line: &str, column: usize) -> Option<Link> {
+    // definitions start and end with the line, the window does not matter for them
+    let definition = reference_definition(line);
+    scan_around(line, column, |window, column| {
+        let shifted = |link: Link| link.shifted(window.offset);
+        if let Some(link) = url_at(window, column)? {
+            return Ok(Some(shifted(link)));
+        }
+        if definition.is_some() {
+            return Ok(definition.clone());
+        }
+        if let Some(link) = path_at(window, column)? {
+            return Ok(Some(shifted(link)));
+        }
+        Ok(markdown_link_at(window, column)?.map(shifted))
+    })
+}
+
+/// `(start, end, url)` of the URL containing character `column` of `line`
+pub fn url_span_at(line: &str, column: usize) -> Option<(usize, usize, String)> {
+    scan_around(line, column, |window, column| {
+        Ok(url_run_span(window, column)?.map(|(start, end)| {
+            let url = window.chars[start..end].iter().collect();
+            (start + window.offset, end + window.offset, url)
+        }))
+    })
+}
+
+/// Spans of all URLs in `chars`, leftmost first and non-overlapping
+pub fn find_urls(chars: &[char]) -> impl Iterator<Item = (usize, usize)> + '_ {
+    let mut pos = 0;
+    std::iter::from_fn(move || {
+        while pos < chars.len() {
+            if let Some(end) = match_url(chars, pos) {
+                let start = pos;
+                pos = end;
+                return Some((start, end));
+            }
+            pos += 1;
+        }
+        None
+    })
+}
+
+/// End of the URL starting at `start`
+///
+/// Same language as `URL_PATTERN`:
+/// `https?:(//|\\\\)+([\w\d:#@%/;$()~_?\+-=\\\.&](#!)?)*`
+/// Every character is looked at once, so matching is linear in the line length.
+fn match_url(chars: &[char], start: usize) -> Option<usize> {
+    let at = |idx: usize, c: char| chars.get(idx) == Some(&c);
+    if !"http".chars().enumerate().all(|(i, c)| at(start + i, c)) {
+        return None;
+    }
+    let mut pos = start + 4;
+    if at(pos, 's') {
+        pos += 1;
+    }
+    if !at(pos, ':') {
+        return None;
+    }
+    pos += 1;
+
+    let separators_start = pos;
+    while (at(pos, '/') && at(pos + 1, '/')) || (at(pos, '\\') && at(pos + 1, '\\')) {
+        pos += 2;
+    }
+    if pos == separators_start {
+        return None;
+    }
+
+    while chars.get(pos).is_some_and(|c| is_url_char(*c)) {
+        pos += 1;
+        if at(pos, '#') && at(pos + 1, '!') {
+            pos += 2;
+        }
+    }
+    Some(pos)
+}
+
+fn is_url_char(c: char) -> bool {
+    // `\+-=` is the range from `+` to `=`
+    c.is_alphanumeric() || ":#@%/;$()~_?\\.&".contains(c) || ('+'..='=').contains(&c)
+}
+
+/// Span of the URL containing `column`
+pub fn url_span(chars: &[char], column: usize) -> Option<(usize, usize)> {
+    find_urls(chars)
+        .take_while(|(start, _)| *start <= column)
+        .find(|(_, end)| column < *end)
+}
+
+/// Characters which can be part of a URL, `!` only in `#!`
+fn is_url_run_char(c: char) -> bool {
+    is_url_char(c) || c == '!'
+}
+
+/// Span of the URL containing `column`, searched in the run of URL characters
+/// around it only, URLs can not reach beyond it
+fn url_run_span(window: &Window, column: usize) -> Scan<(usize, usize)> {
+    let chars = &window.chars;
+    if !chars.get(column).copied().is_some_and(is_url_run_char) {
+        return Ok(None);
+    }
+    let start = match chars[..column].iter().rposition(|c| !is_url_run_char(*c)) {
+        Some(idx) => idx + 1,
+        None if window.at_start() => 0,
+        None => return Err(Truncated),
+    };
+    let end = match chars[column..].iter().position(|c| !is_url_run_char(*c)) {
+        Some(idx) => column + idx,
+        None if window.at_end() => chars.len(),
+        None => return Err(Truncated),
+    };
+    Ok(url_span(&chars[start..end], column - start)
+        .map(|(url_start, url_end)| (start + url_start, start + url_end)))
+}
+
+fn url_at(window: &Window, column: usize) -> Scan<Link> {
+    let Some((start, end)) = url_run_span(window, column)? else {
+        return Ok(None);
+    };
+    let chars = &window.chars;
+    // part of a markdown link
+    if chars[end - 1] == ')' {
+        return Ok(None);
+    }
+    Ok(Some(Link {
+        kind: LinkKind::Url,
+        start,
+        end,
+        target: py_strip(&chars[start..end]),
+    }))
+}
+
+/// `[label]: target` spanning the whole line
+fn reference_definition(line: &str) -> Option<Link> {
+    let rest = line.strip_prefix('[')?;
+    let close = rest.find(']')?;
+    let target = rest[close + 1..].strip_prefix(':')?;
+    let target: Vec<char> = target.chars().collect();
+    let target = py_strip(single_line(&target)?);
+    Some(Link {
+        kind: LinkKind::ReferenceDefinition,
+        start: 0,
+        end: line.chars().count(),
+        target,
+    })
+}
+
+fn path_at(window: &Window, column: usize) -> Scan<Link> {
+    let chars = &window.chars;
+    if matches!(chars.get(column), None | Some(' ') | Some('\t')) {
+        return Ok(None);
+    }
+    let start = rfind(&chars[..column], ' ').map(|idx| idx + 1);
+    let end = find(chars, column, ' ');
+    let path = &chars[start.unwrap_or(0)..end.unwrap_or(chars.len())];
+    // invalid characters in the part seen so far decide without growing
+    if path.iter().any(|c| INVALID_PATH_CHARS.contains(c)) {
+        return Ok(None);
+    }
+    if (start.is_none() && !window.at_start()) || (end.is_none() && !window.at_end()) {
+        return Err(Truncated);
+    }
+    Ok(Some(Link {
+        kind: LinkKind::Path,
+        start: start.unwrap_or(0),
+        end: end.unwrap_or(chars.len()),
+        target: path.iter().collect(),
+    }))
+}
+
+fn markdown_link_at(window: &Window, column: usize) -> Scan<Link> {
+    let chars = &window.chars;
+    let mut start = if chars.get(column) == Some(&'[') {
+        column
+    } else {
+        match window.rfind(column, '[')? {
+            Some(idx) => idx,
+            None => return Ok(None),
+        }
+    };
+    // cursor in the label part of an indirect link
+    if start == 0 && !window.at_start() {
+        return Err(Truncated);
+    }
+    if start != 0 && chars[start - 1] == ']' {
+        if let Some(alt_start) = window.rfind(start, '[')? {
+            start = alt_start;
+        }
+    }
+
+    let Some(text_end) = window.find(start + 1, ']')? else {
+        return Ok(None);
+    };
+    let (kind, target_end) = match window.get(text_end + 1)? {
+        Some('(') => (LinkKind::Direct, window.find(text_end + 2, ')')?),
+        Some('[') => (LinkKind::Indirect, window.find(text_end + 2, ']')?),
+        _ => return Ok(None),
+    };
+    let Some(target_end) = target_end else {
+        return Ok(None);
+    };
+    let end = target_end + 1;
+    if single_line(&chars[end..]).is_none() || end <= column {
+        return Ok(None);
+    }
+
+    let mut target = &chars[text_end + 2..target_end];
+    if kind == LinkKind::Indirect && target.is_empty() {
+        target = &chars[start + 1..text_end];
+    }
+    Ok(Some(Link {
+        kind,
+        start,
+        end,
+        target: target.iter().collect(),
+    }))
+}
+
+/// `.*$` without `re.DOTALL`: no line break except a trailing one
+fn single_line(chars: &[char]) -> Option<&[char]> {
+    let chars = chars.strip_suffix(&['\n']).unwrap_or(chars);
+    (!chars.contains(&'\n')).then_some(chars)
+}
+
+/// Whitespace as stripped by Python's `str.strip`
+fn py_strip(chars: &[char]) -> String {
+    let is_space = |c: &char| c.is_whitespace() || ('\x1c'..='\x1f').contains(c);
+    let start = chars
+        .iter()
+        .position(|c| !is_space(c))
+        .unwrap_or(chars.len());
+    let end = chars
+        .iter()
+        .rposition(|c| !is_space(c))
+        .map_or(start, |idx| idx + 1);
+    chars[start..end].iter().collect()
+}
+
+fn find(chars: &[char], from: usize, needle: char) -> Option<usize> {
+    chars
+        .get(from..)?
+        .iter()
+        .position(|c| *c == needle)
+        .map(|idx| from + idx)
+}
+
+fn rfind(chars: &[char], needle: char) -> Option<usize> {
+    chars.iter().rposition(|c| *c == needle)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    /// `^` marks the cursor, it is placed on the following character
+    fn link(line: &str) -> Option<(LinkKind, String)> {
+        let column = line.chars().position(|c| c == '^').unwrap();
+        let line = line.replacen('^', "", 1);
+        link_at(&line, column).map(|link| (link.kind, link.target))
+    }
+
+    #[test]
+    fn test_link_at() {
+        use LinkKind::*;
+        let cases = [
+            ("foo ^[bar](baz.md)", Some((Direct, "baz.md"))),
+            ("foo [bar](baz.md^)", Some((Direct, "baz.md"))),
+            ("foo [b^ar](baz.md) [bar](bar.md)", Some((Direct, "baz.md"))),
+            ("foo [bar](baz.md) [bar](^bar.md)", Some((Direct, "bar.md"))),
+            ("foo [b^ar][bar]", Some((Indirect, "bar"))),
+            ("foo [bar][b^ar]", Some((Indirect, "bar"))),
+            ("foo [@b^ar][]", Some((Indirect, "@bar"))),
+            (
+                "- [ ] checkout [label]^[target] abs",
+                Some((Indirect, "target")),
+            ),
+            ("][b^ar](bar.md)", Some((Direct, "bar.md"))),
+            ("foo [bar](baz.md)^", None),
+            ("foo^  [bar](baz.md) ", None),
+            ("foo [bar](baz.md)^  ", None),
+            ("^", None),
+            ("[f^oo]: test.md", Some((ReferenceDefinition, "test.md"))),
+            ("[foo]: test.md^", Some((ReferenceDefinition, "test.md"))),
+            (
+                "https://^www.google.com",
+                Some((Url, "https://www.google.com")),
+            ),
+            (
+                "not &%$ https://^www.google.com   .. and more",
+                Some((Url, "https://www.google.com")),
+            ),
+            (
+                "Google: https://www.google.com and http://en.wikipedia.or^g",
+                Some((Url, "http://en.wikipedia.org")),
+            ),
+            ("[xx](http://^yyy/xxx)", Some((Direct, "http://yyy/xxx"))),
+            (
+                "[md-doc]($HO^ME/vimwiki/help.md)",
+                Some((Direct, "$HOME/vimwiki/help.md")),
+            ),
+            ("my line $HO^ME/xxx bla blub", Some((Path, "$HOME/xxx"))),
+            ("$HOME/xxx bl^a blub", Some((Path, "bla"))),
+            ("^$HOME/xxx|blub", None),
+            ("ä ö [ü^](ß.md)", Some((Direct, "ß.md"))),
+        ];
+        for (line, expected) in cases {
+            let expected = expected.map(|(kind, target)| (kind, target.to_string()));
+            assert_eq!(link(line), expected, "{}", line);
+        }
+    }
+
+    #[test]
+    fn test_find_urls() {
+        let chars: Vec<char> = "x http://a.b/c#!d http:/no https:\\\\e>f httpx://g"
+            .chars()
+            .collect();
+        let urls: Vec<String> = find_urls(&chars)
+            .map(|(start, end)| chars[start..end].iter().collect())
+            .collect();
+        assert_eq!(urls, ["http://a.b/c#!d", "https:\\\\e"]);
+    }
+
+    #[test]
+    fn test_window() {
+        let filler = "x".repeat(100_000);
+        let long = format!("https://x.org/{}", "p".repeat(3000));
+        let line = format!("{filler} [a](b.md) {long} {filler}");
+        let column = filler.len() + 2;
+        let link = link_at(&line, column).unwrap();
+        assert_eq!(
+            (link.kind, link.target.as_str()),
+            (LinkKind::Direct, "b.md")
+        );
+        assert_eq!(
+            (link.start, link.end),
+            (filler.len() + 1, filler.len() + 10)
+        );
+
+        // the window grows until the whole URL is in it, from either end
+        let start = filler.len() + 11;
+        for column in [start, start + 2500, start + long.len() - 1] {
+            let link = link_at(&line, column).unwrap();
+            assert_eq!((link.kind, link.target.as_str()), (LinkKind::Url, &*long));
+            assert_eq!((link.start, link.end), (start, start + long.len()));
+            let span = url_span_at(&line, column).unwrap();
+            assert_eq!(span, (start, start + long.len(), long.clone()));
+        }
+
+        // markdown links and paths as well
+        let target = "d/".repeat(3000);
+        let line = format!("{filler} [{}]({target}) {filler}", "t".repeat(3000));
+        let link = link_at(&line, filler.len() + 2).unwrap();
+        assert_eq!((link.kind, link.target), (LinkKind::Direct, target.clone()));
+        let line = format!("{filler} {target} {filler}");
+        let link = link_at(&line, filler.len() + 5000).unwrap();
+        assert_eq!((link.kind, link.target), (LinkKind::Path, target));
+
+        // links longer than the largest window are not found instead of cut off
+        let line = format!("https://x.org/{}", "p".repeat(2 * MAX_WINDOW));
+        assert_eq!(link_at(&line, MAX_WINDOW + 10), None);
+        assert_eq!(url_span_at(&line, MAX_WINDOW + 10), None);
+
+        // the definition is found from the far end of a long line
+        let line = format!("[label]: target.md {filler}");
+        let link = link_at(&line, 90_000).unwrap();
+        assert_eq!(link.kind, LinkKind::ReferenceDefinition);
+        assert_eq!(link.end, line.len());
+
+        // positions are characters, not bytes
+        let line = format!("{} [ü](ß.md) {}", "ä".repeat(5000), "ö".repeat(5000));
+        let link = link_at(&line, 5002).unwrap();
+        assert_eq!((link.start, link.end), (5001, 5010));
+        assert_eq!(link_at(&line, 20_000), None);
+    }
+
+    #[test]
+    fn test_span() {
+        let link = link_at("see [text](target.md) here", 6).unwrap();
+        assert_eq!((link.start, link.end), (4, 21));
+        let link = link_at("see https://x.org here", 6).unwrap();
+        assert_eq!((link.start, link.end), (4, 17));
+    }
+}
@@ -0,0 +1,98 @@
+//! Runtime configuration of the title fetching pipeline.
+//!
+//! The values start out with sensible defaults and can be changed from
+//! Python via `vimania_uri_rs.configure(...)`, which the Vim plugin calls
+//! with the `g:vimania_uri_rs_*` variables set by the user.
+
+use once_cell::sync::Lazy;
+use std::env;
+use std::path::PathBuf;
+use std::str::FromStr;
+use std::sync::RwLock;
+use std::time::Duration;
+
+/// How cached titles are used
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum LookupMode {
+    /// Expired entries are fetched again before answering
+    Fresh,
+    /// Any cached entry answers right away, expired ones are revalidated in the background
+    StaleWhileRevalidate,
+}
+
+impl FromStr for LookupMode {
+    type Err = String;
+
+    fn from_str(mode: &str) -> Result<Self, Self::Err> {
+        match mode {
+            "fresh" => Ok(LookupMode::Fresh),
+            "stale-while-revalidate" | "offline-first" => Ok(LookupMode::StaleWhileRevalidate),
+            _ => Err(format!(
+                "Unknown lookup mode {:?}, expected 'fresh' or 'stale-while-revalidate'",
+                mode
+            )),
+        }
+    }
+}
+
+#[derive(Debug, Clone)]
+pub struct Settings {
+    /// Use the persistent title cache
+    pub cache_enabled: bool,
+    /// Directory holding the title cache entries
+    pub cache_dir: PathBuf,
+    /// Age after which a cached title is fetched again
+    pub cache_ttl: Duration,
+    /// Upper bound of cached titles, least recently used ones are evicted first
+    pub cache_max_entries: usize,
+    /// Upper bound of downloaded (decompressed) body bytes per title request
+    pub max_body_bytes: usize,
+    /// Ask servers for the first `max_body_bytes` only via a `Range` header
+    pub range_hint: bool,
+    /// Initial back-off after a failed fetch, doubled with every further failure, zero disables it
+    pub backoff_base: Duration,
+    /// Upper bound of the back-off
+    pub backoff_max: Duration,
+    pub lookup_mode: LookupMode,
+}
+
+impl Default for Settings {
+    fn default() -> Self {
+        Settings {
+            cache_enabled: true,
+            cache_dir: default_cache_dir(),
+            cache_ttl: Duration::from_secs(7 * 24 * 60 * 60),
+            cache_max_entries: 5000,
+            max_body_bytes: 1024 * 1024,
+            range_hint: false,
+            backoff_base: Duration::from_secs(30),
+            backoff_max: Duration::from_secs(60 * 60),
+            lookup_mode: LookupMode::Fresh,
+        }
+    }
+}
+
+static SETTINGS: Lazy<RwLock<Settings>> = Lazy::new(|| RwLock::new(Settings::default()));
+
+/// Snapshot of the current settings
+pub fn current() -> Settings {
+    SETTINGS.read().unwrap_or_else(|e| e.into_inner()).clone()
+}
+
+/// Apply `f` to the global settings
+pub fn update<F: FnOnce(&mut Settings)>(f: F) {
+    let mut settings = SETTINGS.write().unwrap_or_else(|e| e.into_inner());
+    f(&mut settings);
+}
+
+/// `$VIMANIA_URI_CACHE_DIR`, `$XDG_CACHE_HOME/vimania-uri-rs` or `~/.cache/vimania-uri-rs`
+fn default_cache_dir() -> PathBuf {
+    if let Some(dir) = env::var_os("VIMANIA_URI_CACHE_DIR") {
+        return PathBuf::from(dir);
+    }
+    let base = env::var_os("XDG_CACHE_HOME")
+        .map(PathBuf::from)
+        .or_else(|| env::var_os("HOME").map(|home| PathBuf::from(home).join(".cache")))
+        .unwrap_or_else(env::temp_dir);
+    base.join("vimania-uri-rs")
+}
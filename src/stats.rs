@@ -0,0 +1,177 @@
+//! Latency histograms of the title fetching phases.
+//!
+//! Always on: recording a sample locks a mutex and increments a few counters,
+//! which is negligible next to a network request. Durations are counted in
+//! buckets of powers of two microseconds, bucket `i` holds samples below
+//! `2^i` µs. `vimania_uri_.stats` uses the same buckets for the Python phases
+//! and reports both together.
+//!
+//! DNS, connect and TLS happen inside reqwest, which has no hooks for them:
+//! they are part of `http_request`, the time until the response headers arrived.
+
+use once_cell::sync::Lazy;
+use serde::Serialize;
+use std::collections::BTreeMap;
+use std::sync::{Mutex, MutexGuard};
+use std::time::{Duration, Instant};
+
+pub const BUCKETS: usize = 32;
+
+#[derive(Debug, Clone, PartialEq, Eq, Serialize)]
+pub struct Histogram {
+    pub count: u64,
+    pub sum_us: u64,
+    pub min_us: u64,
+    pub max_us: u64,
+    pub buckets: Vec<u64>,
+}
+
+impl Default for Histogram {
+    fn default() -> Self {
+        Histogram {
+            count: 0,
+            sum_us: 0,
+            min_us: 0,
+            max_us: 0,
+            buckets: vec![0; BUCKETS],
+        }
+    }
+}
+
+impl Histogram {
+    pub fn record(&mut self, elapsed: Duration) {
+        let us = u64::try_from(elapsed.as_micros()).unwrap_or(u64::MAX);
+        self.min_us = if self.count == 0 {
+            us
+        } else {
+            self.min_us.min(us)
+        };
+        self.max_us = self.max_us.max(us);
+        self.count += 1;
+        self.sum_us = self.sum_us.saturating_add(us);
+        self.buckets[bucket(us)] += 1;
+    }
+}
+
+/// Index of the bucket counting `us`, the number of significant bits
+pub fn bucket(us: u64) -> usize {
+    ((u64::BITS - us.leading_zeros()) as usize).min(BUCKETS - 1)
+}
+
+static HISTOGRAMS: Lazy<Mutex<BTreeMap<&'static str, Histogram>>> =
+    Lazy::new(|| Mutex::new(BTreeMap::new()));
+
+fn histograms() -> MutexGuard<'static, BTreeMap<&'static str, Histogram>> {
+    HISTOGRAMS.lock().unwrap_or_else(|e| e.into_inner())
+}
+
+pub fn record(phase: &'static str, elapsed: Duration) {
+    histograms().entry(phase).or_default().record(elapsed);
+}
+
+/// Histograms of all phases with at least one sample
+pub fn snapshot() -> BTreeMap<&'static str, Histogram> {
+    histograms().clone()
+}
+
+pub fn reset() {
+    histograms().clear();
+}
+
+/// Records the time from its creation until it is dropped
+pub struct Span {
+    phase: &'static str,
+    start: Instant,
+}
+
+impl Span {
+    pub fn start(phase: &'static str) -> Self {
+        Span {
+            phase,
+            start: Instant::now(),
+        }
+    }
+}
+
+impl Drop for Span {
+    fn drop(&mut self) {
+        record(self.phase, self.start.elapsed());
+    }
+}
+
+/// Sums up the time of several calls, the total is recorded when it is dropped
+pub struct Accumulated {
+    phase: &'static str,
+    elapsed: Duration,
+}
+
+impl Accumulated {
+    pub fn new(phase: &'static str) -> Self {
+        Accumulated {
+            phase,
+            elapsed: Duration::ZERO,
+        }
+    }
+
+    pub fn time<T>(&mut self, f: impl FnOnce() -> T) -> T {
+        let start = Instant::now();
+        let result = f();
+        self.elapsed += start.elapsed();
+        result
+    }
+}
+
+impl Drop for Accumulated {
+    fn drop(&mut self) {
+        record(self.phase, self.elapsed);
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_bucket() {
+        let cases = [
+            (0, 0),
+            (1, 1),
+            (2, 2),
+            (3, 2),
+            (4, 3),
+            (1023, 10),
+            (1024, 11),
+        ];
+        for (us, expected) in cases {
+            assert_eq!(bucket(us), expected, "{}", us);
+        }
+        assert_eq!(bucket(u64::MAX), BUCKETS - 1);
+    }
+
+    #[test]
+    fn test_histogram() {
+        let mut histogram = Histogram::default();
+        for us in [30, 10, 20] {
+            histogram.record(Duration::from_micros(us));
+        }
+        assert_eq!(histogram.count, 3);
+        assert_eq!(histogram.sum_us, 60);
+        assert_eq!((histogram.min_us, histogram.max_us), (10, 30));
+        assert_eq!(histogram.buckets[4], 1);
+        assert_eq!(histogram.buckets[5], 2);
+    }
+
+    #[test]
+    fn test_spans() {
+        {
+            let _span = Span::start("test_span");
+            let mut acc = Accumulated::new("test_accumulated");
+            assert_eq!(acc.time(|| 42), 42);
+            acc.time(|| ());
+        }
+        let snapshot = snapshot();
+        assert_eq!(snapshot["test_span"].count, 1);
+        // several calls are one sample
+        assert_eq!(snapshot["test_accumulated"].count, 1);
+    }
+}
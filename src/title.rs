@@ -0,0 +1,402 @@
+//! Streaming `<title>` extraction.
+//!
+//! The page body is fed chunk by chunk into a small tokenizer which only
+//! understands what is needed to find the first `<title>` element: comments,
+//! raw text elements (`<script>`, `<style>`) and `<meta>` charset declarations.
+//! As soon as `</title>` shows up the title is returned and the caller can
+//! stop downloading. Only if the buffered body has no complete title element
+//! is it parsed into a full DOM as fallback.
+
+use encoding_rs::{Encoding, UTF_8};
+use scraper::{Html, Selector};
+use std::borrow::Cow;
+
+use crate::UriError;
+
+const TITLE_CLOSE: &[u8] = b"</title";
+const SCRIPT_CLOSE: &[u8] = b"</script";
+const STYLE_CLOSE: &[u8] = b"</style";
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq, PartialOrd, Ord)]
+enum Confidence {
+    Default,
+    Meta,
+    /// byte order mark or HTTP header, never overridden by `<meta>`
+    Certain,
+}
+
+#[derive(Debug)]
+pub struct TitleScanner {
+    buf: Vec<u8>,
+    /// next byte to tokenize
+    pos: usize,
+    encoding: &'static Encoding,
+    confidence: Confidence,
+    /// closing tag of the raw text element being skipped
+    skip_until: Option<&'static [u8]>,
+    /// first byte of the title text once `<title>` has been seen
+    title_start: Option<usize>,
+    bom_checked: bool,
+}
+
+impl TitleScanner {
+    /// `header_encoding` is the charset announced by the `Content-Type` header
+    pub fn new(header_encoding: Option<&'static Encoding>) -> Self {
+        TitleScanner {
+            buf: Vec::new(),
+            pos: 0,
+            encoding: header_encoding.unwrap_or(UTF_8),
+            confidence: if header_encoding.is_some() {
+                Confidence::Certain
+            } else {
+                Confidence::Default
+            },
+            skip_until: None,
+            title_start: None,
+            bom_checked: false,
+        }
+    }
+
+    /// Number of body bytes seen so far
+    pub fn len(&self) -> usize {
+        self.buf.len()
+    }
+
+    /// Feed the next chunk of the body, returns the title once it is complete
+    pub fn feed(&mut self, chunk: &[u8]) -> Option<String> {
+        self.buf.extend_from_slice(chunk);
+        if !self.bom_checked {
+            if self.buf.len() < 3 {
+                return None;
+            }
+            self.bom_checked = true;
+            if let Some((encoding, bom_len)) = Encoding::for_bom(&self.buf) {
+                self.encoding = encoding;
+                self.confidence = Confidence::Certain;
+                self.pos = bom_len;
+            }
+        }
+        // the tokenizer works on bytes, UTF-16 bodies go the fallback route
+        if !self.encoding.is_ascii_compatible() {
+            return None;
+        }
+        self.scan()
+    }
+
+    fn scan(&mut self) -> Option<String> {
+        loop {
+            if let Some(start) = self.title_start {
+                return match find_ci(&self.buf[self.pos..], TITLE_CLOSE) {
+                    Some(idx) => Some(self.decode_title(start, self.pos + idx)),
+                    None => {
+                        self.pos = resume_pos(self.buf.len(), self.pos, TITLE_CLOSE);
+                        None
+                    }
+                };
+            }
+
+            if let Some(closing) = self.skip_until {
+                match find_ci(&self.buf[self.pos..], closing) {
+                    Some(idx) => {
+                        self.pos += idx + closing.len();
+                        self.skip_until = None;
+                    }
+                    None => {
+                        self.pos = resume_pos(self.buf.len(), self.pos, closing);
+                        return None;
+                    }
+                }
+            }
+
+            let Some(lt) = self.buf[self.pos..].iter().position(|b| *b == b'<') else {
+                self.pos = self.buf.len();
+                return None;
+            };
+            let tag_start = self.pos + lt;
+            let rest = &self.buf[tag_start..];
+
+            if rest.len() < 4 {
+                self.pos = tag_start;
+                return None;
+            }
+            if rest.starts_with(b"<!--") {
+                match find(&rest[4..], b"-->") {
+                    Some(idx) => self.pos = tag_start + 4 + idx + 3,
+                    None => {
+                        self.pos = tag_start;
+                        return None;
+                    }
+                }
+                continue;
+            }
+
+            let Some(gt) = rest.iter().position(|b| *b == b'>') else {
+                self.pos = tag_start;
+                return None;
+            };
+            let tag = &rest[1..gt];
+            self.pos = tag_start + gt + 1;
+
+            match tag_name(tag) {
+                name if name.eq_ignore_ascii_case(b"title") => {
+                    self.title_start = Some(self.pos);
+                }
+                name if name.eq_ignore_ascii_case(b"script") => {
+                    self.skip_until = Some(SCRIPT_CLOSE);
+                }
+                name if name.eq_ignore_ascii_case(b"style") => {
+                    self.skip_until = Some(STYLE_CLOSE);
+                }
+                name if name.eq_ignore_ascii_case(b"meta") => {
+                    if self.confidence < Confidence::Meta {
+                        if let Some(encoding) = charset_param(tag) {
+                            // a meta declaration can never switch to UTF-16
+                            self.encoding = encoding.output_encoding();
+                            self.confidence = Confidence::Meta;
+                        }
+                    }
+                }
+                _ => {}
+            }
+        }
+    }
+
+    fn decode_title(&self, start: usize, end: usize) -> String {
+        let (text, _) = self
+            .encoding
+            .decode_without_bom_handling(&self.buf[start..end]);
+        decode_entities(&text).trim().to_string()
+    }
+
+    /// Fallback: parse everything received so far into a DOM
+    pub fn finish(self) -> Result<String, UriError> {
+        // a byte order mark still wins over the detected encoding
+        let (body, _, _) = self.encoding.decode(&self.buf);
+        parse_title(&body)
+    }
+}
+
+/// Extract the title from a complete HTML document
+pub fn parse_title(body: &str) -> Result<String, UriError> {
+    let document = Html::parse_document(body);
+    let selector = Selector::parse("title")
+        .map_err(|e| UriError::HtmlError(format!("Failed to parse title selector: {:?}", e)))?;
+
+    let title = document
+        .select(&selector)
+        .next()
+        .ok_or_else(|| UriError::HtmlError("No title element found".to_string()))?
+        .text()
+        .collect::<String>()
+        .trim()
+        .to_string();
+
+    Ok(title)
+}
+
+/// Encoding named by a `charset=` parameter, e.g. of a `Content-Type` value or `<meta>` tag
+pub fn charset_param(value: &[u8]) -> Option<&'static Encoding> {
+    let idx = find_ci(value, b"charset")?;
+    let rest = value[idx + b"charset".len()..].trim_ascii_start();
+    let rest = rest.strip_prefix(b"=")?.trim_ascii_start();
+    let rest = rest
+        .strip_prefix(b"\"")
+        .or_else(|| rest.strip_prefix(b"'"))
+        .unwrap_or(rest);
+    let end = rest
+        .iter()
+        .position(|b| matches!(b, b'"' | b'\'' | b';' | b'/' | b'>') || b.is_ascii_whitespace())
+        .unwrap_or(rest.len());
+    Encoding::for_label(&rest[..end])
+}
+
+/// Tag name of the bytes between `<` and `>`
+fn tag_name(tag: &[u8]) -> &[u8] {
+    let end = tag
+        .iter()
+        .position(|b| *b == b'/' || b.is_ascii_whitespace())
+        .unwrap_or(tag.len());
+    &tag[..end]
+}
+
+/// Where to continue searching for `needle` after more data arrived
+fn resume_pos(len: usize, pos: usize, needle: &[u8]) -> usize {
+    pos.max(len.saturating_sub(needle.len() - 1))
+}
+
+fn find(haystack: &[u8], needle: &[u8]) -> Option<usize> {
+    haystack.windows(needle.len()).position(|w| w == needle)
+}
+
+fn find_ci(haystack: &[u8], needle: &[u8]) -> Option<usize> {
+    haystack
+        .windows(needle.len())
+        .position(|w| w.eq_ignore_ascii_case(needle))
+}
+
+/// Decode character references, unknown named references are kept verbatim
+pub fn decode_entities(text: &str) -> Cow<'_, str> {
+    if !text.contains('&') {
+        return Cow::Borrowed(text);
+    }
+    let mut out = String::with_capacity(text.len());
+    let mut rest = text;
+    while let Some(amp) = rest.find('&') {
+        out.push_str(&rest[..amp]);
+        rest = &rest[amp..];
+        let decoded = rest[1..].find(';').and_then(|semi| {
+            let name = &rest[1..1 + semi];
+            let ch = match name {
+                "amp" => Some('&'),
+                "lt" => Some('<'),
+                "gt" => Some('>'),
+                "quot" => Some('"'),
+                "apos" => Some('\''),
+                "nbsp" => Some('\u{a0}'),
+                _ => name
+                    .strip_prefix("#x")
+                    .or_else(|| name.strip_prefix("#X"))
+                    .map(|hex| u32::from_str_radix(hex, 16))
+                    .or_else(|| name.strip_prefix('#').map(|dec| dec.parse::<u32>()))
+                    .and_then(|code| code.ok())
+                    .and_then(char::from_u32),
+            };
+            ch.map(|ch| (ch, semi + 2))
+        });
+        match decoded {
+            Some((ch, len)) => {
+                out.push(ch);
+                rest = &rest[len..];
+            }
+            None => {
+                out.push('&');
+                rest = &rest[1..];
+            }
+        }
+    }
+    out.push_str(rest);
+    Cow::Owned(out)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn scan_chunked(body: &[u8], chunk_size: usize) -> (Option<String>, usize) {
+        let mut scanner = TitleScanner::new(None);
+        for chunk in body.chunks(chunk_size) {
+            if let Some(title) = scanner.feed(chunk) {
+                return (Some(title), scanner.len());
+            }
+        }
+        (None, scanner.len())
+    }
+
+    #[test]
+    fn test_scan_title() {
+        let cases: [(&[u8], &str); 6] = [
+            (b"<html><head><title>Simple</title></head>", "Simple"),
+            (
+                b"<HTML><HEAD><TITLE lang=\"en\">\n  Upper Case \n</TITLE>",
+                "Upper Case",
+            ),
+            (
+                b"<!-- <title>comment</title> --><title>Real</title>",
+                "Real",
+            ),
+            (
+                b"<script>var s = '<title>js</title>';</script><title>Real</title>",
+                "Real",
+            ),
+            (
+                b"<title>Tom &amp; Jerry &#39;&#x41;&#65;&copy;</title>",
+                "Tom & Jerry 'AA&copy;",
+            ),
+            (b"\xEF\xBB\xBF<title>BOM \xC3\xA4</title>", "BOM \u{e4}"),
+        ];
+        for (body, expected) in cases {
+            for chunk_size in [1, 3, 7, 4096] {
+                let (title, _) = scan_chunked(body, chunk_size);
+                assert_eq!(
+                    title.as_deref(),
+                    Some(expected),
+                    "chunk size {}",
+                    chunk_size
+                );
+            }
+        }
+    }
+
+    #[test]
+    fn test_stops_at_title_close() {
+        let mut body = b"<html><head><title>Early</title></head><body>".to_vec();
+        body.extend(std::iter::repeat(b'x').take(1_000_000));
+        let (title, consumed) = scan_chunked(&body, 1024);
+        assert_eq!(title.as_deref(), Some("Early"));
+        assert_eq!(consumed, 1024);
+    }
+
+    #[test]
+    fn test_meta_charset() {
+        let body = b"<meta charset=\"windows-1252\"><title>Caf\xE9</title>";
+        assert_eq!(scan_chunked(body, 5).0.as_deref(), Some("Caf\u{e9}"));
+
+        let body = b"<meta http-equiv=\"Content-Type\" content=\"text/html; charset=ISO-8859-1\"><title>Caf\xE9</title>";
+        assert_eq!(scan_chunked(body, 5).0.as_deref(), Some("Caf\u{e9}"));
+    }
+
+    #[test]
+    fn test_header_charset_wins_over_meta() {
+        let mut scanner = TitleScanner::new(charset_param(b"text/html; charset=windows-1252"));
+        let title = scanner.feed(b"<meta charset=\"utf-8\"><title>Caf\xE9</title>");
+        assert_eq!(title.as_deref(), Some("Caf\u{e9}"));
+    }
+
+    #[test]
+    fn test_fallback_without_title_close() {
+        let mut scanner = TitleScanner::new(None);
+        assert_eq!(
+            scanner.feed(b"<html><body>no title here</body></html>"),
+            None
+        );
+        assert!(matches!(scanner.finish(), Err(UriError::HtmlError(_))));
+    }
+
+    #[test]
+    fn test_titles_are_decoded() {
+        // character references are decoded by the scanner and the DOM fallback
+        // alike, the raw markup of the title is never returned
+        let body = "<title>Tom &amp; Jerry &lt;3&gt; &quot;Live&quot;</title>";
+        let expected = "Tom & Jerry <3> \"Live\"";
+        assert_eq!(
+            scan_chunked(body.as_bytes(), 4).0.as_deref(),
+            Some(expected)
+        );
+        assert_eq!(parse_title(body).unwrap(), expected);
+    }
+
+    #[test]
+    fn test_fallback_utf16() {
+        let body: Vec<u8> = b"\xFF\xFE"
+            .iter()
+            .copied()
+            .chain(
+                "<title>Wide</title>"
+                    .encode_utf16()
+                    .flat_map(|u| u.to_le_bytes()),
+            )
+            .collect();
+        let mut scanner = TitleScanner::new(None);
+        assert_eq!(scanner.feed(&body), None);
+        assert_eq!(scanner.finish().unwrap(), "Wide");
+    }
+
+    #[test]
+    fn test_charset_param() {
+        assert_eq!(
+            charset_param(b"text/html; charset=\"windows-1252\"").map(|e| e.name()),
+            Some("windows-1252")
+        );
+        assert_eq!(charset_param(b"text/html").map(|e| e.name()), None);
+    }
+}
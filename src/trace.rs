@@ -0,0 +1,164 @@
+//! In-memory trace of the log records of the extension.
+//!
+//! Forwarding every record to Python `logging` formats it and takes the GIL,
+//! on the hot path of every title fetch. Records are kept in a bounded ring
+//! buffer instead, the oldest ones are dropped when it is full, and Python
+//! reads them only when asked via `dump_trace`. Records above the trace level
+//! are rejected by the `log` macros with a single comparison.
+
+use log::{Level, LevelFilter, Log, Metadata, Record};
+use once_cell::sync::Lazy;
+use std::collections::VecDeque;
+use std::sync::{Mutex, MutexGuard};
+use std::thread;
+use std::time::{SystemTime, UNIX_EPOCH};
+
+/// Records kept, the oldest ones are dropped first
+pub const CAPACITY: usize = 4096;
+
+/// Level of the trace until `set_level` is called
+pub const DEFAULT_LEVEL: LevelFilter = LevelFilter::Info;
+
+/// Chatty dependencies, only their warnings and errors are kept
+const QUIET_TARGETS: [&str; 4] = ["html5ever", "selectors", "build_wheels", "filelock"];
+
+#[derive(Debug, Clone, PartialEq)]
+pub struct TraceEvent {
+    /// Seconds since the Unix epoch
+    pub timestamp: f64,
+    pub level: Level,
+    pub target: String,
+    pub thread: Option<String>,
+    pub message: String,
+}
+
+pub struct TraceLogger {
+    events: Mutex<VecDeque<TraceEvent>>,
+    capacity: usize,
+}
+
+pub static LOGGER: Lazy<TraceLogger> = Lazy::new(|| TraceLogger::new(CAPACITY));
+
+impl TraceLogger {
+    pub fn new(capacity: usize) -> Self {
+        TraceLogger {
+            events: Mutex::new(VecDeque::with_capacity(capacity)),
+            capacity,
+        }
+    }
+
+    fn events(&self) -> MutexGuard<'_, VecDeque<TraceEvent>> {
+        self.events.lock().unwrap_or_else(|e| e.into_inner())
+    }
+
+    /// Recorded events, oldest first, `clear` empties the buffer
+    pub fn dump(&self, clear: bool) -> Vec<TraceEvent> {
+        let mut events = self.events();
+        if clear {
+            events.drain(..).collect()
+        } else {
+            events.iter().cloned().collect()
+        }
+    }
+}
+
+impl Log for TraceLogger {
+    fn enabled(&self, metadata: &Metadata) -> bool {
+        metadata.level() <= log::max_level()
+            && (metadata.level() <= Level::Warn
+                || !QUIET_TARGETS
+                    .iter()
+                    .any(|target| metadata.target().starts_with(target)))
+    }
+
+    fn log(&self, record: &Record) {
+        if !self.enabled(record.metadata()) {
+            return;
+        }
+        let event = TraceEvent {
+            timestamp: SystemTime::now()
+                .duration_since(UNIX_EPOCH)
+                .map_or(0.0, |d| d.as_secs_f64()),
+            level: record.level(),
+            target: record.target().to_string(),
+            thread: thread::current().name().map(str::to_string),
+            message: record.args().to_string(),
+        };
+        let mut events = self.events();
+        if events.len() >= self.capacity {
+            events.pop_front();
+        }
+        events.push_back(event);
+    }
+
+    fn flush(&self) {}
+}
+
+/// Install the trace as logger of the extension, does nothing if a logger is installed
+pub fn install() {
+    if log::set_logger(&*LOGGER).is_ok() {
+        log::set_max_level(DEFAULT_LEVEL);
+    }
+}
+
+/// Change the level of the recorded events: off, error, warn, info, debug or trace
+pub fn set_level(level: &str) -> Result<(), String> {
+    let level = level
+        .parse::<LevelFilter>()
+        .map_err(|_| format!("Unknown trace level: {}", level))?;
+    log::set_max_level(level);
+    Ok(())
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn log(logger: &TraceLogger, level: Level, target: &str, message: &str) {
+        logger.log(
+            &Record::builder()
+                .level(level)
+                .target(target)
+                .args(format_args!("{}", message))
+                .build(),
+        );
+    }
+
+    #[test]
+    fn test_ring_buffer() {
+        log::set_max_level(LevelFilter::Trace);
+        let logger = TraceLogger::new(2);
+        for message in ["one", "two", "three"] {
+            log(&logger, Level::Debug, "vimania_uri_rs", message);
+        }
+        let messages = |events: Vec<TraceEvent>| {
+            events
+                .into_iter()
+                .map(|event| event.message)
+                .collect::<Vec<_>>()
+        };
+        assert_eq!(messages(logger.dump(false)), ["two", "three"]);
+        assert_eq!(messages(logger.dump(true)), ["two", "three"]);
+        assert!(logger.dump(false).is_empty());
+    }
+
+    #[test]
+    fn test_quiet_targets() {
+        log::set_max_level(LevelFilter::Trace);
+        let logger = TraceLogger::new(CAPACITY);
+        log(&logger, Level::Debug, "html5ever::tree_builder", "noise");
+        log(&logger, Level::Warn, "html5ever::tree_builder", "warning");
+        log(&logger, Level::Trace, "vimania_uri_rs::jobs", "kept");
+        let events = logger.dump(true);
+        assert_eq!(events.len(), 2);
+        assert_eq!(events[0].level, Level::Warn);
+        assert_eq!(events[1].target, "vimania_uri_rs::jobs");
+    }
+
+    #[test]
+    fn test_set_level() {
+        assert!(set_level("bogus").is_err());
+        assert!(set_level("TRACE").is_ok());
+        assert_eq!(log::max_level(), LevelFilter::Trace);
+    }
+}
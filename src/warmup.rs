@@ -0,0 +1,61 @@
+//! Background warm-up of the HTTP client.
+//!
+//! Building `HTTP_CLIENT` sets up rustls and loads the root certificates, the
+//! first title fetch of a session pays for it otherwise. The warm-up builds the
+//! client on a background thread. It runs at most once per session and is
+//! disabled by default.
+//!
+//! Connections are not opened ahead: the pool drops idle ones after about 90 s,
+//! long before the first link is pasted.
+
+use log::{debug, warn};
+use once_cell::sync::Lazy;
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::thread;
+use std::time::Instant;
+
+use crate::HTTP_CLIENT;
+
+static STARTED: AtomicBool = AtomicBool::new(false);
+
+/// Start the warm-up on a background thread, `false` if it has been started before
+pub fn start() -> bool {
+    start_once(&STARTED, || {
+        let start = Instant::now();
+        Lazy::force(&HTTP_CLIENT);
+        debug!("HTTP client ready in {:?}", start.elapsed());
+    })
+}
+
+fn start_once(started: &AtomicBool, warm_up: impl FnOnce() + Send + 'static) -> bool {
+    if started.swap(true, Ordering::SeqCst) {
+        return false;
+    }
+    let spawned = thread::Builder::new()
+        .name("vimania-warm-up".to_string())
+        .spawn(warm_up);
+    if let Err(e) = spawned {
+        warn!("Cannot start the warm-up: {}", e);
+        started.store(false, Ordering::SeqCst);
+        return false;
+    }
+    true
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::sync::mpsc;
+
+    #[test]
+    fn test_start_once() {
+        let started = AtomicBool::new(false);
+        let (tx, rx) = mpsc::channel();
+        let first = tx.clone();
+        assert!(start_once(&started, move || first.send(1).unwrap()));
+        assert!(!start_once(&started, move || tx.send(2).unwrap()));
+        assert_eq!(rx.recv().unwrap(), 1);
+        // the second sender is dropped without running
+        assert!(rx.recv().is_err());
+    }
+}
@@ -0,0 +1,158 @@
+"""Micro-benchmarks of the 'go' path: link parsing, anchor lookup and dispatch.
+
+    PYTHONPATH=pythonx python -m tests.benchmarks.bench_mdnav [-k parse_line]
+        [--json results.json] [--compare baseline.json]
+
+Parsers are measured with the Python cascade ('py') and, if the extension is
+installed, with 'vimania_uri_rs' ('rs').
+"""
+import argparse
+import itertools
+import logging
+import sys
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+from tests.benchmarks import corpus
+from tests.benchmarks.harness import (
+    format_results,
+    load_baseline,
+    measure,
+    to_json,
+)
+from vimania_uri_.md import mdnav
+from vimania_uri_.md.index import BufferIndex
+from vimania_uri_.md.mdnav import URI
+
+MANY_LINKS = corpus.many_links()
+LONG_LINE = corpus.long_line()
+HEADINGS = corpus.heading_tree()
+REFERENCES = corpus.reference_document()
+
+PARSERS = {"py": None, "rs": mdnav.vimania_uri_rs}
+
+
+@contextmanager
+def parser(name: str) -> Iterator[None]:
+    extension = mdnav.vimania_uri_rs
+    mdnav.vimania_uri_rs = PARSERS[name]
+    try:
+        yield
+    finally:
+        mdnav.vimania_uri_rs = extension
+
+
+def cycling(func: Callable, args: List[tuple]) -> Callable[[], object]:
+    """Calls 'func' with the next arguments of 'args' on every call"""
+    args = itertools.cycle(args)
+    return lambda: func(*next(args))
+
+
+def cursors(lines: List[str], rows: int = 500, step: int = 7) -> List[tuple]:
+    """Cursor positions every 'step' columns, links and plain text alike"""
+    return [
+        (row, col)
+        for row, line in enumerate(lines[:rows])
+        for col in range(0, len(line), step)
+    ]
+
+
+def parse_line_benchmarks() -> Dict[str, Callable[[], object]]:
+    url_column = LONG_LINE.index("https://example.com/deep")
+    long_line = [LONG_LINE]
+    first_reference = next(
+        (row, line.index("][") + 1)
+        for row, line in enumerate(REFERENCES)
+        if "][" in line
+    )
+    return {
+        "parse_line/many_links": cycling(
+            mdnav.parse_line, [(c, MANY_LINKS) for c in cursors(MANY_LINKS)]
+        ),
+        "parse_line/long_line_url": lambda: mdnav.parse_line(
+            (0, url_column + 5), long_line
+        ),
+        "parse_line/long_line_text": lambda: mdnav.parse_line((0, 1000), long_line),
+        "parse_line/reference_at_end": lambda: mdnav.parse_line(
+            first_reference, REFERENCES
+        ),
+    }
+
+
+def benchmarks() -> Dict[str, Callable[[], object]]:
+    url_column = LONG_LINE.index("https://example.com/deep")
+    checks = [(MANY_LINKS[row], col) for row, col in cursors(MANY_LINKS)]
+
+    index = BufferIndex()
+    index.update(1, REFERENCES)
+    anchors = BufferIndex()
+    anchors.update(1, HEADINGS)
+    last_heading = HEADINGS[-2].lstrip("#")
+
+    targets = [
+        URI("docs/page_1.md"),
+        URI("$HOME/notes/file.txt#L12"),
+        URI("~/dev/project/README.md:42"),
+        URI("https://example.com/path?q=1#frag"),
+        URI("file:///tmp/report.pdf"),
+        URI("#some-heading"),
+    ]
+    extensions = {".md", ".txt"}
+    return {
+        "check_url/long_line": lambda: mdnav.check_url(LONG_LINE, url_column + 5),
+        "check_url/many_links": cycling(mdnav.check_url, checks),
+        "check_path/long_line": lambda: mdnav.check_path(LONG_LINE, 1000),
+        "check_path/many_links": cycling(mdnav.check_path, checks),
+        "find_anchor/deep_heading": lambda: mdnav.JumpToAnchor.find_anchor(
+            last_heading, HEADINGS
+        ),
+        "find_anchor/attr_id": lambda: mdnav.JumpToAnchor.find_anchor(
+            "#target-id", HEADINGS
+        ),
+        "index.find_anchor/deep_heading": lambda: anchors.find_anchor(last_heading),
+        "index.parse_line/reference_at_end": cycling(
+            index.parse_line, [(c, REFERENCES) for c in cursors(REFERENCES, step=11)]
+        ),
+        "parse_uri": cycling(mdnav.parse_uri, [(t,) for t in targets]),
+        "open_uri": cycling(mdnav.open_uri, [(t, extensions) for t in targets]),
+    }
+
+
+def run(pattern: str = "", min_time: float = 0.5) -> list:
+    results = []
+    for name in PARSERS:
+        if name == "rs" and PARSERS[name] is None:
+            continue
+        with parser(name):
+            for bench, func in parse_line_benchmarks().items():
+                if pattern in f"{bench}/{name}":
+                    results.append(measure(f"{bench}/{name}", func, min_time))
+    with parser("py"):
+        for bench, func in benchmarks().items():
+            if pattern in bench:
+                results.append(measure(bench, func, min_time))
+    return results
+
+
+def main(argv=None) -> int:
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument("-k", "--filter", default="", help="substring of the names")
+    args.add_argument("--min-time", type=float, default=0.5, help="seconds per case")
+    args.add_argument("--json", help="write the results to this file")
+    args.add_argument("--compare", help="results of an earlier run to compare with")
+    args = args.parse_args(argv)
+
+    # debug logging of the hot path would dominate the timings
+    logging.getLogger("vimania-uri_").setLevel(logging.WARNING)
+
+    results = run(args.filter, args.min_time)
+    baseline = load_baseline(args.compare) if args.compare else None
+    print("\n".join(format_results(results, baseline)))
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(to_json(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Generated markdown documents for the benchmarks, deterministic per seed."""
+import random
+from typing import List
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod".split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def many_links(lines: int = 2000, seed: int = 0) -> List[str]:
+    """Prose with several links of every kind per line"""
+    rng = random.Random(seed)
+    links = [
+        lambda i: f"[link {i}](docs/page_{i}.md)",
+        lambda i: f"https://example.com/path/{i}?q={i}#frag",
+        lambda i: f"$HOME/notes/file_{i}.txt",
+        lambda i: f"[ref link][ref-{i % 50}]",
+        lambda i: f"<https://example.org/{i}>",
+    ]
+    document = []
+    for i in range(lines):
+        parts = [_text(rng, rng.randint(2, 8))]
+        for _ in range(rng.randint(1, 4)):
+            parts += [rng.choice(links)(i), _text(rng, rng.randint(1, 6))]
+        document.append(" ".join(parts))
+    document += [f"[ref-{i}]: https://example.net/{i}" for i in range(50)]
+    return document
+
+
+def long_line(length: int = 100_000, seed: int = 0) -> str:
+    """Single line of prose, e.g. minified or unwrapped text, with a URL at 90%"""
+    rng = random.Random(seed)
+    line = _text(rng, length // 5)[:length]
+    at = int(length * 0.9)
+    at = line.index(" ", at) + 1
+    return f"{line[:at]}https://example.com/deep/link {line[at:]}"
+
+
+def heading_tree(depth: int = 6, fanout: int = 4, seed: int = 0) -> List[str]:
+    """Nested sections, 'fanout' subsections per level with text between them"""
+    rng = random.Random(seed)
+    document = []
+
+    def section(level: int, prefix: str):
+        document.append(f"{'#' * level} Section {prefix} {rng.choice(WORDS)}")
+        document.extend(_text(rng, 12) for _ in range(3))
+        if level < depth:
+            for idx in range(fanout):
+                section(level + 1, f"{prefix}.{idx}")
+
+    section(1, "1")
+    document.append("## Target Heading {: #target-id }")
+    return document
+
+
+def reference_document(lines: int = 20_000, references: int = 200, seed: int = 0):
+    """Large document using indirect links, all definitions at its end"""
+    rng = random.Random(seed)
+    document = [
+        f"{_text(rng, 8)} [text][ref-{rng.randrange(references)}] {_text(rng, 4)}"
+        for _ in range(lines)
+    ]
+    document += [f"[ref-{i}]: https://example.com/{i}" for i in range(references)]
+    return document
@@ -0,0 +1,123 @@
+"""Minimal timing harness: ops/s and per-call percentiles, JSON for comparisons."""
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+# a sample runs the operation this long at least, far above the timer resolution
+MIN_SAMPLE_NS = 1_000_000
+# calls per sample timed one by one for the percentiles
+MAX_TIMED_CALLS = 1000
+
+
+@dataclass
+class Result:
+    name: str
+    samples: int  # calls timed one by one
+    ops_per_sec: float
+    mean_us: float
+    p50_us: float
+    p90_us: float
+    p99_us: float
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted 'values'"""
+    rank = max(int(round(q / 100 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def timer_overhead_ns(rounds: int = 1000) -> float:
+    """Median time of reading the clock twice, subtracted from single calls"""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        timings.append(time.perf_counter_ns() - start)
+    return statistics.median(timings)
+
+
+def measure(
+    name: str, func: Callable[[], object], min_time: float = 0.5, min_samples: int = 7
+) -> Result:
+    """Times 'func' in samples of as many calls as it takes to reach MIN_SAMPLE_NS.
+
+    ops/s comes from the mean of the samples. The percentiles come from single
+    calls timed after each sample, percentiles of the sample means would hide
+    the slow calls.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= MIN_SAMPLE_NS:
+            break
+        loops *= 2
+
+    overhead_ns = timer_overhead_ns()
+    per_op_ns, call_ns = [], []
+    deadline = time.perf_counter() + min_time
+    while len(per_op_ns) < min_samples or time.perf_counter() < deadline:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            func()
+        per_op_ns.append((time.perf_counter_ns() - start) / loops)
+        for _ in range(min(loops, MAX_TIMED_CALLS)):
+            start = time.perf_counter_ns()
+            func()
+            call_ns.append(max(time.perf_counter_ns() - start - overhead_ns, 0))
+
+    call_ns.sort()
+    mean_ns = statistics.fmean(per_op_ns)
+    return Result(
+        name=name,
+        samples=len(call_ns),
+        ops_per_sec=1e9 / mean_ns,
+        mean_us=mean_ns / 1000,
+        p50_us=percentile(call_ns, 50) / 1000,
+        p90_us=percentile(call_ns, 90) / 1000,
+        p99_us=percentile(call_ns, 99) / 1000,
+    )
+
+
+def to_json(results: List[Result]) -> str:
+    return json.dumps(
+        {
+            "machine": {
+                "platform": platform.platform(),
+                "processor": platform.machine(),
+                "python": sys.version.split()[0],
+            },
+            "results": [asdict(result) for result in results],
+        },
+        indent=2,
+    )
+
+
+def load_baseline(path: str) -> Dict[str, dict]:
+    with open(path) as f:
+        return {result["name"]: result for result in json.load(f)["results"]}
+
+
+def format_results(
+    results: List[Result], baseline: Optional[Dict[str, dict]] = None
+) -> List[str]:
+    """Table of the results, with the change of ops/s against 'baseline'"""
+    header = f"{'benchmark':<40}{'ops/s':>14}" + "".join(
+        f"{column:>11}" for column in ("p50 µs", "p90 µs", "p99 µs")
+    )
+    lines = [header + ("  vs baseline" if baseline else "")]
+    for r in results:
+        line = (
+            f"{r.name:<40}{r.ops_per_sec:>14,.0f}"
+            f"{r.p50_us:>11.2f}{r.p90_us:>11.2f}{r.p99_us:>11.2f}"
+        )
+        before = (baseline or {}).get(r.name)
+        if before is not None:
+            line += f"  {r.ops_per_sec / before['ops_per_sec'] - 1:>+10.1%}"
+        lines.append(line)
+    return lines
@@ -0,0 +1,35 @@
+"""Keeps the benchmarks runnable, every case is run for a few samples only."""
+from tests.benchmarks import bench_mdnav, corpus
+from tests.benchmarks.harness import (
+    MAX_TIMED_CALLS,
+    format_results,
+    measure,
+    percentile,
+)
+
+
+def test_corpus():
+    assert len(corpus.many_links(lines=10)) == 10 + 50
+    assert "https://example.com/deep/link" in corpus.long_line(length=1000)
+    headings = corpus.heading_tree(depth=2, fanout=2)
+    assert sum(line.startswith("#") for line in headings) == 1 + 2 + 1
+    assert corpus.many_links(lines=10) == corpus.many_links(lines=10)
+
+
+def test_measure():
+    result = measure("noop", lambda: None, min_time=0, min_samples=3)
+    # the same number of single calls is timed after each of the 3 samples
+    assert result.samples % 3 == 0
+    assert 3 <= result.samples <= 3 * MAX_TIMED_CALLS
+    assert result.p50_us <= result.p99_us
+    assert percentile([1, 2, 3, 4], 50) == 2
+    baseline = {"noop": {"ops_per_sec": result.ops_per_sec}}
+    (line,) = format_results([result], baseline)[1:]
+    assert line.endswith("+0.0%")
+
+
+def test_benchmarks_run():
+    cases = {**bench_mdnav.parse_line_benchmarks(), **bench_mdnav.benchmarks()}
+    for func in cases.values():
+        func()
+    assert bench_mdnav.main(["-k", "open_uri", "--min-time", "0"]) == 0
@@ -0,0 +1,181 @@
+import pytest
+
+from vimania_uri_.md import mdnav
+from vimania_uri_.md.index import BufferIndex, buffer_index
+
+LINES = [
+    "# Links",
+    "see [text](target.md) and https://www.google.com or $HOME/xxx",
+    "[ref] and [text][ref] here",
+    "",
+    "[ref]: https://example.com",
+]
+
+
+class Buffer(list):
+    """Vim buffer which counts the lines read"""
+
+    reads = 0
+
+    def __getitem__(self, idx):
+        self.reads += 1
+        return super().__getitem__(idx)
+
+
+@pytest.fixture
+def python_parser(monkeypatch):
+    monkeypatch.setattr(mdnav, "vimania_uri_rs", None)
+
+
+@pytest.mark.parametrize("row", range(len(LINES)))
+def test_parse_line_same_as_cascade(row, python_parser):
+    index = BufferIndex()
+    index.update(1, LINES)
+    for column in range(len(LINES[row]) + 1):
+        expected = mdnav.parse_line((row, column), LINES)
+        assert index.parse_line((row, column), LINES) == expected, f"{column=}"
+
+
+def test_parse_line_long_line(python_parser):
+    # the cursor line is parsed around the cursor only
+    lines = ["[" * 16_000 + " [a][ref]", "[ref]: https://example.com"]
+    index = BufferIndex()
+    index.update(1, lines)
+    assert index.parse_line((0, 16_003), lines) == "https://example.com"
+
+
+def test_update_reads_changed_rows_only():
+    buffer = Buffer(LINES)
+    index = BufferIndex()
+    index.update(1, buffer, changes=[])
+    assert index.references() == {"ref": "https://example.com"}
+
+    # same as reported by 'listener_add': insert two lines behind the first,
+    # delete the second line and change the fourth one
+    buffer[1:1] = ["x", "[new]: new.md"]
+    del buffer[1]
+    buffer[3] = "## Heading"
+    buffer.reads = 0
+    index.update(2, buffer, changes=[(1, 1, 2), (1, 2, -1), (3, 4, 0)])
+    assert buffer.reads == 2
+    assert index.definitions[1] == ("new", "new.md")
+    assert index.anchors[3] == ("heading", None)
+    assert index.references() == {"ref": "https://example.com", "new": "new.md"}
+    assert index.find_anchor("#heading") == 3
+
+    # nothing changed, nothing is read
+    buffer.reads = 0
+    index.update(2, buffer, changes=[])
+    assert buffer.reads == 0
+
+
+def test_update_without_changes_rebuilds():
+    index = BufferIndex()
+    index.update(1, LINES)
+    definitions = list(index.definitions)
+
+    # same changedtick: the buffer is not read at all
+    index.update(1, [])
+    assert index.definitions == definitions
+
+    index.update(2, ["[new]: new.md"] + LINES)
+    assert index.definitions == [("new", "new.md")] + definitions
+
+    # changes are only applied if the previous ones were reported as well
+    index.update(3, LINES, changes=[])
+    assert index.definitions == definitions
+
+
+def test_unreported_change_rebuilds():
+    index = BufferIndex()
+    index.update(1, LINES, changes=[])
+    index.update(2, LINES[:-1], changes=[])
+    assert index.references() == {}
+
+
+def test_references():
+    index = BufferIndex()
+    index.update(1, LINES)
+    assert index.references() == {"ref": "https://example.com"}
+
+    # the first definition wins
+    index.update(2, LINES + ["[ref]: other.md", "[new]:  new.md "])
+    assert index.references() == {"ref": "https://example.com", "new": "new.md"}
+    assert index.resolve_reference("new") == "new.md"
+
+    index.update(3, LINES[:-1] + ["[ref]: other.md"])
+    assert index.resolve_reference("ref") == "other.md"
+    assert index.resolve_reference("new") is None
+
+
+def test_references_kept_by_other_changes():
+    buffer = list(LINES)
+    index = BufferIndex()
+    index.update(1, buffer, changes=[])
+    references = index.references()
+
+    # edits of other lines, inserted and deleted lines keep the label map
+    buffer[1] = "changed"
+    buffer[2:2] = ["inserted"]
+    del buffer[0]
+    index.update(2, buffer, changes=[(1, 2, 0), (2, 2, 1), (0, 1, -1)])
+    assert index.references() is references
+    # the definition line is rewritten with the same content
+    index.update(3, buffer, changes=[(4, 5, 0)])
+    assert index.references() is references
+
+    buffer[4] = "[ref]: other.md"
+    index.update(4, buffer, changes=[(4, 5, 0)])
+    assert index.references() == {"ref": "other.md"}
+
+    del buffer[4]
+    index.update(5, buffer, changes=[(4, 5, -1)])
+    assert index.references() == {}
+
+
+def test_resolve_in_current_buffer(monkeypatch):
+    index = BufferIndex()
+    index.update(1, LINES)
+    requested = []
+
+    def current_buffer_index():
+        requested.append(True)
+        return index
+
+    monkeypatch.setattr(mdnav, "current_buffer_index", current_buffer_index)
+    resolve = mdnav.resolve_in_current_buffer
+    # links which need no reference definition leave the index alone
+    assert mdnav.parse_line((1, 30), LINES, resolve) == "https://www.google.com"
+    assert mdnav.parse_line((1, 12), LINES, resolve) == "target.md"
+    assert requested == []
+    assert mdnav.parse_line((2, 12), LINES, resolve) == "https://example.com"
+    assert requested == [True]
+
+
+def test_buffer_index():
+    index = buffer_index(1000, 1, LINES)
+    assert buffer_index(1000, 1, LINES) is index
+    assert buffer_index(1001, 1, LINES) is not index
+    assert index.parse_line((2, 12), LINES) == "https://example.com"
+
+
+def test_find_anchor():
+    lines = ["# Links", "## Foo Bar {: #custom }", "text", "## Foo", "# Links"]
+    index = BufferIndex()
+    index.update(1, lines)
+    assert index.find_anchor("#links") == 0
+    assert index.find_anchor("#foo") == 1  # prefix match, first one wins
+    assert index.find_anchor("Foo Bar") == 1
+    assert index.find_anchor("#custom") == 1
+    assert index.find_anchor("#missing") is None
+
+    index.update(2, ["inserted"] + lines)
+    assert index.find_anchor("#foo") == 2
+    index.update(3, ["inserted", "# Foo first"] + lines)
+    assert index.find_anchor("#foo") == 1
+
+    # inserted lines move the anchors behind them
+    lines = ["inserted", "# Foo first"] + lines
+    index.update(4, lines, changes=[])
+    index.update(5, ["x", "y"] + lines, changes=[(0, 0, 2)])
+    assert index.find_anchor("#foo") == 3
@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 from vimania_uri_.environment import ROOT_DIR
@@ -24,6 +25,16 @@ def _find_cursor(lines):
     return cursor, lines_without_cursor
 
 
+@pytest.fixture(params=["rust", "python"])
+def link_parser(request, monkeypatch):
+    """Runs a test with the Rust link parser and the Python regex cascade"""
+    if request.param == "python":
+        monkeypatch.setattr(mdnav, "vimania_uri_rs", None)
+    elif mdnav.vimania_uri_rs is None:
+        pytest.skip("vimania_uri_rs extension not available")
+    return request.param
+
+
 class TestParseLine:
     # NOTE: the cursor is indicated with ^, the cursor will be placed on the
     # following character
@@ -92,7 +103,24 @@ class TestParseLine:
     ]
 
     @pytest.mark.parametrize("lines, expected", parse_link_cases)
-    def test_parse_line(self, lines, expected):
+    def test_parse_line(self, lines, expected, link_parser):
+        cursor, mod_lines = _find_cursor(lines)
+        actual = mdnav.parse_line(cursor, mod_lines)
+        assert actual == expected
+
+    @pytest.mark.parametrize(
+        ("link", "expected"),
+        (
+            ("[b^ar](baz.md)", "baz.md"),
+            ("[b^ar][baz]", "baz"),
+            ("https://^www.google.com", "https://www.google.com"),
+            ("$HO^ME/xxx", "$HOME/xxx"),
+        ),
+    )
+    def test_parse_line_long_line(self, link, expected, link_parser):
+        # links far from the cursor are outside of the searched windows
+        filler = "x" * 10_000 + " [a](b) https://example.com " + "y" * 10_000
+        lines = [f"{filler} {link} {filler}", "[baz]: baz"]
         cursor, mod_lines = _find_cursor(lines)
         actual = mdnav.parse_line(cursor, mod_lines)
         assert actual == expected
@@ -135,13 +163,32 @@ class TestParseLine:
             ("[xx](http://^yyy/xxx)", None),  # do not match markdown links
         ),
     )
-    def test_check_url(self, line, expected):
+    def test_check_url(self, line, expected, link_parser):
         cursor, mod_lines = _find_cursor([line])
         assert len(mod_lines) == 1, f"too many lines: {mod_lines=}"
 
         link_text, rel_column = mdnav.check_url(mod_lines[0], cursor[1])
         assert link_text == expected
 
+    @pytest.mark.parametrize("offset", (9, 2500, 3013))
+    def test_check_url_window(self, offset, link_parser):
+        filler = "x" * 10_000
+        url = f"https://x.org/{'p' * 3000}"
+        line = f"{filler} {url} {filler}"
+        column = len(filler) + 1 + offset
+        link_text, rel_column = mdnav.check_url(line, column)
+        # the searched window grows until the whole URL is in it
+        assert link_text == url
+        assert rel_column == offset
+
+    def test_check_url_too_long(self, link_parser):
+        # URLs longer than the largest window are not found instead of cut off
+        line = f"https://x.org/{'p' * 3 * mdnav.MAX_LINK_WINDOW}"
+        assert mdnav.check_url(line, 2 * mdnav.MAX_LINK_WINDOW) == (
+            None,
+            2 * mdnav.MAX_LINK_WINDOW,
+        )
+
     @pytest.mark.parametrize(
         ("line", "expected"), (("^[xxx](http://yyy/xxx)", "http://yyy/xxx"),)
     )
@@ -213,6 +260,84 @@ def test_jump_to_anchor(target, buffer, expected):
     assert actual == expected
 
 
+@pytest.fixture
+def mock_vim(mocker):
+    mock_vim = mocker.MagicMock()
+    mock_vim.eval.return_value = "none"  # split policy
+    mock_vim.buffers = []
+    mock_vim.tabpages = []
+    mock_vim.current.tabpage = SimpleNamespace(number=1, windows=[])
+    mocker.patch.dict("sys.modules", {"vim": mock_vim})
+    return mock_vim
+
+
+class TestVimOpen:
+    @pytest.mark.parametrize(
+        "policy, expected",
+        (
+            ("none", "tabnew"),
+            ("horizontal", "split"),
+            ("vertical", "vsplit"),
+            ("unknown", "tabnew"),
+        ),
+    )
+    def test_opens_file(self, policy, expected, mock_vim, tmp_path):
+        mock_vim.eval.return_value = policy
+        mdnav.VimOpen(URI(str(tmp_path / "x.md")))()
+        mock_vim.command.assert_called_once_with(f"{expected} {tmp_path / 'x.md'}")
+
+    def test_focuses_window(self, mock_vim, tmp_path):
+        buffer = SimpleNamespace(name=str(tmp_path / "x.md"), number=3)
+        window = SimpleNamespace(buffer=buffer)
+        tabpage = SimpleNamespace(number=2, windows=[window])
+        mock_vim.buffers = [buffer]
+        mock_vim.tabpages = [mock_vim.current.tabpage, tabpage]
+
+        mdnav.VimOpen(URI(str(tmp_path / "x.md")))()
+        mock_vim.command.assert_not_called()
+        assert mock_vim.current.tabpage == tabpage
+        assert mock_vim.current.window == window
+
+    @pytest.mark.parametrize(
+        "link, current_dir",
+        (("sub/../x.md", "."), ("../x.md", "sub"), ("link.md", ".")),
+    )
+    def test_focuses_window_of_same_file(self, link, current_dir, mock_vim, tmp_path):
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "x.md").touch()
+        (tmp_path / "link.md").symlink_to(tmp_path / "x.md")
+        buffer = SimpleNamespace(name=str(tmp_path / "x.md"), number=3)
+        window = SimpleNamespace(buffer=buffer)
+        mock_vim.buffers = [SimpleNamespace(name="", number=1), buffer]
+        mock_vim.current.tabpage.windows = [window]
+
+        current_file = str(tmp_path / current_dir / "a.md")
+        mdnav.open_uri(URI(link), {".md"}, current_file=current_file)()
+        mock_vim.command.assert_not_called()
+        assert mock_vim.current.window == window
+
+    @pytest.mark.parametrize(
+        "policy, expected",
+        (("none", "tab sbuffer 3"), ("vertical", "vertical sbuffer 3")),
+    )
+    def test_shows_hidden_buffer(self, policy, expected, mock_vim, tmp_path):
+        mock_vim.eval.return_value = policy
+        mock_vim.buffers = [SimpleNamespace(name=str(tmp_path / "x.md"), number=3)]
+        mdnav.VimOpen(URI(str(tmp_path / "x.md:7")))()
+        mock_vim.command.assert_called_once_with(expected)
+        assert mock_vim.current.window.cursor == (7, 0)
+
+
+@pytest.mark.parametrize("target, buffer, expected", jump_to_anchor_cases)
+def test_find_anchor_line(target, buffer, expected, tmp_path):
+    if mdnav.vimania_uri_rs is None:
+        pytest.skip("vimania_uri_rs extension not available")
+    path = tmp_path / "other.md"
+    path.write_text("\n".join(buffer))
+    actual = mdnav.find_anchor_line(str(path), target)
+    assert actual == (None if expected is None else expected + 1)
+
+
 class TestParseUri:
     @pytest.mark.parametrize(
         "path, expected_path, expected_line, expected_anchor, expected_scheme, expected_fullpath",
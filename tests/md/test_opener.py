@@ -0,0 +1,70 @@
+import sys
+import time
+
+import pytest
+
+from vimania_uri_.md import mdnav, opener
+from vimania_uri_.md.mdnav import URI
+
+
+def wait_idle(timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while opener.running():
+        assert time.monotonic() < deadline, "opener still running"
+        time.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def no_errors():
+    opener.pop_errors()
+    yield
+    wait_idle()
+    opener.pop_errors()
+
+
+def test_launch_returns_before_the_process_exits():
+    started = time.monotonic()
+    opener.launch([sys.executable, "-c", "import time; time.sleep(0.5)"])
+    assert time.monotonic() - started < 0.5
+    assert opener.running() == 1
+    wait_idle()
+    assert opener.pop_errors() == []
+
+
+def test_launch_failure_is_queued():
+    script = "import sys; sys.stderr.write('no handler'); sys.exit(3)"
+    opener.launch([sys.executable, "-c", script])
+    wait_idle()
+    (error,) = opener.pop_errors()
+    assert "exited with 3: no handler" in error
+    assert opener.pop_errors() == []
+
+
+def test_open_url(mocker):
+    browser = mocker.Mock()
+    browser.open_new_tab.return_value = False
+    mocker.patch.object(opener, "browser", return_value=browser)
+    opener.open_url("http://example.com")
+    wait_idle()
+    browser.open_new_tab.assert_called_once_with("http://example.com")
+    assert opener.pop_errors() == ["No browser could open http://example.com"]
+
+
+def test_platform_opener_resolved_once(mocker):
+    opener.platform_opener.cache_clear()
+    which = mocker.patch("shutil.which", return_value="/usr/bin/xdg-open")
+    mocker.patch.object(sys, "platform", "linux")
+    assert opener.platform_opener() == ("/usr/bin/xdg-open",)
+    assert opener.platform_opener() == ("/usr/bin/xdg-open",)
+    which.assert_called_once_with("xdg-open")
+    opener.platform_opener.cache_clear()
+
+
+def test_os_open(mocker, tmp_path):
+    open_file = mocker.patch.object(opener, "open_file")
+    (tmp_path / "doc.pdf").write_text("")
+    mdnav.OSOpen(URI("doc.pdf"), str(tmp_path))()
+    open_file.assert_called_once_with(str(tmp_path / "doc.pdf"))
+
+    with pytest.raises(FileNotFoundError):
+        mdnav.OSOpen(URI("missing.pdf"), str(tmp_path))()
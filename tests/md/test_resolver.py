@@ -0,0 +1,59 @@
+import os
+from pathlib import Path
+
+from vimania_uri_.md import mdnav
+from vimania_uri_.md.mdnav import URI
+from vimania_uri_.md.resolver import PathResolver
+
+
+def test_resolve(mocker):
+    _ = mocker.patch.dict(os.environ, {"HOME": "/home/xxx", "XXX": "/xxx"})
+    resolver = PathResolver()
+    assert resolver.resolve("~/foo.md") == "/home/xxx/foo.md"
+    assert resolver.resolve("$XXX/foo.md") == "/xxx/foo.md"
+    assert resolver.resolve("${XXX}/foo.md", "/base") == "/xxx/foo.md"
+    assert resolver.resolve("/abs/foo.md", "/base") == "/abs/foo.md"
+    assert resolver.resolve("foo.md", "/base") == "/base/foo.md"
+    assert resolver.resolve("./foo.md") == str(Path.cwd() / "foo.md")
+
+
+def test_resolve_normalizes(mocker):
+    _ = mocker.patch.dict(os.environ, {"XXX": "/xxx/sub"})
+    resolver = PathResolver()
+    assert resolver.resolve("../other.md", "/notes/sub") == "/notes/other.md"
+    assert resolver.resolve("$XXX/../foo.md") == "/xxx/foo.md"
+    assert resolver.resolve("a/../b.md", "/base") == "/base/b.md"
+    assert resolver.resolve("b.md", "/base") == "/base/b.md"
+    # both spellings share the memoized entry
+    assert len(resolver._resolutions) == 3
+
+
+def test_resolve_memoized_until_environment_changes(mocker):
+    _ = mocker.patch.dict(os.environ, {"XXX": "/xxx"})
+    resolver = PathResolver()
+    spy = mocker.spy(os.path, "expandvars")
+    assert resolver.resolve("$XXX/foo.md") == "/xxx/foo.md"
+    assert resolver.resolve("$XXX/foo.md") == "/xxx/foo.md"
+    assert spy.call_count == 1
+
+    os.environ["XXX"] = "/yyy"
+    assert resolver.resolve("$XXX/foo.md") == "/yyy/foo.md"
+    assert spy.call_count == 2
+
+
+def test_resolve_follows_working_directory(monkeypatch, tmp_path):
+    resolver = PathResolver()
+    monkeypatch.chdir(tmp_path)
+    assert resolver.resolve("foo.md") == str(tmp_path / "foo.md")
+    (tmp_path / "sub").mkdir()
+    monkeypatch.chdir(tmp_path / "sub")
+    assert resolver.resolve("foo.md") == str(tmp_path / "sub" / "foo.md")
+
+
+def test_open_uri_relative_to_current_file():
+    action = mdnav.open_uri(URI("baz.md"), current_file="/notes/index.md")
+    assert action == mdnav.VimOpen(URI("baz.md"), "/notes")
+    assert mdnav.parse_uri(action.target, action.base_dir).fullpath == "/notes/baz.md"
+
+    action = mdnav.open_uri(URI("../other.md"), {".md"}, current_file="/notes/sub/a.md")
+    assert mdnav.parse_uri(action.target, action.base_dir).fullpath == "/notes/other.md"
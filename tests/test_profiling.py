@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+from vimania_uri_ import profiling
+
+
+@pytest.mark.parametrize(
+    ("flag", "env", "directory", "expected"),
+    (
+        ("", {}, "", None),
+        ("0", {}, "/vim", None),
+        ("my_file.md", {}, "", None),
+        ("1", {}, "/vim", "/vim"),
+        ("0", {"VIMANIA_URI_PROFILE": "1"}, "", "/cache/vimania-uri-rs/profiles"),
+        ("1", {"VIMANIA_URI_PROFILE_DIR": "/env"}, "", "/env"),
+        ("1", {"VIMANIA_URI_PROFILE_DIR": "/env"}, "/vim", "/vim"),
+    ),
+)
+def test_capture_dir(mocker, flag, env, directory, expected):
+    mocker.patch.dict(os.environ, {"XDG_CACHE_HOME": "/cache", **env})
+    for name in ("VIMANIA_URI_PROFILE", "VIMANIA_URI_PROFILE_DIR"):
+        if name not in env:
+            os.environ.pop(name, None)
+    result = profiling.capture_dir(flag, directory)
+    assert (str(result) if result else None) == expected
+
+
+def test_run(tmp_path):
+    phases = iter(
+        [
+            {"http_request": {"count": 1, "sum_us": 100}},
+            {
+                "http_request": {"count": 3, "sum_us": 2100},
+                "html_parse": {"count": 1, "sum_us": 50},
+                "http_body": {"count": 0, "sum_us": 0},
+            },
+        ]
+    )
+    result = profiling.run(
+        "command",
+        lambda a, b=0: a + b,
+        1,
+        b=2,
+        directory=tmp_path,
+        rust_phases=lambda: next(phases),
+    )
+    assert result == 3
+    (prof,) = tmp_path.glob("*-command.prof")
+    capture = json.loads(prof.with_suffix(".json").read_text())
+    assert capture["command"] == "command"
+    assert capture["rust_phases"] == {
+        "http_request": {"count": 2, "sum_ms": 2.0},
+        "html_parse": {"count": 1, "sum_ms": 0.05},
+    }
+
+
+def test_run_raises(tmp_path):
+    def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        profiling.run("failing", failing, directory=tmp_path)
+    assert len(list(tmp_path.glob("*-failing.prof"))) == 1
+
+
+def test_rotate(tmp_path):
+    for idx in range(5):
+        (tmp_path / f"2026010{idx}-command.prof").write_text("")
+        (tmp_path / f"2026010{idx}-command.json").write_text("")
+    profiling.rotate(tmp_path, keep=2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "20260103-command.json",
+        "20260103-command.prof",
+        "20260104-command.json",
+        "20260104-command.prof",
+    ]
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from vimania_uri_ import stats
+from vimania_uri_.stats import Histogram
+
+
+@pytest.fixture(autouse=True)
+def no_samples():
+    stats.reset()
+    yield
+    stats.reset()
+
+
+def test_histogram():
+    histogram = Histogram()
+    for us in (30, 10, 20, 1000):
+        histogram.record(us)
+    assert (histogram.count, histogram.sum_us) == (4, 1060)
+    assert (histogram.min_us, histogram.max_us) == (10, 1000)
+    assert histogram.buckets[4] == 1  # 10 < 16
+    assert histogram.buckets[5] == 2  # 20, 30 < 32
+    assert histogram.buckets[10] == 1  # 1000 < 1024
+    assert histogram.percentile(50) == 32
+    assert histogram.percentile(99) == 1000  # capped by the maximum
+    assert Histogram().summary()["mean_us"] == 0
+
+
+def test_timed():
+    for _ in range(3):
+        with stats.timed("phase"):
+            pass
+    with pytest.raises(ValueError):
+        with stats.timed("failing"):
+            raise ValueError
+    snapshot = stats.snapshot()
+    assert snapshot["phase"].count == 3
+    assert snapshot["failing"].count == 1
+
+
+def test_report():
+    stats.record("parse_line", 1_500_000)
+    rust = {"http_request": Histogram(count=1, sum_us=5, min_us=5, max_us=5).__dict__}
+    report = stats.report(rust)
+    assert report["python"]["parse_line"]["p50_us"] == 1500
+    assert report["rust"]["http_request"]["histogram"]["max_us"] == 5
+    assert json.loads(stats.to_json(report)) == report
+
+    lines = stats.format_report(report)
+    assert lines[-1].split() == ["http_request"] + ["1"] + ["0.005"] * 5
+    assert "rust (ms)" in lines
@@ -82,6 +82,73 @@ class TestVimaniaUriManager:
         vm.get_url_title("https://www.google.com")
         assert "Google" in caplog.text
 
+    @pytest.mark.parametrize(
+        ("status", "value", "done", "title"),
+        (
+            ("pending", None, 0, None),
+            ("done", "It's done", 1, "It''s done"),
+            ("error", "Failed to get URL title", 1, "UNKNOWN_URL_TITLE"),
+        ),
+    )
+    def test_poll_url_title(self, mocker, mock_vim, status, value, done, title):
+        import vimania_uri_.vim_.vimania_manager as module_under_test
+
+        mocker.patch.object(
+            module_under_test.vimania_uri_rs,
+            "poll_url_title",
+            return_value=(status, value),
+        )
+        assert module_under_test.VimaniaUriManager.poll_url_title(1) == done
+        if title is None:
+            mock_vim.command.assert_not_called()
+        else:
+            mock_vim.command.assert_called_once_with(
+                f"let g:vimania_url_title = '{title}'"
+            )
+
+    def test_profiled(self, mocker, mock_vim, tmp_path):
+        import vimania_uri_.vim_.vimania_manager as module_under_test
+
+        settings = {
+            "get(g:, 'vimania_uri_rs_profile', '')": "1",
+            "get(g:, 'vimania_uri_rs_profile_dir', '')": str(tmp_path),
+        }
+        mock_vim.eval.side_effect = settings.get
+        mocker.patch.object(
+            module_under_test.vimania_uri_rs, "title_stats", return_value="{}"
+        )
+        module_under_test.VimaniaUriManager.edit_vimania("/tmp/x.md#foo")
+        mock_vim.command.assert_any_call("tabnew /tmp/x.md")
+        assert len(list(tmp_path.glob("*-edit_vimania.prof"))) == 1
+        assert len(list(tmp_path.glob("*-edit_vimania.json"))) == 1
+
+    def test_show_trace(self, mocker, mock_vim):
+        import vimania_uri_.vim_.vimania_manager as module_under_test
+
+        events = [(0.25, "DEBUG", "vimania_uri_rs", "vimania-worker-0", "fetching")]
+        dump_trace = mocker.patch.object(
+            module_under_test.vimania_uri_rs, "dump_trace", return_value=events
+        )
+        new_scratch_buffer = mocker.patch.object(
+            module_under_test.vim_helper, "new_scratch_buffer"
+        )
+        module_under_test.VimaniaUriManager.show_trace(clear=False)
+        dump_trace.assert_called_once_with(clear=False)
+        (text,), _ = new_scratch_buffer.call_args
+        assert text.endswith(".250 DEBUG vimania_uri_rs [vimania-worker-0] fetching")
+
+    @pytest.mark.parametrize(("running", "done"), ((0, 1), (1, 0)))
+    def test_poll_openers(self, mocker, mock_vim, running, done):
+        import vimania_uri_.vim_.vimania_manager as module_under_test
+
+        opener = module_under_test.opener
+        mocker.patch.object(opener, "running", return_value=running)
+        mocker.patch.object(opener, "pop_errors", return_value=["can't open"])
+        assert module_under_test.VimaniaUriManager.poll_openers() == done
+        mock_vim.command.assert_called_once_with(
+            "echohl ErrorMsg | echom 'vimania: can''t open' | echohl None"
+        )
+
 
 @pytest.mark.parametrize(
     ("args", "path", "suffix"),